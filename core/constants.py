@@ -19,13 +19,31 @@ GITHUB_REPOSITORY = os.environ.get("GITHUB_REPOSITORY") # validate.py
 OWNER, REPO = GITHUB_REPOSITORY.split("/") # validate.py # TODO: Is this really needed? 
 
 # Wikipedia contact
-WIKI_BASE = "https://en.wikipedia.org/wiki/"
+WIKI_BASE = os.environ.get("WIKI_BASE", "https://en.wikipedia.org/wiki/") # Override to point at wiki_standin.py
 WIKI_USER_AGENT = os.environ.get("WIKI_USER_AGENT")
+WIKI_MAX_WORKERS = 8 # Concurrent author lookups (authors.py)
+WIKI_REQUESTS_PER_SECOND = 10 # Global cap across all workers
+WIKI_TIMEOUT = 10 # Seconds per request
+WIKI_CACHE_TTL_DAYS = 30 # Wikipedia/Wikidata responses reused from the HTTP cache for this long (authors.py)
+WIKI_BACKEND = os.environ.get("WIKI_BACKEND", "html") # authors.py: 'html' (scrape infobox) or 'api' (MediaWiki + Wikidata)
+WIKI_API_URL = os.environ.get("WIKI_API_URL", "https://en.wikipedia.org/w/api.php") # Title -> Wikidata item
+WIKIDATA_API_URL = os.environ.get("WIKIDATA_API_URL", "https://www.wikidata.org/w/api.php") # Item claims/labels
+WIKI_API_BATCH_SIZE = 50 # Titles/ids per API request (the API's limit for anonymous clients)
+WIKIDATA_DUMP_CHUNK_LINES = 2000 # Entities per work unit when streaming a Wikidata dump (authors.py --dump)
 
 # DB path 
 DATA_DIR = PROJECT_ROOT / "data"
 VIS_DIR = PROJECT_ROOT / "visuals"
 GOALS_DIR = DATA_DIR / "goals"
+CACHE_DIR = DATA_DIR / "cache" # Local-only caches (gitignored)
+HTTP_CACHE_PATH = CACHE_DIR / "http_cache.sqlite" # Shared response cache for all outbound HTTP (http_utils.py)
+HTTP_CACHE_MAX_MB = 256 # Least recently used responses are evicted beyond this
+HTTP_CACHE_OFFLINE = os.environ.get("HTTP_CACHE_OFFLINE", "").lower() in {"1", "true", "yes"} # Replay only; never hit the network
+FILE_HASHES_PATH = CACHE_DIR / "file_hashes.json" # sha256 of source files by (mtime, size), so unchanged files aren't re-read (geo_utils.py)
+COUNTRY_CENTROIDS_PATH = CACHE_DIR / "country_centroids.json" # Country pins for create_visuals.py, derived from ADM0_GEOJSON_PATH (geo_utils.py)
+OPENLIBRARY_INDEX_PATH = CACHE_DIR / "openlibrary.sqlite" # ISBN-13 index built from Open Library dumps (openlibrary.py)
+OPENLIBRARY_BATCH_SIZE = 10000 # Index rows per insert batch while streaming a dump
+OPENLIBRARY_FILL_COLUMNS = ["publisher", "year_published", "year_edition", "total_pages", "length", "width", "height"] # books columns filled when NULL
 DB_PATH = os.path.join(DATA_DIR,"reading.sqlite")
 # Skip mkdirs 
 
@@ -62,6 +80,9 @@ BOOKS_COLUMNS = {
     "read_count":"INTEGER DEFAULT 0", # Number of times read before this time
     "genre_primary":"TEXT", # Must be from a default list, see constants.py
     "genre_secondary":"TEXT", # Must be from a default list, see constants.py
+    "price": "REAL", # Added later; set_price.py (list price, or heuristic estimate)
+    "currency": "TEXT",
+    "price_source": "TEXT", # 'google_api' or 'heuristic_estimate'
     ##
     "created_on": "TEXT DEFAULT (DATETIME('now'))",
     "updated_on": "TEXT DEFAULT (DATETIME('now'))",
@@ -94,6 +115,27 @@ READING_EVENTS_COLUMNS = {
     "updated_on": "TEXT DEFAULT (DATETIME('now'))",
 }
 
+# Anomalies table (validate.py; rebuilt on every validation run)
+ANOMALIES_TABLE_NAME = "anomalies"
+ANOMALIES_COLUMNS = {
+    "anomaly_id": "INTEGER PRIMARY KEY",
+    "issue_id": "INTEGER",
+    "source_id": "TEXT", # reading_events row that was flagged
+    "date": "TEXT",
+    "page": "INTEGER",
+    "kind": "TEXT", # See ANOMALY_KINDS
+    "value": "REAL", # Offending measure: pages lost, pages over total, pages/day, or days early
+    "created_on": "TEXT DEFAULT (DATETIME('now'))",
+    "updated_on": "TEXT DEFAULT (DATETIME('now'))",
+}
+ANOMALY_KINDS = {
+    "page_regression", # Later event with a lower page
+    "over_total_pages", # Page beyond books.total_pages
+    "rate_outlier", # More than MAX_PAGES_PER_DAY since the previous event
+    "before_date_began", # Event dated before books.date_began
+}
+MAX_PAGES_PER_DAY = 300 # Approx. maximum pages per day; also the daily bar chart ceiling
+
 # Goal table (and goal input file)
 GOALS_TABLE_NAME = "reading_goals"
 GOAL_COLUMNS = {
@@ -118,9 +160,14 @@ AUTHORS_COLUMNS = {"author_id": "INTEGER PRIMARY KEY",
     "death_year": "INTEGER",
     "age": "INTEGER",
     "birth_country": "TEXT",
+    "birth_iso3": "TEXT", # birth_country resolved to ISO3 (country_utils.py); what maps group by
+    "birth_place": "TEXT", # City/town (api and dump backends)
+    "birth_lat": "REAL", # Birth place coordinates (Wikidata, or the gazetteer; see regions.py)
+    "birth_lon": "REAL",
     "nationality": "TEXT",
     "home_country": "TEXT",
     "ref_count": "INTEGER",
+    "sitelink_count": "INTEGER", # Wikipedia language editions with an article (api backend); popularity proxy
     # End metadata
     "created_on": "TEXT DEFAULT (DATETIME('now'))",
     "updated_on": "TEXT DEFAULT (DATETIME('now'))"}
@@ -137,6 +184,65 @@ AUTHORS_METADATA_KEYS = {
     if col not in AUTHORS_SYSTEM_COLUMNS
 }
 
+# Book price lookups (set_price.py); one row per ISBN-13, misses included so they aren't re-queried
+PRICE_CACHE_TABLE_NAME = "price_cache"
+PRICE_CACHE_COLUMNS = {
+    "isbn13": "TEXT PRIMARY KEY",
+    "price": "REAL", # NULL: no list price found
+    "currency": "TEXT",
+    "source": "TEXT",
+    "fetched_on": "TEXT DEFAULT (DATETIME('now'))",
+}
+PRICE_CACHE_TTL_DAYS = 30
+PRICE_MAX_WORKERS = 4
+PRICE_REQUESTS_PER_SECOND = 5 # Google Books, unauthenticated
+GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes"
+
+# Author name variants (authors.py); books.author -> alias -> authors.author_id
+AUTHOR_ALIASES_TABLE_NAME = "author_aliases"
+AUTHOR_ALIASES_COLUMNS = {
+    "alias": "TEXT PRIMARY KEY", # As written in books.author, trimmed (join on TRIM(books.author))
+    "author_id": "INTEGER NOT NULL", # Canonical author
+    "created_on": "TEXT DEFAULT (DATETIME('now'))",
+    "updated_on": "TEXT DEFAULT (DATETIME('now'))",
+    "FOREIGN KEY (author_id)": "REFERENCES authors(author_id)",
+}
+
+# Author enrichment state (authors.py); one row per author, updated on every attempt
+AUTHOR_ENRICHMENT_TABLE_NAME = "author_enrichment"
+AUTHOR_ENRICHMENT_COLUMNS = {
+    "author_id": "INTEGER PRIMARY KEY", # authors.author_id
+    "last_attempt": "TEXT",
+    "outcome": "TEXT", # 'found', 'not_found' or 'error'
+    "misses": "INTEGER DEFAULT 0", # Consecutive not_found/error outcomes; drives the back-off
+    "next_attempt": "TEXT", # Not retried before this time
+    "source_url": "TEXT",
+    "content_hash": "TEXT", # sha1 of the page the fields came from
+    "created_on": "TEXT DEFAULT (DATETIME('now'))",
+    "updated_on": "TEXT DEFAULT (DATETIME('now'))",
+    "FOREIGN KEY (author_id)": "REFERENCES authors(author_id)",
+}
+ENRICH_FOUND_TTL_DAYS = 90 # Found authors are re-checked after this long
+ENRICH_MISS_BACKOFF_DAYS = 7 # First retry after a miss; doubles per consecutive miss...
+ENRICH_MISS_BACKOFF_MAX_DAYS = 180 # ...up to this
+ENRICH_ERROR_RETRY_HOURS = 1 # Network errors are retried on the next run after this
+ENRICH_BATCH_SIZE = 50 # Authors per checkpoint (commit)
+ENRICH_TIME_BUDGET_MINUTES = 8 # Stop starting batches after this; the workflow times out at 10
+
+# Author regions (regions.py): birth place -> ADM1 region, for sub-national maps
+AUTHOR_REGIONS_TABLE_NAME = "author_regions"
+AUTHOR_REGIONS_COLUMNS = {
+    "author_id": "INTEGER PRIMARY KEY", # authors.author_id
+    "lat": "REAL",
+    "lon": "REAL",
+    "source": "TEXT", # 'wikidata' (authors.birth_lat/lon) or 'gazetteer' (by birth_place)
+    "adm0": "TEXT", # ISO3 (shapeGroup)
+    "adm1": "TEXT", # Region name (shapeName)
+    "adm1_id": "TEXT", # geoBoundaries shapeID
+    "created_on": "TEXT DEFAULT (DATETIME('now'))",
+    "FOREIGN KEY (author_id)": "REFERENCES authors(author_id)",
+}
+
 # Associations and Works tables
 WORKS_TABLE_NAME = 'works'
 WORKS_COLUMNS = {
@@ -234,6 +340,11 @@ HUMAN_PROPORTIONS = {"Head":1,
                      "Feet":0.5}
 LEGEND_MAX_CHARS = 26 # For text wrapping in legend(s), esp. with titles
 ### TODO: Add font_size defaults for graphics?
+# Chart output (create_visuals.py)
+VIS_FORMATS = ("svg", "png") # Files written per chart
+VIS_DPI = 300 # Raster formats only
+VIS_MANIFEST_PATH = VIS_DIR / "visuals_manifest.json" # {chart: hash of its data, params and style}; unchanged charts are skipped
+SVG_HASHSALT = "reading-log" # Fixed svg.hashsalt so element ids are the same from run to run
 
 ## Map visuals
 # Country-level
@@ -242,6 +353,103 @@ ADM0_GEOJSON_PATH = PROJECT_ROOT / "data" / "geo" / "countries.geojson"
 # Country- and muni-level (state)
 ADM1_SHAPEFILE_PATH = PROJECT_ROOT / "data" / "geo" / "adm1" / "geoBoundariesCGAZ_ADM1.shp"
 ADM1_GEOJSON_PATH = PROJECT_ROOT / "data" / "geo" / "countriesmunis.geojson"
+# Levels of detail: simplification tolerance in degrees (map_utils.py); the default LOD writes the paths above
+GEO_LODS = {"low": 0.1, "medium": 0.05, "high": 0.01}
+GEO_DEFAULT_LOD = "medium"
+GEO_SIMPLIFY_CHUNK_SIZE = 16 # Geometries per worker task
+GEO_NEAREST_MAX_DEG = 0.1 # regions.py: points outside every polygon (simplified coasts) snap to one this close
+MAP_JITTER_DEG = 1.0 # create_visuals.py: pins placed at a country centroid are spread within this radius
+GAZETTEER_PATH = PROJECT_ROOT / "data" / "geo" / "cities15000.txt" # Optional GeoNames dump for birth places without coordinates
+# Cached topology for choropleths (geo_utils.py): filtered, quantised, shared borders stored once
+COUNTRY_TOPOLOGY_PATH = CACHE_DIR / "countries.topo.json"
+GEO_QUANTIZATION = 100000 # Grid steps per axis (~400 m at world extent)
+GEO_DECIMALS = 4 # Decimal places of decoded coordinates
+
+# Country names as found in authors.birth_country -> ISO3 (country_utils.py); keys are matched after
+# normalisation (case, accents, dots, leading "the"), geometry names and ISO3 codes resolve without an entry
+COUNTRY_ALIASES = {
+    # Common variants
+    "US": "USA", "U.S.": "USA", "U.S.A.": "USA", "United States of America": "USA", "America": "USA",
+    "UK": "GBR", "U.K.": "GBR", "Great Britain": "GBR", "Britain": "GBR",
+    "England": "GBR", "Scotland": "GBR", "Wales": "GBR", "Northern Ireland": "GBR",
+    "Russian Federation": "RUS", "Czech Republic": "CZE", "Türkiye": "TUR", "Holland": "NLD",
+    "Myanmar": "MMR", "North Macedonia": "MKD", "Eswatini": "SWZ", "Ivory Coast": "CIV", "Cape Verde": "CPV",
+    "Republic of Korea": "KOR", "DPRK": "PRK", "Democratic Republic of the Congo": "COD", "DR Congo": "COD",
+    "DRC": "COD", "Republic of the Congo": "COG", "Central African Republic": "CAF", "East Timor": "TLS",
+    "Vatican": "VAT", "Holy See": "VAT", "Republic of Ireland": "IRL", "UAE": "ARE", "PRC": "CHN",
+    "People's Republic of China": "CHN", "Republic of China": "TWN", "Micronesia": "FSM", "Marshall Islands": "MHL",
+    "Solomon Islands": "SLB", "Saint Lucia": "LCA", "Saint Kitts and Nevis": "KNA",
+    "Saint Vincent and the Grenadines": "VCT", "Brunei Darussalam": "BRN", "Lao PDR": "LAO", "Viet Nam": "VNM",
+    "Syrian Arab Republic": "SYR", "Iran (Islamic Republic of)": "IRN", "Bolivia (Plurinational State of)": "BOL",
+    "Venezuela (Bolivarian Republic of)": "VEN", "Tanzania, United Republic of": "TZA", "Moldova, Republic of": "MDA",
+    # Historical states -> main successor
+    "Kingdom of Italy": "ITA", "Papal States": "ITA", "Kingdom of the Two Sicilies": "ITA", "Kingdom of Sardinia": "ITA",
+    "Russian Empire": "RUS", "Soviet Union": "RUS", "USSR": "RUS", "Tsardom of Russia": "RUS",
+    "German Empire": "DEU", "Kingdom of Prussia": "DEU", "Prussia": "DEU", "Weimar Republic": "DEU",
+    "Nazi Germany": "DEU", "West Germany": "DEU", "East Germany": "DEU", "German Confederation": "DEU",
+    "Holy Roman Empire": "DEU", "Kingdom of Bavaria": "DEU", "Kingdom of Saxony": "DEU",
+    "Austria-Hungary": "AUT", "Austrian Empire": "AUT", "Habsburg Monarchy": "AUT",
+    "Ottoman Empire": "TUR", "Czechoslovakia": "CZE", "Kingdom of Bohemia": "CZE",
+    "Yugoslavia": "SRB", "Kingdom of Yugoslavia": "SRB", "Kingdom of Serbia": "SRB",
+    "Kingdom of Hungary": "HUN", "Congress Poland": "POL", "Polish–Lithuanian Commonwealth": "POL",
+    "Second Polish Republic": "POL", "Kingdom of Poland": "POL",
+    "Kingdom of Great Britain": "GBR", "Kingdom of England": "GBR", "Kingdom of Scotland": "GBR",
+    "United Kingdom of Great Britain and Ireland": "GBR", "British Empire": "GBR",
+    "Irish Free State": "IRL", "Kingdom of Ireland": "IRL",
+    "Kingdom of France": "FRA", "French Empire": "FRA", "French Third Republic": "FRA",
+    "Spanish Empire": "ESP", "Kingdom of Spain": "ESP", "Kingdom of Portugal": "PRT",
+    "Dutch Republic": "NLD", "Kingdom of the Netherlands": "NLD", "Denmark–Norway": "DNK",
+    "Swedish Empire": "SWE", "Grand Duchy of Finland": "FIN", "Kingdom of Greece": "GRC",
+    "Persia": "IRN", "Qajar Iran": "IRN", "Ceylon": "LKA", "Siam": "THA", "Burma": "MMR", "Zaire": "COD",
+    "Rhodesia": "ZWE", "Southern Rhodesia": "ZWE", "Northern Rhodesia": "ZMB", "Gold Coast": "GHA",
+    "Abyssinia": "ETH", "Ethiopian Empire": "ETH", "Dahomey": "BEN", "Upper Volta": "BFA", "Bechuanaland": "BWA",
+    "Basutoland": "LSO", "Tanganyika": "TZA", "Nyasaland": "MWI", "Union of South Africa": "ZAF",
+    "Cape Colony": "ZAF", "British India": "IND", "British Raj": "IND", "Mughal Empire": "IND",
+    "Dominion of India": "IND", "Dominion of Pakistan": "PAK", "East Pakistan": "BGD", "Mandatory Palestine": "ISR",
+    "Empire of Japan": "JPN", "Qing dynasty": "CHN", "Qing China": "CHN", "Manchukuo": "CHN",
+    "Korean Empire": "KOR", "Joseon": "KOR", "Korea": "KOR", "French Indochina": "VNM", "Dutch East Indies": "IDN",
+    "Malaya": "MYS", "Straits Settlements": "SGP", "Newfoundland": "CAN", "Dominion of Canada": "CAN",
+    "Province of Canada": "CAN", "Thirteen Colonies": "USA", "Confederate States": "USA",
+    "New Spain": "MEX", "Viceroyalty of Peru": "PER", "Empire of Brazil": "BRA", "Colony of Brazil": "BRA",
+    "Colony of New South Wales": "AUS", "Colony of Victoria": "AUS", "Dominion of New Zealand": "NZL",
+}
+
+# books.original_language (ISO 639-1) -> ISO3 of the country its books are mapped to (create_maps.py)
+LANGUAGE_HOME_COUNTRY = {
+    "en": "GBR",
+    "fr": "FRA",
+    "de": "DEU",
+    "it": "ITA",
+    "es": "ESP",
+    "pt": "PRT",
+    "ru": "RUS",
+    "uk": "UKR",
+    "pl": "POL",
+    "cs": "CZE",
+    "hu": "HUN",
+    "ro": "ROU",
+    "nl": "NLD",
+    "sv": "SWE",
+    "no": "NOR",
+    "da": "DNK",
+    "fi": "FIN",
+    "is": "ISL",
+    "el": "GRC",
+    "grc": "GRC", # Ancient Greek (ISO 639-2)
+    "la": "ITA", # Latin
+    "tr": "TUR",
+    "ar": "EGY",
+    "he": "ISR",
+    "fa": "IRN",
+    "hi": "IND",
+    "bn": "BGD",
+    "zh": "CHN",
+    "ja": "JPN",
+    "ko": "KOR",
+    "vi": "VNM",
+    "id": "IDN",
+    "sw": "TZA",
+}
 
 # Graph colorscale
 COLORSCALE = [
@@ -0,0 +1,86 @@
+'''Vectorised anomaly checks over reading_events (used by validate.py).'''
+import sys
+
+import numpy as np
+
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m  
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import * 
+
+# Functions
+def load_event_arrays(conn):
+    '''Return (events, books) as dicts of NumPy arrays; dates as Julian day numbers.'''
+    cur = conn.cursor()
+    cur.row_factory = None # Plain tuples; sqlite3.Row is several times slower to build and convert
+    rows = cur.execute(
+        "SELECT rowid, issue_id, julianday(date), page FROM reading_events WHERE page IS NOT NULL"
+    ).fetchall()
+    ev = np.array(rows, dtype=np.float64).reshape(-1, 4) # NULL dates become NaN
+    events = {
+        "rowid": ev[:, 0].astype(np.int64),
+        "issue_id": ev[:, 1].astype(np.int64),
+        "day": ev[:, 2],
+        "page": ev[:, 3],
+    }
+    rows = cur.execute(
+        "SELECT issue_id, total_pages, julianday(date(date_began)) FROM books"
+    ).fetchall()
+    bk = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    books = {
+        "issue_id": bk[:, 0].astype(np.int64),
+        "total_pages": bk[:, 1], # NaN where unknown
+        "began_day": bk[:, 2],
+    }
+    return events, books
+
+def find_event_anomalies(events, books, max_pages_per_day=MAX_PAGES_PER_DAY):
+    '''One pass over all events, grouped by issue and ordered by date, then by rowid (insertion order), so a
+    page that goes backwards within a day is still caught. Page 1 leads its day whatever its rowid: validate.py
+    adds it after the fact, dated like the book's first logged event.
+    Returns (rowids, kinds, values) arrays; kinds index into the sorted ANOMALY_KINDS.'''
+    kinds = sorted(ANOMALY_KINDS)
+    order = np.lexsort((events["rowid"], events["page"] != 1, events["day"], events["issue_id"]))
+    rowid = events["rowid"][order]
+    issue = events["issue_id"][order]
+    day = events["day"][order]
+    page = events["page"][order]
+
+    # Consecutive events of the same issue
+    same = issue[1:] == issue[:-1]
+    d_page = np.diff(page)
+    d_day = np.maximum(np.diff(day), 1.0) # Same-day jumps count as one day
+    rate = d_page / d_day
+    with np.errstate(invalid="ignore"):
+        regression = same & (d_page < 0)
+        outlier = same & (rate > max_pages_per_day)
+
+    # Per-event book attributes via a sorted lookup
+    total = np.full(len(issue), np.nan)
+    began = np.full(len(issue), np.nan)
+    if len(books["issue_id"]):
+        book_order = np.argsort(books["issue_id"])
+        book_ids = books["issue_id"][book_order]
+        pos = np.clip(np.searchsorted(book_ids, issue), 0, len(book_ids) - 1)
+        known = book_ids[pos] == issue
+        total[known] = books["total_pages"][book_order][pos[known]]
+        began[known] = books["began_day"][book_order][pos[known]]
+    with np.errstate(invalid="ignore"): # NaN comparisons are simply False
+        over = page > total
+        early = day < began
+
+    # Flags are attributed to the later event of each pair
+    hits = [
+        (rowid[1:][regression], kinds.index("page_regression"), -d_page[regression]),
+        (rowid[1:][outlier], kinds.index("rate_outlier"), rate[outlier]),
+        (rowid[over], kinds.index("over_total_pages"), (page - total)[over]),
+        (rowid[early], kinds.index("before_date_began"), (began - day)[early]),
+    ]
+    rowids = np.concatenate([h[0] for h in hits])
+    kind_idx = np.concatenate([np.full(len(h[0]), h[1], dtype=np.int64) for h in hits])
+    values = np.concatenate([h[2] for h in hits])
+    return rowids, kind_idx, values
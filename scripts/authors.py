@@ -1,7 +1,8 @@
-import sqlite3, requests, sys, re
+import argparse, hashlib, json, sqlite3, requests, sys, re, time
 
-from datetime import datetime
-from bs4 import BeautifulSoup
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
 from urllib.parse import quote
 
 ###################
@@ -15,10 +16,17 @@ if str(PROJECT_ROOT) not in sys.path:
 from core.constants import * 
 ####################
 from sql_utils import *
+from http_utils import cached_session, TokenBucket
+from wikidata_utils import resolve_titles, get_author_facts
+from name_utils import cluster_names, split_name
+from country_utils import resolve_iso3
+import wikidata_dump
 
 # Functions
 def sync_authors_from_books(db_path=DB_PATH):
-    """Function to collect authors from 'books' table and inject into 'authors' table."""
+    """Function to collect authors from 'books' table and inject into 'authors' table.
+    Name variants of one person ("Tolstoy, Leo", "Leo Tolstoy") share one authors row; every variant is
+    recorded in author_aliases, which is how books link to authors."""
     # Connect
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
@@ -27,55 +35,86 @@ def sync_authors_from_books(db_path=DB_PATH):
     cur.execute(
         sql_create_table_cmd(AUTHORS_TABLE_NAME, AUTHORS_COLUMNS)
     )
-    # Get unique authors from books
-    authors = cur.execute("""
-        SELECT DISTINCT author
-        FROM books
-        WHERE author IS NOT NULL
-          AND TRIM(author) != '';
-    """).fetchall()
+    ensure_columns(cur, AUTHORS_TABLE_NAME, AUTHORS_COLUMNS) # Columns added since the table was created
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_authors_birth_iso3 ON {AUTHORS_TABLE_NAME}(birth_iso3)")
+    resolve_birth_countries(cur)
+    cur.execute(sql_create_table_cmd(AUTHOR_ALIASES_TABLE_NAME, AUTHOR_ALIASES_COLUMNS))
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_author_aliases_author_id ON {AUTHOR_ALIASES_TABLE_NAME}(author_id)")
+    cur.execute(sql_create_table_cmd(AUTHOR_ENRICHMENT_TABLE_NAME, AUTHOR_ENRICHMENT_COLUMNS))
+    # Get unique authors from books (with use counts, to break canonical-name ties)
+    counts = {
+        row["author"]: row["n"] for row in cur.execute("""
+            SELECT TRIM(author) AS author, COUNT(*) AS n
+            FROM books
+            WHERE author IS NOT NULL
+              AND TRIM(author) != ''
+            GROUP BY TRIM(author);
+        """)
+    }
+    existing = {row["full_name"]: row["author_id"] for row in cur.execute(f"SELECT author_id, full_name FROM {AUTHORS_TABLE_NAME}")}
+    aliases = {row["alias"]: row["author_id"] for row in cur.execute(f"SELECT alias, author_id FROM {AUTHOR_ALIASES_TABLE_NAME}")}
+    canonical = cluster_names(list(counts) + list(existing) + list(aliases), counts)
+    clusters = {}
+    for name, chosen in canonical.items():
+        clusters.setdefault(chosen, []).append(name)
 
-    for row in authors:
-        full_name = row["author"].strip() # Designed to be robust to multipart first or last names
-        if "," in full_name:
-            # Split on the first comma; allow optional whitespace immediately after
-            match = re.match(r"^(.*?),\s*(.*)$", full_name)
-            if match:
-                last_name = match.group(1)  # Keeps internal spaces like for middle names
-                first_name = match.group(2)
-            else:
-                last_name, first_name = full_name, None
+    merged = 0
+    for chosen, members in clusters.items():
+        # Keep the oldest existing row (it carries the enrichment history), renamed to the canonical variant
+        ids = sorted({existing[n] for n in members if n in existing} | {aliases[n] for n in members if n in aliases})
+        for duplicate_id in ids[1:]:
+            merge_author(cur, duplicate_id, ids[0])
+            merged += 1
+        first_name, last_name = split_name(chosen)
+        if ids:
+            cur.execute(f"""
+                UPDATE {AUTHORS_TABLE_NAME}
+                SET full_name = ?,
+                    first_name = COALESCE(?, first_name),
+                    last_name = COALESCE(?, last_name),
+                    updated_on = DATETIME('now')
+                WHERE author_id = ? AND full_name != ?
+            """, (chosen, first_name, last_name, ids[0], chosen))
+            author_id = ids[0]
         else:
-            # Fallback: split on whitespace
-            parts = full_name.split()
-            first_name = parts[0]
-            last_name = parts[-1] if len(parts) > 1 else None
-        # Upsert: skip if full_name is already present, and COALESVE first, last just in case
-        cur.execute("""
-            INSERT INTO authors (
-                full_name,
-                first_name,
-                last_name,
-                created_on,
-                updated_on
-            )
-            VALUES (?, ?, ?, DATETIME('now'), DATETIME('now'))
-            ON CONFLICT(full_name) DO UPDATE SET
-                first_name = COALESCE(excluded.first_name, first_name),
-                last_name = COALESCE(excluded.last_name, last_name),
-                updated_on = DATETIME('now');
-        """, (
-            full_name,
-            first_name,
-            last_name
-        ))
+            author_id = cur.execute(f"""
+                INSERT INTO {AUTHORS_TABLE_NAME} (full_name, first_name, last_name, created_on, updated_on)
+                VALUES (?, ?, ?, DATETIME('now'), DATETIME('now'))
+            """, (chosen, first_name, last_name)).lastrowid
+        cur.executemany(
+            sql_upsert(AUTHOR_ALIASES_TABLE_NAME, {"alias": None, "author_id": None}, "alias"),
+            [(name, author_id) for name in members if aliases.get(name) != author_id]
+        )
     # Commit
     conn.commit()
     conn.close()
-    print("Authors table synced successfully.")
+    print(f"Authors table synced successfully ({len(clusters)} authors, {len(canonical)} name variants, {merged} merged).")
 
-def build_candidate_urls(full_name):
-    """Function to attempt /wiki/First_Last as well as /wiki/Last,_First."""
+def resolve_birth_countries(cur):
+    """Fill birth_iso3 for authors whose birth_country hasn't been resolved yet (rows from before the column,
+    or countries the resolver has since learned)."""
+    rows = cur.execute(f"""
+        SELECT DISTINCT birth_country FROM {AUTHORS_TABLE_NAME}
+        WHERE birth_country IS NOT NULL AND birth_iso3 IS NULL
+    """).fetchall()
+    resolved = [(resolve_iso3(row[0]), row[0]) for row in rows]
+    cur.executemany(f"UPDATE {AUTHORS_TABLE_NAME} SET birth_iso3 = ? WHERE birth_country = ? AND birth_iso3 IS NULL",
+                    [r for r in resolved if r[0]])
+
+def merge_author(cur, duplicate_id, author_id):
+    """Fold a duplicate authors row into author_id: fill its missing metadata, repoint aliases, drop the duplicate."""
+    fill = ", ".join(
+        f"{c} = COALESCE({c}, (SELECT {c} FROM {AUTHORS_TABLE_NAME} WHERE author_id = :dup))"
+        for c in AUTHORS_METADATA_KEYS
+    )
+    cur.execute(f"UPDATE {AUTHORS_TABLE_NAME} SET {fill}, updated_on = DATETIME('now') WHERE author_id = :keep",
+                {"dup": duplicate_id, "keep": author_id})
+    cur.execute(f"UPDATE {AUTHOR_ALIASES_TABLE_NAME} SET author_id = ? WHERE author_id = ?", (author_id, duplicate_id))
+    cur.execute(f"DELETE FROM {AUTHOR_ENRICHMENT_TABLE_NAME} WHERE author_id = ?", (duplicate_id,))
+    cur.execute(f"DELETE FROM {AUTHORS_TABLE_NAME} WHERE author_id = ?", (duplicate_id,))
+
+def build_candidate_titles(full_name):
+    """Function to attempt "First Last" as well as "Last, First" page titles."""
     if "," in full_name:
         last, first = [p.strip() for p in full_name.split(",", 1)]
     else:
@@ -84,68 +123,153 @@ def build_candidate_urls(full_name):
         last = parts[-1] if len(parts) > 1 else None
     candidates = []
     if first and last:
-        candidates.append(f"{WIKI_BASE}{quote(first + '_' + last)}")
-        candidates.append(f"{WIKI_BASE}{quote(last + ',_' + first)}")
+        candidates.append(f"{first} {last}")
+        candidates.append(f"{last}, {first}")
     # Fallback: raw full name
-    candidates.append(f"{WIKI_BASE}{quote(full_name.replace(' ', '_'))}")
-    return candidates
+    candidates.append(full_name)
+    return list(dict.fromkeys(candidates)) # "First Last" names repeat the first candidate
+
+def wiki_url(title):
+    """Article URL for a page title."""
+    return f"{WIKI_BASE}{quote(title.replace(' ', '_'))}"
+
+def build_candidate_urls(full_name):
+    """Function to attempt /wiki/First_Last as well as /wiki/Last,_First."""
+    return [wiki_url(title) for title in build_candidate_titles(full_name)]
+
+def get_wiki_session(pool_size=WIKI_MAX_WORKERS, limiter=None):
+    """Keep-alive session on the shared HTTP cache; pages and API responses are reused for WIKI_CACHE_TTL_DAYS."""
+    return cached_session(WIKI_USER_AGENT, pool_size, ttl=WIKI_CACHE_TTL_DAYS * 86400, limiter=limiter)
 
-def fetch_page(url):
-    headers = {'User-Agent':WIKI_USER_AGENT}
-    response = requests.get(url, headers=headers, timeout=10)
+def fetch_page(url, session=None, limiter=None):
+    """Return page HTML (from the shared HTTP cache when fresh), or None if the page doesn't exist (404).
+    Any other failure (429, 5xx, ...) raises requests.HTTPError, so the attempt is retried as an error rather
+    than backed off as a miss. Pass limiter only if the session doesn't already carry one."""
+    if limiter:
+        limiter.acquire() # Global rate limit shared by all workers
+    if session is None:
+        with get_wiki_session(pool_size=1) as session:
+            response = session.get(url, timeout=WIKI_TIMEOUT)
+    else:
+        response = session.get(url, timeout=WIKI_TIMEOUT) # Keep-alive connection reuse
     # Get status 
     if response.status_code == 200:
         return response.text # Return text on success
-    return None # If failure, None
+    if response.status_code == 404:
+        return None # No such page: try the next candidate
+    response.raise_for_status() # Rate limited or server error
+    return None
+
+class WikiPageParser(HTMLParser):
+    """Single streaming pass over a page: the first infobox's th/td rows plus a citation count.
+    No document tree is built; text outside the infobox is never collected."""
+    SKIP_TAGS = {"style", "script"} # Not visible text (templatestyles live inside infobox cells)
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.infobox = None # Set to {} once the infobox opens
+        self.ref_count = 0
+        self.table_depth = 0 # Nesting depth inside the infobox (0 = outside)
+        self.infobox_done = False
+        self.rows = [] # Open rows (nested tables nest rows); each collects its first th and first td
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "ref":
+            self.ref_count += 1 # <ref> tags (wikitext-style citations)
+        elif tag == "li" and (dict(attrs).get("id") or "").startswith("cite_note-"):
+            self.ref_count += 1 # Rendered citations in the references list
+        if self.infobox_done:
+            return
+        if tag == "table":
+            if self.table_depth:
+                self.table_depth += 1
+            elif "infobox" in (dict(attrs).get("class") or "").split():
+                self.infobox = {}
+                self.table_depth = 1
+            return
+        if not self.table_depth:
+            return
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "tr":
+            self.rows.append({"th": None, "td": None, "cell": None, "depth": 0})
+        elif tag in ("th", "td"):
+            for row in self.rows:
+                if row["cell"] == tag:
+                    row["depth"] += 1
+                elif row["cell"] is None and row[tag] is None: # Only the first th and first td count
+                    row[tag] = []
+                    row["cell"] = tag
+                    row["depth"] = 1
+
+    def handle_endtag(self, tag):
+        if not self.table_depth:
+            return
+        if tag in self.SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in ("th", "td"):
+            for row in self.rows:
+                if row["cell"] == tag:
+                    row["depth"] -= 1
+                    if not row["depth"]:
+                        row["cell"] = None
+        elif tag == "tr" and self.rows:
+            row = self.rows.pop()
+            if row["th"] is not None and row["td"] is not None:
+                key = "".join(t.strip() for t in row["th"]) # Matches get_text(strip=True)
+                self.infobox[key] = " ".join(t.strip() for t in row["td"] if t.strip()) # get_text(" ", strip=True)
+        elif tag == "table":
+            self.table_depth -= 1
+            if not self.table_depth:
+                self.infobox_done = True # Later infoboxes are ignored, as with soup.find()
+                self.rows = []
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        for row in self.rows:
+            if row["cell"]:
+                row[row["cell"]].append(data)
+
+def parse_wiki_page(html):
+    """Return (infobox dict or None, ref_count) from one pass over the page."""
+    parser = WikiPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser.infobox, parser.ref_count
 
 def parse_infobox(html):
-    soup = BeautifulSoup(html, "html.parser")
-    infobox = soup.find("table", class_="infobox")
-    # Handle infobox
-    if not infobox:
-        return None
-    data = {}
-    rows = infobox.find_all("tr")
-    for row in rows:
-        header = row.find("th")
-        value = row.find("td")
-        # Parse content
-        if header and value:
-            key = header.get_text(strip=True)
-            val = value.get_text(" ", strip=True)
-            data[key] = val
-    # Return data
-    return data
-
-def scrape_author_wikipedia(full_name):
+    return parse_wiki_page(html)[0]
+
+def scrape_author_wikipedia(full_name, session=None, limiter=None):
     # Use build_urls
     urls = build_candidate_urls(full_name) # Return list of poss url
     print("URLs:", urls)
     for url in urls: # Test urls
-        html = fetch_page(url) # If failure, 
+        html = fetch_page(url, session, limiter) # If failure, 
         if html: # If "not", try next possible url
-            infobox_data = parse_infobox(html)
+            infobox_data, ref_count = parse_wiki_page(html) # Parsed once for both
             if infobox_data:
                 print(f"Found page: {url}")
                 return {
                     "url": url,
-                    "infobox": infobox_data
+                    "infobox": infobox_data,
+                    "ref_count": ref_count,
+                    "content_hash": hashlib.sha1(html.encode("utf-8")).hexdigest(),
                 }
     # If failure:
     print("No valid Wikipedia page found.")
     return None
 
-def fetch_wiki_references(url):
+def fetch_wiki_references(url, session=None, limiter=None):
     """One of several ways to attempt to measure popularity: references in-page to other articles."""
     # Fetch page right away
-    html = fetch_page(url)
+    html = fetch_page(url, session, limiter) # Served from the page cache after scrape_author_wikipedia
     if not html:
             return None # Fail
-    # Parse HTML
-    soup = BeautifulSoup(html, "html.parser")    
-    # Count <ref> tags (Wikipedia citations)
-    num_refs = len(soup.find_all("ref"))
-    return num_refs
+    # Count <ref> tags and rendered citations (Wikipedia citations)
+    return parse_wiki_page(html)[1]
 
 def extract_author_fields(infobox):
     # Set current year
@@ -202,36 +326,31 @@ def extract_author_fields(infobox):
         "ref_count":ref_count
     }
 
-# Execute
-if __name__ == "__main__":
-    # Sync authors from books table (includes creating the table initially)
-    sync_authors_from_books(DB_PATH)
-    # Connect and query
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row # Set row factory
-    cur = conn.cursor()
-    # Get list authors and rows ids
-    authors = cur.execute("""
-        SELECT author_id, full_name
-        FROM authors
-    """).fetchall() # Already sync'd from 'books' table
-    # Get Wikipedia info
-    print(f"Enriching {len(authors)} authors from Wikipedia...\n")
-    for row in authors:
-        author_id = row["author_id"]
-        full_name = row["full_name"]
-        print(f"Processing: {full_name}")
-        # Begin scraping
-        result = scrape_author_wikipedia(full_name)
-        if not result:
-            print(f"No Wiki page found for {full_name}. Skipping.\n")
-            continue
-        # If found, extract and update
-        extracted = extract_author_fields(result["infobox"])
-        extracted["ref_count"] = fetch_wiki_references(result["url"]) 
-        # TODO: Add other popularity metrics here
-        # Prepare upsert data
-        upsert_data = {
+def enrich_author(full_name, session=None, limiter=None):
+    """Scrape one author. Returns {"full_name", "outcome", "source_url", "content_hash", "fields"};
+    fields is the upsert row for the authors table, or None unless outcome is 'found'."""
+    print(f"Processing: {full_name}")
+    result = {"full_name": full_name, "outcome": None, "source_url": None, "content_hash": None, "fields": None}
+    try:
+        page = scrape_author_wikipedia(full_name, session, limiter)
+    except requests.RequestException as e: # One bad author shouldn't sink the batch
+        print(f"Request failed for {full_name}: {e}. Skipping.")
+        result["outcome"] = "error"
+        return result
+    if not page:
+        print(f"No Wiki page found for {full_name}. Skipping.")
+        result["outcome"] = "not_found"
+        return result
+    # If found, extract
+    extracted = extract_author_fields(page["infobox"])
+    extracted["ref_count"] = page["ref_count"] # Same page; no second download
+    # TODO: Add other popularity metrics here
+    # Prepare upsert data
+    result.update({
+        "outcome": "found",
+        "source_url": page["url"],
+        "content_hash": page["content_hash"],
+        "fields": {
             "full_name": full_name,
             "first_name": extracted.get("first_name"),
             "last_name": extracted.get("last_name"),
@@ -242,17 +361,215 @@ if __name__ == "__main__":
             "nationality": extracted.get("nationality"),
             "home_country": extracted.get("home_country"),
             "ref_count": extracted.get("ref_count")
+        },
+    })
+    return result
+
+def enrich_authors(full_names, max_workers=WIKI_MAX_WORKERS, requests_per_second=WIKI_REQUESTS_PER_SECOND,
+                   session=None, limiter=None):
+    """Enrich many authors concurrently over one keep-alive session and one global rate limit.
+    Returns enrich_author results in input order; pass a session (from get_wiki_session, which carries the
+    rate limit so cache hits are free) to share it across calls."""
+    own_session = session is None
+    session = session or get_wiki_session(max_workers, TokenBucket(requests_per_second))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(lambda name: enrich_author(name, session, limiter), full_names))
+    finally:
+        if own_session:
+            session.close()
+
+def upsert_authors(conn, rows):
+    """Write enrichment results in one batched upsert, resolving birth_country to birth_iso3; the caller commits."""
+    if not rows:
+        return 0
+    rows = [{**row, "birth_iso3": resolve_iso3(row.get("birth_country"))} for row in rows]
+    # TODO: Compare upsert_data to AUTHORS_COLUMNS or AUTHORS METADATA KEYS. Verify the above has everything that's expected so that it's actually fully dynamic.
+    sql = sql_upsert(AUTHORS_TABLE_NAME, rows[0], "full_name")
+    columns_for_insert = [
+        c for c in rows[0].keys()
+        if c not in {"created_on", "updated_on"}
+    ]
+    conn.executemany(sql, [tuple(row[c] for c in columns_for_insert) for row in rows])
+    return len(rows)
+
+## API backend: structured Wikidata facts, 50 names per request
+def enrich_authors_api(full_names, session=None, limiter=None, batch_size=WIKI_API_BATCH_SIZE):
+    """Same results as enrich_authors, from batched MediaWiki (title -> item) and Wikidata (item -> claims) calls.
+    ref_count is left NULL (kept as-is on upsert); sitelink_count is filled instead."""
+    own_session = session is None
+    session = session or get_wiki_session(1, TokenBucket(WIKI_REQUESTS_PER_SECOND))
+    results = []
+    try:
+        for batch in [full_names[i:i + batch_size] for i in range(0, len(full_names), batch_size)]:
+            results.extend(enrich_batch_api(batch, session, limiter, batch_size))
+    finally:
+        if own_session:
+            session.close()
+    return results
+
+def enrich_batch_api(full_names, session, limiter, batch_size=WIKI_API_BATCH_SIZE):
+    """One batch of names; a request failure marks the whole batch as 'error' (retried next run)."""
+    results = [
+        {"full_name": name, "outcome": None, "source_url": None, "content_hash": None, "fields": None}
+        for name in full_names
+    ]
+    candidates = {name: build_candidate_titles(name) for name in full_names}
+    try:
+        resolved = resolve_titles(
+            [t for titles in candidates.values() for t in titles], WIKI_API_URL, session, limiter, batch_size
+        )
+        # First candidate title with a Wikidata item wins, as with the HTML backend's URL order
+        pages = {
+            name: next((resolved[t] for t in titles if resolved.get(t)), None)
+            for name, titles in candidates.items()
         }
-        # Upsert
-        # TODO: Compare upsert_data to AUTHORS_COLUMNS or AUTHORS METADATA KEYS. Verify the above has everything that's expected so that it's actually fully dynamic.
-        sql = sql_upsert(AUTHORS_TABLE_NAME, upsert_data, "full_name")
-        columns_for_insert = [
-            c for c in upsert_data.keys()
-            if c not in {"created_on", "updated_on"}
-        ]
-        cur.execute(sql, tuple(upsert_data[c] for c in columns_for_insert))
-        conn.commit()
-        print("Updated.\n")
+        facts = get_author_facts(
+            {page[1] for page in pages.values() if page}, WIKIDATA_API_URL, session, limiter, batch_size
+        )
+    except (requests.RequestException, ValueError) as e: # ValueError: API error or bad JSON
+        print(f"API batch failed ({len(full_names)} authors): {e}. Skipping.")
+        for result in results:
+            result["outcome"] = "error"
+        return results
+    for result in results:
+        page = pages[result["full_name"]]
+        extracted = facts.get(page[1]) if page else None
+        if not extracted:
+            print(f"No Wikidata item found for {result['full_name']}. Skipping.")
+            result["outcome"] = "not_found"
+            continue
+        result.update({
+            "outcome": "found",
+            "source_url": wiki_url(page[0]),
+            "content_hash": hashlib.sha1(json.dumps(extracted, sort_keys=True).encode("utf-8")).hexdigest(),
+            "fields": {"full_name": result["full_name"], "first_name": None, "last_name": None, **extracted}, # Names come from sync
+        })
+    return results
+
+## Offline: Wikidata JSON dump
+def import_wikidata_dump(conn, dump_path, workers=None, chunk_lines=WIKIDATA_DUMP_CHUNK_LINES):
+    """Fill every author found in a local Wikidata dump in one go (no network, no rate limit).
+    Found authors are recorded in the enrichment state like an online 'found'; others are left for the online backends."""
+    conn.execute(sql_create_table_cmd(AUTHOR_ENRICHMENT_TABLE_NAME, AUTHOR_ENRICHMENT_COLUMNS))
+    rows = get_due_authors(conn, force=True)
+    print(f"Scanning {dump_path} for {len(rows)} authors...")
+    found = wikidata_dump.find_authors(
+        dump_path, {row["full_name"]: build_candidate_titles(row["full_name"]) for row in rows}, workers, chunk_lines
+    )
+    matched, results = [], []
+    for row in rows:
+        if row["full_name"] not in found:
+            continue
+        qid, extracted = found[row["full_name"]]
+        matched.append(row)
+        results.append({
+            "full_name": row["full_name"],
+            "outcome": "found",
+            "source_url": f"https://www.wikidata.org/wiki/{qid}",
+            "content_hash": hashlib.sha1(json.dumps(extracted, sort_keys=True).encode("utf-8")).hexdigest(),
+            "fields": {"full_name": row["full_name"], "first_name": None, "last_name": None, **extracted},
+        })
+    updated = upsert_authors(conn, [r["fields"] for r in results])
+    record_enrichment_state(conn, matched, results)
+    conn.commit()
+    print(f"Updated {updated} authors from the dump.")
+    return updated
+
+## Enrichment state (skip fresh authors, back off on misses, resume after a timeout)
+def next_attempt_after(outcome, misses, now):
+    """When an author becomes due again, given this attempt's outcome and the consecutive miss count."""
+    if outcome == "found":
+        return now + timedelta(days=ENRICH_FOUND_TTL_DAYS)
+    if outcome == "error":
+        return now + timedelta(hours=ENRICH_ERROR_RETRY_HOURS)
+    return now + timedelta(days=min(ENRICH_MISS_BACKOFF_DAYS * 2 ** (misses - 1), ENRICH_MISS_BACKOFF_MAX_DAYS))
+
+def get_due_authors(conn, force=False):
+    """Authors never attempted (first) or past their next_attempt (oldest attempt first)."""
+    return conn.execute(f"""
+        SELECT a.author_id, a.full_name, s.misses, s.content_hash
+        FROM {AUTHORS_TABLE_NAME} AS a
+        LEFT JOIN {AUTHOR_ENRICHMENT_TABLE_NAME} AS s ON s.author_id = a.author_id
+        WHERE ? OR s.author_id IS NULL OR s.next_attempt <= DATETIME('now')
+        ORDER BY s.last_attempt IS NOT NULL, s.last_attempt
+    """, (force,)).fetchall()
+
+def record_enrichment_state(conn, due_rows, results):
+    """Upsert one state row per attempted author; the caller commits."""
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    stamp = "%Y-%m-%d %H:%M:%S" # Same form as SQLite's DATETIME('now'), which get_due_authors compares against
+    state_rows = []
+    for row, result in zip(due_rows, results):
+        misses = 0 if result["outcome"] == "found" else (row["misses"] or 0) + 1
+        state_rows.append({
+            "author_id": row["author_id"],
+            "last_attempt": now.strftime(stamp),
+            "outcome": result["outcome"],
+            "misses": misses,
+            "next_attempt": next_attempt_after(result["outcome"], misses, now).strftime(stamp),
+            "source_url": result["source_url"],
+            "content_hash": result["content_hash"],
+        })
+    if state_rows:
+        sql = sql_upsert(AUTHOR_ENRICHMENT_TABLE_NAME, state_rows[0], "author_id")
+        conn.executemany(sql, [tuple(r.values()) for r in state_rows])
+        # A miss passes NULL URL/hash, so sql_upsert keeps the last found page's values
+    return len(state_rows)
+
+def run_enrichment(conn, force=False, batch_size=ENRICH_BATCH_SIZE, time_budget_minutes=ENRICH_TIME_BUDGET_MINUTES,
+                   backend=WIKI_BACKEND):
+    """Enrich due authors in batches, committing authors + state after each batch (the checkpoint).
+    Stops starting new batches once the time budget is spent; the next run resumes with what's left.
+    backend: 'html' scrapes article infoboxes; 'api' uses batched MediaWiki/Wikidata API calls."""
+    conn.execute(sql_create_table_cmd(AUTHOR_ENRICHMENT_TABLE_NAME, AUTHOR_ENRICHMENT_COLUMNS))
+    due = get_due_authors(conn, force)
+    total = conn.execute(f"SELECT COUNT(*) FROM {AUTHORS_TABLE_NAME}").fetchone()[0]
+    print(f"Enriching {len(due)} of {total} authors from Wikipedia (others are fresh or backing off)...\n")
+    deadline = time.monotonic() + time_budget_minutes * 60
+    session = get_wiki_session(WIKI_MAX_WORKERS, TokenBucket(WIKI_REQUESTS_PER_SECOND)) # Limits network requests only
+    attempted = updated = 0
+    with session:
+        for start in range(0, len(due), batch_size):
+            if time.monotonic() > deadline:
+                print(f"Time budget spent; {len(due) - attempted} authors left for the next run.")
+                break
+            batch = due[start:start + batch_size]
+            names = [row["full_name"] for row in batch]
+            if backend == "api":
+                results = enrich_authors_api(names, session=session)
+            else:
+                results = enrich_authors(names, session=session)
+            # Unchanged pages (same content hash) need no authors write
+            changed = [
+                result["fields"] for row, result in zip(batch, results)
+                if result["fields"] and (force or result["content_hash"] != row["content_hash"])
+            ]
+            updated += upsert_authors(conn, changed)
+            attempted += record_enrichment_state(conn, batch, results)
+            conn.commit() # Checkpoint
+    print(f"Attempted {attempted}, updated {updated} authors.")
+    return attempted, updated
+
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrich the authors table from Wikipedia.")
+    parser.add_argument("--force", action="store_true", help="Ignore enrichment state and re-enrich every author")
+    parser.add_argument("--max-minutes", type=float, default=ENRICH_TIME_BUDGET_MINUTES, help="Time budget")
+    parser.add_argument("--backend", choices=["html", "api"], default=WIKI_BACKEND, help="Infobox scraping or Wikidata API")
+    parser.add_argument("--dump", help="Fill authors from a local Wikidata JSON dump (.json/.gz/.bz2) instead of the network")
+    parser.add_argument("--workers", type=int, help="Processes for --dump (default: CPU count)")
+    args = parser.parse_args()
+    # Sync authors from books table (includes creating the table initially)
+    sync_authors_from_books(DB_PATH)
+    # Connect
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row # Set row factory
+    if args.dump:
+        import_wikidata_dump(conn, args.dump, args.workers)
+    else:
+        # Get Wikipedia info for due authors, checkpointing as we go
+        run_enrichment(conn, force=args.force, time_budget_minutes=args.max_minutes, backend=args.backend)
     # Close
     conn.close()
     print("Author enrichment complete.")
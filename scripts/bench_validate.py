@@ -0,0 +1,106 @@
+'''Synthetic benchmark for validate.py: time the rule suite on generated catalogs of increasing size.
+Usage: python scripts/bench_validate.py [n_books ...]'''
+# Imports
+import os, random, sqlite3, sys, time
+from datetime import date, timedelta
+
+# validate.py refuses to import without these; the benchmark never calls GitHub
+os.environ.setdefault("GITHUB_TOKEN", "benchmark")
+os.environ.setdefault("GITHUB_REPOSITORY", "benchmark/benchmark")
+
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m  
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import * 
+from sql_utils import sql_create_table_cmd
+from anomaly_utils import find_event_anomalies
+import numpy as np
+import validate
+
+# Functions
+def build_synthetic_db(n_books, events_per_book=10, seed=0):
+    '''In-memory DB with n_books finished books; roughly a tenth of them carry each kind of defect.'''
+    rng = random.Random(seed)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(sql_create_table_cmd(BOOKS_TABLE_NAME, BOOKS_COLUMNS))
+    conn.execute(sql_create_table_cmd(EVENTS_TABLE_NAME, READING_EVENTS_COLUMNS))
+    books, events = [], []
+    for issue_id in range(1, n_books + 1):
+        total_pages = rng.randint(120, 800)
+        began = date(2026, 1, 1) + timedelta(days=rng.randint(0, 60))
+        ended = began + timedelta(days=events_per_book + rng.randint(0, 30))
+        books.append((
+            issue_id, f"Book {issue_id}", f"Author {issue_id % 997}", issue_id, "completed",
+            f"{began} 00:00:00", f"{ended} 12:00:00", 5.0, 8.0, total_pages,
+            None if rng.random() < 0.1 else 1.0, # Missing word_count
+        ))
+        pages = sorted(rng.sample(range(2, total_pages), events_per_book))
+        if rng.random() >= 0.1: # Missing page 1
+            pages[0] = 1
+        if rng.random() < 0.1: # Missing final page
+            pages[-1] = total_pages
+        for k, page in enumerate(pages):
+            day = f"{began + timedelta(days=k)} 00:00:00"
+            events.append((f"issue:{issue_id}:{k}:{page}", issue_id, day, page, "issue-body", day, day))
+            if rng.random() < 0.01: # Duplicate event
+                events.append((f"comment:{issue_id}:{k}:{page}", issue_id, day, page, "issue-body", day, day))
+    conn.executemany(
+        """INSERT INTO books (issue_id, title, author, issue_number, status, date_began, date_ended,
+                              width, length, total_pages, word_count)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        books,
+    )
+    conn.executemany("INSERT INTO reading_events VALUES (?, ?, ?, ?, ?, ?, ?)", events)
+    conn.commit()
+    return conn
+
+def time_rules(conn):
+    '''Run the validation rules once; returns (seconds, report).'''
+    report = validate.ValidationReport()
+    start = time.perf_counter()
+    validate.ensure_indexes(conn)
+    validate.run_rules(conn, report)
+    conn.commit()
+    return time.perf_counter() - start, report
+
+def time_anomaly_pass(n_events=1_000_000, seed=0):
+    '''Time find_event_anomalies alone on n_events synthetic events; returns (seconds, anomalies).'''
+    np_rng = np.random.default_rng(seed)
+    n_books = max(n_events // 100, 1)
+    issue_id = np.sort(np_rng.integers(0, n_books, n_events))
+    events = {
+        "rowid": np.arange(n_events, dtype=np.int64),
+        "issue_id": issue_id,
+        "day": 2461041.5 + np_rng.integers(0, 365, n_events).astype(np.float64),
+        "page": np_rng.integers(1, 600, n_events).astype(np.float64),
+    }
+    books = {
+        "issue_id": np.arange(n_books, dtype=np.int64),
+        "total_pages": np.full(n_books, 550.0),
+        "began_day": np.full(n_books, 2461041.5),
+    }
+    start = time.perf_counter()
+    rowids, _, _ = find_event_anomalies(events, books)
+    return time.perf_counter() - start, len(rowids)
+
+# Execute
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [50, 500, 5000, 50000]
+    results = []
+    for n in sizes:
+        conn = build_synthetic_db(n)
+        seconds, report = time_rules(conn)
+        conn.close()
+        changed = sum(count for _, count in report.counts.values())
+        results.append((n, seconds, changed))
+    print("")
+    print(f"{'books':>8} {'seconds':>10} {'ms/book':>8} {'rows changed':>13}")
+    for n, seconds, changed in results:
+        print(f"{n:>8} {seconds:>10.3f} {1000 * seconds / n:>8.3f} {changed:>13}")
+    seconds, flagged = time_anomaly_pass()
+    print(f"Anomaly pass over 1,000,000 events: {seconds:.3f} s ({flagged} flagged)")
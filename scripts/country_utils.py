@@ -0,0 +1,63 @@
+'''Country name -> ISO3 resolver for free-text values like authors.birth_country ("U.S.", "Russian Empire",
+"England, UK"). One dict built from the ADM0 geometry names (via geo_utils) and COUNTRY_ALIASES; lookups are
+hash hits on a normalised key.'''
+import re, sys, unicodedata
+
+from functools import lru_cache
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+from geo_utils import load_country_table, load_country_centroids
+
+# Functions
+def normalise_country(text):
+    '''Lookup key: accents, case, dots and apostrophes dropped, "&" -> "and", leading "the" removed.
+    "U.S." -> "us", "Côte d'Ivoire" -> "cote divoire", "The Gambia" -> "gambia".'''
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"[.'’]", "", text).replace("&", " and ")
+    text = " ".join(re.sub(r"[^\w]+", " ", text).split())
+    return text[4:] if text.startswith("the ") else text
+
+@lru_cache(maxsize=None)
+def country_index():
+    '''{normalised name: ISO3} over geometry names (both "Korea, South" and "South Korea" orders), ISO3 codes
+    themselves and COUNTRY_ALIASES. Disputed areas without an ISO3 code are left out.'''
+    index = {}
+    for name, (_, _, iso3) in load_country_table().items():
+        if not (iso3 and iso3.isalpha()):
+            continue
+        index[normalise_country(name)] = iso3
+        if "," in name: # "Korea, South" -> "South Korea"
+            head, tail = name.split(",", 1)
+            index[normalise_country(f"{tail} {head}")] = iso3
+        index[iso3.lower()] = iso3
+    index.update({normalise_country(alias): iso3 for alias, iso3 in COUNTRY_ALIASES.items()})
+    return index
+
+def resolve_iso3(country):
+    '''ISO3 code for a free-text country, or None. Tries the whole value, then its comma/parenthesis-separated
+    parts from last to first ("Moscow, Russian Empire" -> RUS, "England, UK" -> GBR).'''
+    if not country:
+        return None
+    index = country_index()
+    key = normalise_country(country)
+    if key in index:
+        return index[key]
+    for part in reversed(re.split(r"[,;()/]", country)):
+        key = normalise_country(part)
+        if key in index:
+            return index[key]
+    return None
+
+def country_centroid(country):
+    '''(lat, lon) pin for a free-text country, or None.'''
+    return load_country_centroids().get(resolve_iso3(country))
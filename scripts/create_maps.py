@@ -1,106 +1,173 @@
-## For GeoJSON loading 
-import json, sqlite3, os, sys
+## Choropleth maps (plotly) over the country geometry
+import argparse, hashlib, json, sqlite3, sys, time
 import pandas as pd
-import plotly.express as px
 
 # Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
 from pathlib import Path
-# In lieu of packaging and running with python -m  
+# In lieu of packaging and running with python -m
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from core.constants import *
-from map_utils import create_geojson 
+from geo_utils import load_country_geojson, topology_key
 
 # Script constants
-shapefile_path, geojson_path = ADM0_SHAPEFILE_PATH, ADM0_GEOJSON_PATH
-output_html = VIS_DIR / "maps" / "world_map_author_counts.html"
+MAPS_DIR = VIS_DIR / "maps"
+MAPS_MANIFEST_PATH = MAPS_DIR / "maps_manifest.json" # {map name: hash of its inputs}, to skip unchanged maps
+MAP_FEATURE_KEY = "properties.shapeGroup" # ISO3 in geoBoundaries CGAZ
+# Map name -> query returning (country, count) rows, country being an ISO3 code (see country_utils.py)
+MAP_QUERIES = {
+    "world_map_author_counts": f"""
+        SELECT birth_iso3 AS country, COUNT(*) AS count
+        FROM {AUTHORS_TABLE_NAME}
+        WHERE birth_iso3 IS NOT NULL
+        GROUP BY birth_iso3
+    """,
+    "world_map_books_by_author_country": f"""
+        SELECT a.birth_iso3 AS country, COUNT(*) AS count
+        FROM {BOOKS_TABLE_NAME} AS b
+        JOIN {AUTHOR_ALIASES_TABLE_NAME} AS al ON al.alias = TRIM(b.author) -- Aliases are stored trimmed
+        JOIN {AUTHORS_TABLE_NAME} AS a ON a.author_id = al.author_id
+        WHERE a.birth_iso3 IS NOT NULL
+        GROUP BY a.birth_iso3
+    """,
+    "world_map_books_by_original_language": f"""
+        SELECT original_language AS language, COUNT(*) AS count
+        FROM {BOOKS_TABLE_NAME}
+        WHERE original_language IS NOT NULL
+        GROUP BY original_language
+    """,
+}
 
-# Check for presence of desired geojson 
-if not Path(geojson_path).exists(): 
-    create_geojson(shapefile_path, geojson_path)
+# Functions
+def geometry_key(geojson_path=ADM0_GEOJSON_PATH):
+    '''Key identifying the geometry version, from the GeoJSON's (cached) hash: no geometry is loaded. None while
+    the GeoJSON has yet to be built.'''
+    if not Path(geojson_path).exists():
+        return None
+    return topology_key(geojson_path, COUNTRIES_TO_REMOVE, GEO_QUANTIZATION)
 
-# Get data you want to assign to the map
-conn = sqlite3.connect(DB_PATH)
-# Count authors per country
-df_counts = pd.read_sql("""
-    SELECT birth_country, COUNT(*) AS author_count
-    FROM authors
-    GROUP BY birth_country
-""", conn)
-# Close conn
-conn.close()
+def load_geometry(shapefile_path=ADM0_SHAPEFILE_PATH, geojson_path=ADM0_GEOJSON_PATH):
+    '''Country GeoJSON for all maps (filtered and quantised; cached topology, see geo_utils.py), plus a key
+    identifying the geometry version.'''
+    # Check for presence of desired geojson
+    if not Path(geojson_path).exists():
+        from map_utils import create_geojson # geopandas only needed to build from the shapefile
+        create_geojson(shapefile_path, geojson_path)
+    return load_country_geojson(geojson_path), geometry_key(geojson_path)
 
-# Get geojson data
-with open(geojson_path) as f:
-    geojson = json.load(f)
-print("Collected geojson data.")
+def load_counts(conn, query):
+    '''(country, count) frame for a map query. Language counts are placed on the language's home country.'''
+    df = pd.read_sql(query, conn)
+    if "language" in df.columns:
+        df["country"] = df["language"].str.lower().map(LANGUAGE_HOME_COUNTRY)
+        df = df.dropna(subset=["country"]).groupby("country", as_index=False)["count"].sum()
+    return df[["country", "count"]]
 
-# Set condition for having an id; changes behavior in plotting
-has_id = any("id" in feature for feature in geojson["features"])
-
-# Clean geojson
-filtered_features = [
-    feature for feature in geojson["features"]
-    if feature["properties"]["shapeName"] not in COUNTRIES_TO_REMOVE
-]
-geojson["features"] = filtered_features
-
-# Grab valid countries for filtering/translating 'authors' table content
-if has_id:
-    valid_countries = {f["id"] for f in geojson["features"]}
-else:
-    valid_countries = {f["properties"]["shapeName"] for f in geojson["features"]}
-# Filter authors table counts for valid country names
-df_counts = df_counts[df_counts['birth_country'].isin(valid_countries)]
-
-print("Identified nonzero author countries: ", list(df_counts["birth_country"].unique()))
-# Begin data wrangling and mapping
-if has_id: # Change to : does feature in geojson["features"] have feature["id"]?
-    countries = [f["id"] for f in geojson["features"]]
-    df_geo = pd.DataFrame({"country": countries})
-    df_geo = df_geo.merge(
-        df_counts, 
-        how="left", 
-        left_on="country", 
-        right_on="birth_country"
-    )
-    df_geo["author_count"] = df_geo["author_count"].fillna(0)
-    # Plot
-    fig = px.choropleth(
-        df_geo,
-        geojson=geojson,
-        locations="country",
-        color="author_count",
-        color_continuous_scale=COLORSCALE,  # Custom scale set above
-        range_color=(0, df_geo["author_count"].max()), # Calibrate color scale
-        # color = "" # If color exists in the db
-    )
-else: 
-    countries = (f["properties"]["shapeName"] for f in geojson["features"])
-    df_geo = pd.DataFrame({"country": countries})
-    df_geo = df_geo.merge(
-        df_counts, 
-        how="left", 
-        left_on="country", 
-        right_on="birth_country"
-    ) 
-    df_geo["author_count"] = df_geo["author_count"].fillna(0)
-    # Plot
+def build_choropleth(geojson, df_counts, label="count"):
+    '''Choropleth of df_counts (country, count) over every country in the geometry (zero where absent).'''
+    import plotly.express as px # Only needed to draw; maps_key runs without it
+    df_geo = pd.DataFrame({"country": [f["properties"]["shapeGroup"] for f in geojson["features"]]})
+    df_geo = df_geo.merge(df_counts, how="left", on="country")
+    df_geo["count"] = df_geo["count"].fillna(0)
     fig = px.choropleth(
         df_geo,
         geojson=geojson,
-        featureidkey="properties.shapeName",
+        featureidkey=MAP_FEATURE_KEY,
         locations="country",
-        color="author_count",
-        color_continuous_scale=COLORSCALE, # Custom scale set above
-        range_color=(0, df_geo["author_count"].max()), # Calibrate color scale
+        color="count",
+        color_continuous_scale=COLORSCALE, # Custom scale in constants
+        range_color=(0, max(df_geo["count"].max(), 1)), # Calibrate color scale
+        labels={"count": label},
     )
+    # Plot setup
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), autosize=True)
+    return fig
+
+def inputs_hash(df_counts, geometry_key):
+    '''Hash of everything a map depends on: its counts, the geometry and the color scale.'''
+    payload = json.dumps([df_counts.sort_values("country").values.tolist(), geometry_key, COLORSCALE], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def map_inputs(conn, names=None, geojson_path=ADM0_GEOJSON_PATH):
+    '''({name: counts frame}, {name: inputs hash}) for the MAP_QUERIES maps (all, or `names`), without loading
+    the geometry. Maps whose query fails (e.g. author_aliases not created yet) are left out of both; hashes are
+    None while the GeoJSON has yet to be built.'''
+    key = geometry_key(geojson_path)
+    counts, hashes = {}, {}
+    for name in names or MAP_QUERIES:
+        try:
+            counts[name] = load_counts(conn, MAP_QUERIES[name])
+        except pd.errors.DatabaseError as e:
+            print(f"Skipping {name}: {e.__cause__ or e}")
+            continue
+        hashes[name] = inputs_hash(counts[name], key) if key else None
+    return counts, hashes
+
+def maps_key(names=None, db_path=DB_PATH, geojson_path=ADM0_GEOJSON_PATH):
+    '''Hash of every map's inputs and this module's code, without loading the geometry: what a caller needs to
+    decide whether render_maps has anything to do. None while the GeoJSON has yet to be built.'''
+    conn = sqlite3.connect(db_path)
+    try:
+        _, hashes = map_inputs(conn, names, geojson_path)
+    finally:
+        conn.close()
+    if None in hashes.values():
+        return None
+    payload = json.dumps([hashes, hashlib.sha256(Path(__file__).read_bytes()).hexdigest()], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_manifest(path=MAPS_MANIFEST_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def render_maps(names=None, force=False, db_path=DB_PATH, output_dir=MAPS_DIR):
+    '''Render the MAP_QUERIES maps (all, or `names`) from one loaded geometry. Every HTML file references a
+    single plotly.min.js in output_dir instead of inlining it. Keys are checked against the manifest first, so
+    when every map is unchanged since the last render the geometry is never loaded.
+    Returns {name: 'rendered' | 'unchanged' | 'no data'}.'''
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MAPS_MANIFEST_PATH.name
+    manifest = load_manifest(manifest_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        counts, hashes = map_inputs(conn, names)
+    finally:
+        conn.close()
+    results = {name: "no data" for name in names or MAP_QUERIES if name not in counts}
+    stale = [
+        name for name in counts
+        if force or hashes[name] is None or manifest.get(name) != hashes[name]
+        or not (output_dir / f"{name}.html").exists()
+    ]
+    results.update({name: "unchanged" for name in counts if name not in stale})
+    if stale:
+        geojson, key = load_geometry()
+        print("Collected geojson data.")
+        for name in stale:
+            start = time.perf_counter()
+            fig = build_choropleth(geojson, counts[name])
+            fig.write_html(output_dir / f"{name}.html", include_plotlyjs="directory") # Writes plotly.min.js next to it once
+            manifest[name] = inputs_hash(counts[name], key) # The GeoJSON may only just have been built
+            results[name] = "rendered"
+            print(f"Rendered {name} ({len(counts[name])} countries) in {time.perf_counter() - start:.2f} s.")
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    return results
 
-# Plot setup
-fig.update_geos(fitbounds="locations", visible=False)
-fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), autosize=True)
-# Output
-fig.write_html(output_html); # No echo
-#
\ No newline at end of file
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render choropleth maps into visuals/maps/.")
+    parser.add_argument("names", nargs="*", help=f"Maps to render (default: all of {', '.join(MAP_QUERIES)})")
+    parser.add_argument("--force", action="store_true", help="Render even if inputs are unchanged")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(MAP_QUERIES)
+    if unknown:
+        parser.error(f"Unknown map(s): {', '.join(sorted(unknown))}")
+    print(render_maps(args.names or None, force=args.force))
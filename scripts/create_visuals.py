@@ -1,9 +1,10 @@
-import sqlite3, sys, textwrap
+import argparse, hashlib, json, os, sqlite3, sys, textwrap, time
 
 import pandas as pd
 import numpy as np
 import seaborn as sns
 
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates # Special dates
 import matplotlib.cm as cm # Color mapping generally
@@ -11,7 +12,10 @@ import matplotlib.image as mpimg # Overlaying images on plots
 from matplotlib.colors import LinearSegmentedColormap # Special colormap
 
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster, MarkerCluster
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import cached_property
 
 ###################
 # Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
@@ -23,25 +27,233 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from core.constants import * 
 ####################
+from country_utils import country_centroid
+from streak_utils import streak_stats
+
+# Sources whose code shapes the charts (this module and the helpers it draws with), hashed into every render key
+STYLE_SOURCES = [
+    Path(__file__).resolve(),
+    *(Path(__file__).resolve().parent / f"{name}.py" for name in ("streak_utils", "country_utils", "geo_utils")),
+    PROJECT_ROOT / "core" / "constants.py",
+]
+# Builds each pin client-side from a [lat, lon, tooltip] row (same icon as the per-marker mode)
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: "user", markerColor: "blue", prefix: "glyphicon"});
+    return L.marker(new L.LatLng(row[0], row[1]), {icon: icon}).bindTooltip(row[2]);
+};
+"""
+# Per-format savefig metadata that would otherwise stamp the current date (or a changing id) into the file
+FORMAT_METADATA = {"svg": {"Date": None}, "pdf": {"CreationDate": None, "ModDate": None}, "png": {}}
+# Output settings for this process (set per worker by init_worker) and files written by the current job
+OUTPUT = {"formats": VIS_FORMATS, "dpi": VIS_DPI}
+OUTPUT_FILES = []
+
+class NoChartData(ValueError):
+    '''Nothing to plot yet (e.g. no completed books with a height): reported, but not a failed render.'''
+
+# Shared data for one render pass
+class VisualContext:
+    '''Every frame the charts draw from, each loaded by one query (only the columns and rows charts use) the
+    first time it's asked for, then memoised. Holds no connection, so it pickles (with whatever it has loaded)
+    to render workers; call preload() first so workers don't each query again.'''
+    def __init__(self, db_path=DB_PATH, to_date=None, first=None, last=None):
+        self.db_path = db_path
+        self.to_date = to_date if to_date is not None else pd.Timestamp.today().normalize()
+        self.first, self.last = first, last # Optional date_est bounds for ts_reading
+        self.queries = 0
+        self.fingerprints = {}
+
+    def query(self, sql, params=(), parse_dates=None):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            df = pd.read_sql(sql, conn, params=params, parse_dates=parse_dates)
+        finally:
+            conn.close()
+        self.queries += 1
+        return df
+
+    @cached_property
+    def ts_reading(self):
+        '''Daily reading vs. goal, in date order (within first/last when set).'''
+        bounds = [(">=", self.first), ("<=", self.last)]
+        where = " AND ".join(f"date_est {op} ?" for op, bound in bounds if bound is not None) or "1"
+        return self.query(
+            f"""
+            SELECT date_est, my_reading, my_goal, my_reading_cumulative, my_goal_cumulative
+            FROM ts_reading
+            WHERE {where}
+            ORDER BY date_est
+            """,
+            [pd.Timestamp(bound).strftime("%Y-%m-%d") for _, bound in bounds if bound is not None],
+            parse_dates=["date_est"]
+        )
+
+    @cached_property
+    def completed_books(self):
+        '''Completed books in reading order (first read first), with days taken where both dates are known.'''
+        return self.query(
+            f"""
+            SELECT title, height, length, total_pages,
+                   JULIANDAY(date_ended) - JULIANDAY(date_began) AS days_taken
+            FROM {BOOKS_TABLE_NAME}
+            WHERE status = 'completed'
+            ORDER BY created_on ASC
+            """
+        )
+
+    @cached_property
+    def publication_years(self):
+        '''year_published of every book that has one.'''
+        return self.query(f"SELECT year_published FROM {BOOKS_TABLE_NAME} WHERE year_published IS NOT NULL")
+
+    @cached_property
+    def authors(self):
+        '''Authors with a birth country, plus birth coordinates when the column exists (NULL otherwise).'''
+        conn = sqlite3.connect(self.db_path)
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({AUTHORS_TABLE_NAME})")}
+        conn.close()
+        coords = "birth_lat, birth_lon" if {"birth_lat", "birth_lon"} <= columns else "NULL AS birth_lat, NULL AS birth_lon"
+        return self.query(
+            f"""
+            SELECT first_name, last_name, birth_year, birth_country, {coords}
+            FROM {AUTHORS_TABLE_NAME}
+            WHERE birth_country IS NOT NULL
+            """
+        )
+
+    @property
+    def years(self):
+        return data_years(self.ts_reading)
+
+    def fingerprint(self, name):
+        '''Content hash of a frame (or other attribute, e.g. to_date), memoised. None when the attribute is.'''
+        if name not in self.fingerprints:
+            value = getattr(self, name)
+            digest = hashlib.sha256()
+            if isinstance(value, pd.DataFrame):
+                digest.update(json.dumps([list(value.columns), [str(t) for t in value.dtypes]]).encode("utf-8"))
+                digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+            else:
+                digest.update(str(value).encode("utf-8"))
+            self.fingerprints[name] = digest.hexdigest() if value is not None else None
+        return self.fingerprints[name]
+
+    @cached_property
+    def map_key(self):
+        '''Hash of the choropleth maps' inputs (create_maps.maps_key), None until their geometry exists.'''
+        from create_maps import maps_key
+        return maps_key(db_path=self.db_path)
+
+    def preload(self):
+        '''Load every frame now (one query each).'''
+        for name in ("ts_reading", "completed_books", "publication_years", "authors"):
+            getattr(self, name)
+        return self
 
 # Functions
-## Universal load
-def load_ts_reading(db_path):
-    '''Load table or view data for plotting.''' # TODO: Make flexible to different table or view names!
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        "SELECT * FROM ts_reading",
-        conn,
-        parse_dates=["date_est"]
-    )
-    conn.close()
-    return df
+## Output
 
-def output_fig(fig_obj, fig_label): # TODO: Can this be more robust?
+def output_fig(fig_obj, fig_label):
+    '''Save in each OUTPUT format, without dates or run-specific ids, so the same figure gives the same bytes.'''
     out_path = (VIS_DIR / fig_label).with_suffix("")
-    fig_obj.savefig(f"{out_path}.svg", bbox_inches="tight")
-    fig_obj.savefig(f"{out_path}.png", dpi=300, bbox_inches="tight")
+    with matplotlib.rc_context({"svg.hashsalt": SVG_HASHSALT}):
+        for fmt in OUTPUT["formats"]:
+            fig_obj.savefig(
+                f"{out_path}.{fmt}",
+                dpi=OUTPUT["dpi"],
+                bbox_inches="tight",
+                metadata=FORMAT_METADATA.get(fmt)
+            )
+            OUTPUT_FILES.append(f"{out_path.name}.{fmt}")
     
+## Periods (charts take a year, or default to the range the data covers)
+def data_years(df, column="date_est"):
+    '''Sorted calendar years present in df[column].'''
+    return sorted(int(y) for y in df[column].dt.year.dropna().unique())
+
+def select_year(df, year=None, column="date_est"):
+    '''Rows of df in `year` (all rows if None).'''
+    return df if year is None else df[df[column].dt.year == year]
+
+def year_bounds(df, year=None):
+    '''(first, last) day for a chart's x-axis: the whole calendar year if given, else the data's own range.'''
+    if year is not None:
+        return pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year, month=12, day=31)
+    return df["date_est"].min().normalize(), df["date_est"].max().normalize()
+
+def period_label(df, year=None, sep="–"):
+    '''"2026" for a single year (given, or the only one in the data), else "2019–2026" (sep="-" for file names).'''
+    if year is not None:
+        return str(year)
+    years = data_years(df)
+    if not years:
+        return ""
+    return str(years[0]) if years[0] == years[-1] else f"{years[0]}{sep}{years[-1]}"
+
+def period_title(df, year=None, to_date=None):
+    '''Period for a title, marked YTD when to_date falls inside it ("2026 YTD").'''
+    label = period_label(df, year)
+    first, last = year_bounds(df, year)
+    return f"{label} YTD" if to_date is not None and first <= to_date <= last else label
+
+def format_date_axis(ax, first, last):
+    '''Month ticks for up to a year; concise auto-spaced ticks for longer ranges.'''
+    if (last - first).days <= 366:
+        ax.xaxis.set_major_locator(mdates.MonthLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%b"))
+    else:
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    ax.set_xlim(first, last)
+
+## Calendar grids (one array per year, drawn with a single rasterised pcolormesh)
+def calendar_grid(per_day, year, to_date=None):
+    '''7 x n_weeks array of a year's daily values (rows Mon..Sun, columns weeks counted from the week holding
+    Jan 1): NaN outside the year or without data, -1 after to_date. Also returns the column of each month's
+    first day, for tick labels.'''
+    first = pd.Timestamp(year=year, month=1, day=1)
+    days = pd.date_range(first, pd.Timestamp(year=year, month=12, day=31), freq="D")
+    values = per_day.reindex(days).to_numpy(dtype=float)
+    if to_date is not None:
+        values[days > to_date] = -1
+    position = np.arange(len(days)) + first.weekday()
+    grid = np.full((7, position[-1] // 7 + 1), np.nan)
+    grid[position % 7, position // 7] = values
+    month_columns = position[days.day == 1] // 7
+    return grid, month_columns
+
+def streak_cmap():
+    '''Absent -> MY_COLOR; future days (below vmin) drawn as absent, cells without data left blank.'''
+    cmap = LinearSegmentedColormap.from_list("streaks", [ABSENT_COLOR, MY_COLOR])
+    cmap.set_under(ABSENT_COLOR)
+    cmap.set_bad("none")
+    return cmap
+
+def draw_calendar(ax, grid, month_columns, cmap, vmax):
+    '''One pcolormesh for the whole grid (a single raster image in the SVG, however many days).'''
+    mesh = ax.pcolormesh(
+        np.ma.masked_invalid(grid),
+        cmap=cmap,
+        vmin=0,
+        vmax=max(vmax, 1),
+        edgecolors=ABSENT_COLOR,
+        linewidth=0.2,
+        rasterized=True
+    )
+    ax.set_aspect("equal")
+    ax.invert_yaxis() # Monday on top
+    ax.set_yticks(np.arange(7) + 0.5)
+    ax.set_yticklabels(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], rotation=0)
+    ax.set_xticks(month_columns + 0.5)
+    ax.set_xticklabels([pd.Timestamp(2000, m, 1).strftime("%b") for m in range(1, len(month_columns) + 1)])
+    ax.tick_params(length=0)
+    ax.grid(False)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    return mesh
+
 ## Text and label handling
 def truncate_label(label):
     return label if len(label) <= LEGEND_MAX_CHARS else label[:LEGEND_MAX_CHARS] + "…"
@@ -51,8 +263,11 @@ def wrap_label(label, width=LEGEND_MAX_CHARS):
 
 # Begin charts
 ## Hair chart
-def create_bar_chart_discrete(df, chart_name='bar_daily_2026'):
-    # Set up 
+def create_bar_chart_discrete(ctx, chart_name='bar_daily_{period}', year=None):
+    # Set up (year=None spans the data)
+    df = ctx.ts_reading
+    first, last = year_bounds(df, year)
+    df = select_year(df, year)
     fig, ax = plt.subplots(figsize=(17.5, 5))
     bar_width = 0.4 
     ax.plot( 
@@ -72,25 +287,23 @@ def create_bar_chart_discrete(df, chart_name='bar_daily_2026'):
         label="Progress"
     )
     # Axes
-    ax.set_ylim(0, 300) # Approx. maximum pages per day = 300
+    ax.set_ylim(0, MAX_PAGES_PER_DAY) # Approx. maximum pages per day
     ax.set_ylabel("Pages Read")
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%b"))
-    ax.set_xlim(
-        pd.Timestamp("2026-01-01"),
-        pd.Timestamp("2026-12-31") # TODO: Consider making this dynamic? 
-    )
+    format_date_axis(ax, first, last)
     # Legend
     ax.legend(frameon=False)
-    ax.set_title("Daily Reading vs. Goal (2026)")
+    ax.set_title(f"Daily Reading vs. Goal ({period_label(df, year)})")
     # Create layout
     fig.tight_layout()
     if chart_name:
-        output_fig(fig, chart_name)
+        output_fig(fig, chart_name.format(period=period_label(df, year, sep="-")))
     return fig
 
-def create_bar_chart_cumulative(df, chart_name='bar_cumulative_2026'):
-    # Set up
+def create_bar_chart_cumulative(ctx, chart_name='bar_cumulative_{period}', year=None):
+    # Set up (year=None spans the data)
+    df = ctx.ts_reading
+    first, last = year_bounds(df, year)
+    df = select_year(df, year)
     fig, ax = plt.subplots(figsize=(17.5, 5))
     ax.plot(
         df["date_est"],
@@ -128,22 +341,18 @@ def create_bar_chart_cumulative(df, chart_name='bar_cumulative_2026'):
     )
     # Axes
     ax.set_ylabel("Total Pages Read")
-    ax.xaxis.set_major_locator(mdates.MonthLocator())
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%b"))
-    ax.set_xlim(
-        pd.Timestamp("2026-01-01"),
-        pd.Timestamp("2026-12-31")
-    )
+    format_date_axis(ax, first, last)
     # Legend
     ax.legend(frameon=False)
-    ax.set_title("Cumulative Reading vs. Goal (2026)")
+    ax.set_title(f"Cumulative Reading vs. Goal ({period_label(df, year)})")
     # Layout
     fig.tight_layout()
     if chart_name: 
-        output_fig(fig, chart_name)
+        output_fig(fig, chart_name.format(period=period_label(df, year, sep="-")))
     return fig 
 
-def create_pie_chart_pages(df, to_date, chart_name='pie_dow_pages_2026'):
+def create_pie_chart_pages(ctx, chart_name='pie_dow_pages_{period}', year=None):
+    df, to_date = select_year(ctx.ts_reading, year), ctx.to_date
     dow_pages = (
         df[df["date_est"] < to_date]
         .assign(dow=lambda d: d["date_est"].dt.day_name())
@@ -166,13 +375,14 @@ def create_pie_chart_pages(df, to_date, chart_name='pie_dow_pages_2026'):
         startangle=90
     )
     # Plot
-    ax.set_title("Share of Pages Read by Day of Week (2026 YTD)")
+    ax.set_title(f"Share of Pages Read by Day of Week ({period_title(df, year, to_date)})")
     # Output
     if chart_name: 
-        output_fig(fig, chart_name)
+        output_fig(fig, chart_name.format(period=period_label(df, year, sep="-")))
     return fig 
 
-def create_pie_chart_dowfreq(df, to_date, chart_name='pie_dow_freq_2026'):
+def create_pie_chart_dowfreq(ctx, chart_name='pie_dow_freq_{period}', year=None):
+    df, to_date = select_year(ctx.ts_reading, year), ctx.to_date
     dow_days = (
     df[df["date_est"] < to_date]
     .assign(
@@ -199,83 +409,56 @@ def create_pie_chart_dowfreq(df, to_date, chart_name='pie_dow_freq_2026'):
         startangle=90
     )
     # Plot
-    ax.set_title("Which Days You Read (Non-Zero Days, 2026 YTD)")
+    ax.set_title(f"Which Days You Read (Non-Zero Days, {period_title(df, year, to_date)})")
     # Output
     if chart_name: 
-        output_fig(fig, chart_name)
+        output_fig(fig, chart_name.format(period=period_label(df, year, sep="-")))
     return fig 
 
-def create_heatmap_streak(df, to_date, chart_name='heatmap_ytd_2026'):
-    # Calculate streak/day
-    df["read_flag"] = df["my_reading"] > 0
-    df["streak"] = 0
-    current_streak = 0
-    for i, row in df.iterrows(): # TODO: Not scalable beyond 1 year most likely...? Could lag. Is there a better way? 
-        if row["read_flag"]:
-            current_streak += 1
-        else:
-            current_streak = 0
-        df.at[i, "streak"] = current_streak
-    # Build grid
-    df["week"] = df["date_est"].dt.isocalendar().week
-    df["dow"] = df["date_est"].dt.weekday  # Monday = 0 index
-    pivot = df.pivot(
-        index="dow",
-        columns="week",
-        values="streak"
-    )
-    # Mask future dates
-    future_mask = df["date_est"] > to_date
-    for _, r in df[future_mask].iterrows():
-        pivot.loc[r["dow"], r["week"]] = -1
-    # Custom colormap
-    cmap = LinearSegmentedColormap.from_list(
-        "streaks",
-        [ABSENT_COLOR, MY_COLOR]
-        )
+def create_heatmap_streak(ctx, chart_name='heatmap_ytd_{period}', year=None):
+    # Calculate streak/day over the whole series, so a streak runs on across New Year (streak_utils.py)
+    to_date = ctx.to_date
+    per_day = streak_stats(ctx.ts_reading.set_index("date_est")["my_reading"], as_of=to_date)["per_day"]
+    year = year if year is not None else ctx.years[-1] # Default: latest year in the data
+    grid, month_columns = calendar_grid(per_day, year, to_date)
     # Plot
     fig, ax = plt.subplots(figsize=(18, 4))
-    sns.heatmap(
-        pivot,
-        cmap=cmap,
-        cbar=True,
-        linewidths=0.2,
-        linecolor=ABSENT_COLOR,
-        ax=ax
-    )
-    # Set up axes and labels
-    ax.set_yticks(range(7))
-    ax.set_yticklabels(
-        ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
-        rotation=0
-    )
-    ax.set_title("Reading Streaks — 2026")
-    ax.set_xlabel("Week of Year")
-    ax.set_ylabel("")
+    mesh = draw_calendar(ax, grid, month_columns, streak_cmap(), np.nanmax(grid))
+    fig.colorbar(mesh, ax=ax, fraction=0.02, pad=0.01)
+    ax.set_title(f"Reading Streaks — {year}")
     # Layout
     fig.tight_layout()
     # Output
     if chart_name: 
-        output_fig(fig, chart_name)
+        output_fig(fig, chart_name.format(period=year))
     return fig 
 
-def create_height_stack(reference_simple=False, overlay_image=False, chart_name='height_stack_ytd'):
-    # Set connection and query for book data
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql(
-        """
-        SELECT title, height, length
-        FROM books
-        WHERE status = 'completed'
-          AND height IS NOT NULL
-        ORDER BY created_on ASC
-        """, # First-read books go at bottom; length = length at spine
-        conn,
-    )
-    conn.close()
+def create_heatmap_streak_years(ctx, chart_name='heatmap_streak_years', years=None):
+    """Small multiples: one calendar panel per year (default: every year in the data), on a shared color scale."""
+    to_date = ctx.to_date
+    per_day = streak_stats(ctx.ts_reading.set_index("date_est")["my_reading"], as_of=to_date)["per_day"]
+    years = years or ctx.years
+    grids = [calendar_grid(per_day, year, to_date) for year in years]
+    vmax = max(np.nanmax(grid) for grid, _ in grids)
+    cmap = streak_cmap()
+    # One row per year
+    fig, axes = plt.subplots(len(years), 1, figsize=(18, 1.9 * len(years) + 0.8), squeeze=False)
+    for ax, year, (grid, month_columns) in zip(axes[:, 0], years, grids):
+        mesh = draw_calendar(ax, grid, month_columns, cmap, vmax)
+        ax.set_ylabel(str(year), rotation=0, ha="right", va="center", fontsize=14)
+    fig.colorbar(mesh, ax=axes[:, 0].tolist(), fraction=0.02, pad=0.01)
+    axes[0, 0].set_title(f"Reading Streaks — {years[0]}–{years[-1]}" if len(years) > 1 else f"Reading Streaks — {years[0]}")
+    # Output
+    if chart_name:
+        output_fig(fig, chart_name)
+    return fig
+
+def create_height_stack(ctx, reference_simple=False, overlay_image=False, chart_name='height_stack_ytd'):
+    # Completed books with a height; first-read books go at bottom; length = length at spine
+    df = ctx.completed_books.dropna(subset=["height"])
     # Just in case something is wrong with 'height' column
     if df.empty:
-        raise ValueError("No completed books with height found.")
+        raise NoChartData("No completed books with height found.")
     # Set reference height (fixed)
     reference_height, reference_width = MY_HEIGHT, MY_HEAD_HEIGHT*1.25
     # Set up figure
@@ -379,8 +562,9 @@ def create_height_stack(reference_simple=False, overlay_image=False, chart_name=
         output_fig(fig, chart_name)
     return fig
 
-def create_histogram_pages_per_day(df, chart_name='hist_pages_per_day'):
+def create_histogram_pages_per_day(ctx, chart_name='hist_pages_per_day', year=None):
     """Histogram of pages read per day with goal line."""
+    df = select_year(ctx.ts_reading, year)
     fig, ax = plt.subplots(figsize=(12, 6))
     
     # Histogram
@@ -403,42 +587,30 @@ def create_histogram_pages_per_day(df, chart_name='hist_pages_per_day'):
         output_fig(fig, chart_name)
     return fig
 
-def create_pie_zero_nonzero_days(df, chart_name='pie_zero_nonzero_days'):
-    """Pie chart of Zero vs Non-Zero reading days year-to-date."""
-    today = pd.Timestamp.today().normalize()
-    df_2026 = df[df["date_est"].dt.year == 2026].copy()
+def create_pie_zero_nonzero_days(ctx, chart_name='pie_zero_nonzero_days', year=None):
+    """Pie chart of Zero vs Non-Zero reading days in `year` (default: all data), before the context's to_date."""
+    df, to_date = select_year(ctx.ts_reading, year), ctx.to_date
+    title = f"Zero vs Non-Zero Reading Days ({period_title(df, year, to_date)})"
+    df = df[df["date_est"] < to_date] # Days still ahead aren't zero days
     counts = [
-        (df_2026['my_reading'] == 0).sum(),
-        (df_2026['my_reading'] > 0).sum()
+        (df['my_reading'] == 0).sum(),
+        (df['my_reading'] > 0).sum()
     ]
     labels = ["Zero Days", "Non-Zero Days"]
     colors = [ABSENT_COLOR, MY_COLOR]
     
     fig, ax = plt.subplots(figsize=(6, 6))
     ax.pie(counts, labels=labels, autopct="%1.1f%%", startangle=90, colors=colors)
-    ax.set_title("Zero vs Non-Zero Reading Days (YTD)")
+    ax.set_title(title)
     
     fig.tight_layout()
     if chart_name:
         output_fig(fig, chart_name)
     return fig
 
-def create_bar_book_velocity(db_path=DB_PATH, chart_name='bar_book_velocity'):
+def create_bar_book_velocity(ctx, chart_name='bar_book_velocity'):
     """Bar chart showing book reading velocity (pages/day)."""
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        """
-        SELECT title, total_pages, 
-               JULIANDAY(date_ended) - JULIANDAY(date_began) AS days_taken
-        FROM books
-        WHERE status='completed'
-          AND total_pages IS NOT NULL
-          AND date_began IS NOT NULL
-          AND date_ended IS NOT NULL
-        """,
-        conn
-    )
-    conn.close()
+    df = ctx.completed_books.dropna(subset=["total_pages", "days_taken"])
     
     # Avoid division by zero
     df = df[df['days_taken'] > 0].copy()
@@ -458,14 +630,9 @@ def create_bar_book_velocity(db_path=DB_PATH, chart_name='bar_book_velocity'):
         output_fig(fig, chart_name)
     return fig
 
-def create_hist_total_pages_completed(db_path=DB_PATH, chart_name='hist_total_pages'):
+def create_hist_total_pages_completed(ctx, chart_name='hist_total_pages'):
     """Histogram of total_pages for completed books."""
-    conn = sqlite3.connect(db_path)
-    df = pd.read_sql(
-        "SELECT total_pages FROM books WHERE status='completed' AND total_pages IS NOT NULL",
-        conn
-    )
-    conn.close()
+    df = ctx.completed_books.dropna(subset=["total_pages"])
     
     fig, ax = plt.subplots(figsize=(12, 6))
     ax.hist(df['total_pages'], bins=range(0, int(df['total_pages'].max())+50, 50),
@@ -480,29 +647,23 @@ def create_hist_total_pages_completed(db_path=DB_PATH, chart_name='hist_total_pa
         output_fig(fig, chart_name)
     return fig
 
-def create_bar_books_by_year(chart_name="bar_books_by_year"):
-    """Bar chart counting number of books per year_published, covering 1780–2025."""
-    # Connect
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql(
-        """
-        SELECT year_published
-        FROM books
-        WHERE year_published IS NOT NULL
-        """,
-        conn
-    )
-    conn.close()
+def create_bar_books_by_year(ctx, chart_name="bar_books_by_year", first_year=None, last_year=None):
+    """Bar chart counting number of books per year_published, from the decade of the oldest book (or first_year)
+    to the newest (or last_year)."""
+    df = ctx.publication_years
 
     if df.empty:
-        raise ValueError("No books with year_published found.")
+        raise NoChartData("No books with year_published found.")
 
-    # Count books per year
-    counts = df.groupby("year_published").size()
+    # Count books per year (year_published is stored as text)
+    years = pd.to_numeric(df["year_published"], errors="coerce").dropna().astype(int)
+    counts = years.value_counts()
+    first_year = first_year if first_year is not None else years.min() // 10 * 10
+    last_year = last_year if last_year is not None else years.max()
 
-    # Ensure all years 1780–2025 are present
-    all_years = pd.Series(0, index=range(1780, 2026))
-    counts = all_years.add(counts, fill_value=0).astype(int)
+    # Ensure all years in range are present
+    all_years = pd.Series(0, index=range(first_year, last_year + 1))
+    counts = all_years.add(counts, fill_value=0).loc[first_year:last_year].astype(int)
     x_vals = list(counts.index.astype(int))
     y_vals = counts.values
     
@@ -511,10 +672,11 @@ def create_bar_books_by_year(chart_name="bar_books_by_year"):
     ax.bar(x_vals, y_vals, color=MY_COLOR, alpha=0.7)
     ax.set_xlabel("Year Published")
     ax.set_ylabel("Number of Books")
-    ax.set_title("Books Published per Year (1780–2025)")
+    ax.set_title(f"Books Published per Year ({first_year}–{last_year})")
 
-    # X-ticks: show every 10 years to avoid clutter
-    xticks = range(1780, 2026, 10)
+    # X-ticks: every 10 years (wider steps for long ranges) to avoid clutter
+    step = max(10, -(-(last_year - first_year) // 250) * 10)
+    xticks = range(first_year, last_year + 1, step)
     ax.set_xticks(xticks)
     ax.set_xticklabels([str(y) for y in xticks], rotation=45, ha="right")
 
@@ -525,53 +687,43 @@ def create_bar_books_by_year(chart_name="bar_books_by_year"):
     return fig
 
 # Map visuals
-def create_map_authors_country(chart_name="map_authors_birth_country"):
-    """Folium map with a pin per author based on birth_country. Add tooltip: first_name, last_name, birth_year."""
-    # Load authors with birth_country
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql(
-        """
-        SELECT first_name, last_name, birth_year, birth_country
-        FROM authors
-        WHERE birth_country IS NOT NULL
-        """,
-        conn
-    )
-    conn.close()
+def load_author_locations(authors, jitter_deg=MAP_JITTER_DEG, seed=0):
+    """Authors (VisualContext.authors) with a map position: birth place coordinates where known, else their birth
+    country's centroid spread by a random offset (vectorised; seeded, so the output is stable between runs) so
+    pins don't stack."""
+    df = authors.copy()
+    # One centroid lookup per distinct country (country_utils.py, offline)
+    centroids = {c: country_centroid(c) for c in df["birth_country"].unique()}
+    base = np.array([centroids[c] or (np.nan, np.nan) for c in df["birth_country"]], dtype=float).reshape(-1, 2)
+    # Uniform in a disc around the centroid
+    rng = np.random.default_rng(seed)
+    radius = jitter_deg * np.sqrt(rng.random(len(df)))
+    angle = rng.uniform(0, 2 * np.pi, len(df))
+    jittered = base + np.column_stack([radius * np.sin(angle), radius * np.cos(angle)])
+    known = df[["birth_lat", "birth_lon"]].notna().all(axis=1).to_numpy()
+    df["lat"] = np.where(known, df["birth_lat"], jittered[:, 0])
+    df["lon"] = np.where(known, df["birth_lon"], jittered[:, 1])
+    return df.dropna(subset=["lat", "lon"])
 
+def create_map_authors_country(ctx, chart_name="map_authors_birth_country", fast=True):
+    """Folium map with a pin per author based on birth place/country. Add tooltip: first_name, last_name, birth_year.
+    fast=True sends every pin in one data array to a client-side cluster layer (FastMarkerCluster), instead of
+    one Marker object (and JS block) per author."""
+    df = load_author_locations(ctx.authors)
     if df.empty:
-        raise ValueError("No authors with birth_country found.")
-    
-    # Approximate lat/lon using a simple country lookup
-    import geopy
-    from geopy.geocoders import Nominatim
-    geolocator = Nominatim(user_agent="my_reading_map")
+        raise NoChartData("No authors with birth_country found.")
+    tooltips = df["first_name"].fillna("") + " " + df["last_name"].fillna("") + ", " + df["birth_year"].astype("Int64").astype("string").fillna("?")
     
     # Create folium map centered roughly
     fmap = folium.Map(location=[20,0], zoom_start=2)
-    cluster = MarkerCluster().add_to(fmap)
-    
-    country_cache = {}
-    
-    for _, row in df.iterrows():
-        country = row["birth_country"]
-        tooltip = f"{row['first_name']} {row['last_name']}, {row['birth_year']}"
-        
-        # Geocode country (with caching)
-        if country not in country_cache:
-            try:
-                loc = geolocator.geocode(country)
-                if loc:
-                    country_cache[country] = (loc.latitude, loc.longitude)
-                else:
-                    country_cache[country] = None
-            except Exception:
-                country_cache[country] = None
-        
-        coords = country_cache.get(country)
-        if coords:
+    if fast:
+        data = np.column_stack([df["lat"].round(5), df["lon"].round(5), tooltips]).tolist()
+        FastMarkerCluster(data, callback=FAST_MARKER_CALLBACK).add_to(fmap)
+    else:
+        cluster = MarkerCluster().add_to(fmap)
+        for lat, lon, tooltip in zip(df["lat"], df["lon"], tooltips):
             folium.Marker(
-                location=coords,
+                location=(lat, lon),
                 tooltip=tooltip,
                 icon=folium.Icon(color="blue", icon="user")
             ).add_to(cluster)
@@ -579,35 +731,170 @@ def create_map_authors_country(chart_name="map_authors_birth_country"):
     # Save as HTML
     out_path = (VIS_DIR / f"{chart_name}.html").with_suffix("")
     fmap.save(f"{out_path}.html")
+    OUTPUT_FILES.append(f"{out_path.name}.html")
     return fmap
 
 
-def main():
+def create_choropleth_maps(ctx):
+    """Plotly choropleths (create_maps.py, which runs its own per-map count queries), as one render job."""
+    from create_maps import render_maps # plotly only needed for the maps
+    return render_maps(db_path=ctx.db_path)
+
+## Render scheduling (independent charts across a process pool)
+def init_worker(formats=VIS_FORMATS, dpi=VIS_DPI):
+    """Pool initializer: Agg backend, seaborn theme, output settings and a warm font cache, paid once per worker
+    rather than per chart."""
+    plt.switch_backend("Agg")
+    sns.set_theme(style="whitegrid")
+    OUTPUT.update(formats=tuple(formats), dpi=dpi)
+    fig, ax = plt.subplots()
+    ax.set_title("warm-up") # Resolves and caches fonts
+    fig.canvas.draw()
+    plt.close(fig)
+
+def render_job(job):
+    """Worker: run one (name, function, args, kwargs, ...) job and close its figures.
+    Returns (name, seconds, error, files written, no-data message)."""
+    name, function, args, kwargs = job[:4]
+    start = time.perf_counter()
+    error = no_data = None
+    OUTPUT_FILES.clear()
+    try:
+        function(*args, **kwargs)
+    except NoChartData as e: # Expected until the data exists; not a failure
+        no_data = str(e)
+    except Exception as e: # Recorded rather than raised, so one broken chart doesn't stop the rest
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        plt.close("all")
+    return name, time.perf_counter() - start, error, sorted(OUTPUT_FILES), no_data
+
+def render_charts(jobs, workers=None, formats=VIS_FORMATS, dpi=VIS_DPI):
+    """Run chart jobs across a process pool; workers=1 runs inline. Frames in a job's args are pickled to its
+    worker, and each chart function writes its own output. Returns {name: (seconds, error, files, no-data
+    message)}, printing each as it finishes."""
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+    start = time.perf_counter()
+    results = {}
+    def report(result):
+        name, seconds, error, files, no_data = result
+        results[name] = (seconds, error, files, no_data)
+        note = f" (failed: {error})" if error else f" (no data: {no_data})" if no_data else ""
+        print(f"{name}: {seconds:.2f} s{note}")
+    if not jobs:
+        return results
+    if workers == 1:
+        init_worker(formats, dpi)
+        for job in jobs:
+            report(render_job(job))
+    else:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(formats, dpi)) as pool:
+            for future in as_completed([pool.submit(render_job, job) for job in jobs]):
+                report(future.result())
+    print(f"Rendered {len(jobs)} jobs on {workers} worker(s) in {time.perf_counter() - start:.2f} s.")
+    return results
+
+## Render cache (content-addressed: a chart is redrawn only when something it depends on changes)
+def style_constants():
+    """Everything outside the data that changes how a chart looks: colors and sizes, the code in STYLE_SOURCES and
+    the plotting library versions."""
+    return [
+        MY_COLOR, GOAL_COLOR, ABSENT_COLOR, DOW_COLORS, MAX_PAGES_PER_DAY, MY_HEIGHT, HUMAN_PROPORTIONS,
+        LEGEND_MAX_CHARS, MAP_JITTER_DEG, SVG_HASHSALT,
+        *(hashlib.sha256(path.read_bytes()).hexdigest() for path in STYLE_SOURCES),
+        matplotlib.__version__, sns.__version__,
+    ]
+
+def render_key(ctx, job, formats, dpi):
+    """Hash of a job's inputs (the context frames it declares), its function and parameters, the output formats
+    and the style constants. None for jobs that declare no inputs, or an input not known yet (always rendered)."""
+    name, function, args, kwargs, inputs = job
+    if inputs is None:
+        return None
+    fingerprints = {i: ctx.fingerprint(i) for i in inputs}
+    if None in fingerprints.values():
+        return None
+    payload = {
+        "inputs": fingerprints,
+        "function": function.__name__,
+        "params": kwargs,
+        "output": [list(formats), dpi],
+        "style": style_constants(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def chart_jobs(ctx, year):
+    """(name, function, args, kwargs, inputs) for every chart, slowest first so long jobs don't start last.
+    inputs names the VisualContext attributes a chart reads (its render key); None renders every time."""
+    return [
+        ("maps", create_choropleth_maps, (ctx,), {}, ("map_key",)), # Per-map skipping is create_maps.py's own manifest
+        ("heatmap_streak_years", create_heatmap_streak_years, (ctx,), {}, ("ts_reading", "to_date")),
+        ("bar_cumulative", create_bar_chart_cumulative, (ctx,), {"year": year}, ("ts_reading",)),
+        ("bar_daily", create_bar_chart_discrete, (ctx,), {"year": year}, ("ts_reading",)),
+        ("bar_books_by_year", create_bar_books_by_year, (ctx,), {}, ("publication_years",)),
+        ("heatmap_streak", create_heatmap_streak, (ctx,), {"year": year}, ("ts_reading", "to_date")),
+        ("height_stack", create_height_stack, (ctx,), {}, ("completed_books",)),
+        ("bar_book_velocity", create_bar_book_velocity, (ctx,), {}, ("completed_books",)),
+        ("hist_total_pages", create_hist_total_pages_completed, (ctx,), {}, ("completed_books",)),
+        ("hist_pages_per_day", create_histogram_pages_per_day, (ctx,), {"year": year}, ("ts_reading",)),
+        ("pie_dow_pages", create_pie_chart_pages, (ctx,), {"year": year}, ("ts_reading", "to_date")),
+        ("pie_dow_freq", create_pie_chart_dowfreq, (ctx,), {"year": year}, ("ts_reading", "to_date")),
+        ("pie_zero_nonzero_days", create_pie_zero_nonzero_days, (ctx,), {"year": year}, ("ts_reading", "to_date")),
+        ("map_authors_birth_country", create_map_authors_country, (ctx,), {}, ("authors",)),
+    ]
+
+def main(names=None, workers=None, db_path=DB_PATH, force=False, formats=VIS_FORMATS, dpi=VIS_DPI):
     # Load theme
     sns.set_theme(style="whitegrid")
-    ## Setup graphics plot
-    df = load_ts_reading(DB_PATH)
-    # Ensure full 2026 calendar alignment
-    df = df.sort_values("date_est")
-    df["date_est"] = pd.to_datetime(df["date_est"])
-    df_2026 = df[df["date_est"].dt.year == 2026].copy()
-    today = pd.Timestamp.today().normalize() # NOTE: normalize() is good practice for handling date/datetimes (revisit)
+    ## Setup graphics data: one query per dataset, shipped to the render workers already loaded
+    ctx = VisualContext(db_path).preload()
+    print(f"Loaded visual data ({ctx.queries} queries).")
+    year = ctx.years[-1] # Latest calendar year (see CALENDAR_START/CALENDAR_END)
+    jobs = chart_jobs(ctx, year)
+    unknown = set(names or ()) - {job[0] for job in jobs}
+    if unknown:
+        raise ValueError(f"Unknown chart(s): {', '.join(sorted(unknown))}")
+    # Skip charts whose key matches the manifest and whose files are all still there. HTML outputs aren't
+    # committed (see visualize_log.yml), so a fresh checkout lacking them is no reason to render again
+    manifest_path = VIS_DIR / VIS_MANIFEST_PATH.name
+    manifest = load_manifest(manifest_path)
+    keys, pending = {}, []
+    for job in jobs:
+        if names and job[0] not in names:
+            continue
+        keys[job[0]] = render_key(ctx, job, formats, dpi)
+        entry = manifest.get(job[0], {})
+        current = keys[job[0]] is not None and entry.get("key") == keys[job[0]]
+        if force or not current or not all((VIS_DIR / f).exists() for f in entry.get("files", []) if not f.endswith(".html")):
+            pending.append(job)
+    print(f"{len(keys) - len(pending)} charts unchanged; rendering {len(pending)}.")
     # Run plotting functions
     print("begin creating graphics")
-    # f1 = create_bar_chart_discrete(df_2026)
-    f2 = create_bar_chart_cumulative(df_2026)
-    # f3 = create_pie_chart_pages(df_2026, today)
-    # f4 = create_pie_chart_dowfreq(df_2026, today)
-    # f5 = create_heatmap_streak(df_2026, today)
-    # f6 = create_height_stack()
-    # f7 = create_histogram_pages_per_day(df_2026)
-    # f8 = create_pie_zero_nonzero_days(df_2026)
-    # f9 = create_bar_book_velocity()
-    # f10 = create_hist_total_pages_completed()
-    f11 = create_bar_books_by_year()
-    # m1 = create_map_authors_country()
+    results = render_charts(pending, workers, formats, dpi)
+    for name, (seconds, error, files, no_data) in results.items():
+        if keys[name] is not None and not error:
+            manifest[name] = {"key": keys[name], "files": files}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
     # TODO: Create GridSpec dashboard with these figs
-    plt.close('all')
-    
+    return results
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Render charts and maps into visuals/.")
+    parser.add_argument("names", nargs="*", help="Charts to render (default: all; see chart_jobs)")
+    parser.add_argument("--workers", type=int, help="Render processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Render even if a chart's inputs are unchanged")
+    parser.add_argument("--formats", nargs="+", default=list(VIS_FORMATS), help="Output formats, e.g. svg png pdf")
+    parser.add_argument("--dpi", type=int, default=VIS_DPI, help="Resolution of raster formats")
+    args = parser.parse_args()
+    results = main(args.names or None, args.workers, force=args.force, formats=tuple(args.formats), dpi=args.dpi)
+    failed = sorted(name for name, (_, error, _, _) in results.items() if error)
+    if failed:
+        sys.exit(f"Failed to render: {', '.join(failed)}")
@@ -0,0 +1,270 @@
+'''Offline country geometry: a country -> (lat, lon) centroid table and a compact topology for choropleths,
+both derived once from the ADM0 GeoJSON, persisted next to the other local caches and rebuilt only when
+the GeoJSON changes.'''
+import hashlib, json, os, sys
+
+import numpy as np
+
+from functools import lru_cache
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+
+TOPOLOGY_VERSION = 2 # Bump to invalidate cached topologies (e.g. quantisation changes)
+
+# Functions
+def ring_centroid(ring):
+    '''(area, lon, lat) of one polygon ring by the shoelace formula (planar lon/lat; fine for pin placement).'''
+    xy = np.asarray(ring, dtype=float)[:, :2]
+    x, y = xy[:, 0], xy[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area = cross.sum() / 2
+    if area == 0: # Degenerate sliver; fall back to the vertex mean
+        return 0.0, x.mean(), y.mean()
+    return abs(area), ((x + x1) * cross).sum() / (6 * area), ((y + y1) * cross).sum() / (6 * area)
+
+def feature_centroid(geometry):
+    '''(lat, lon) of a Polygon/MultiPolygon: the centroid of its largest part, so overseas territories
+    don't pull the pin into the sea (e.g. France, United States).'''
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    area, lon, lat = max(ring_centroid(polygon[0]) for polygon in polygons) # Exterior rings only
+    return round(float(lat), 4), round(float(lon), 4)
+
+def file_hash(path, cache_path=FILE_HASHES_PATH):
+    '''sha256 of a file, remembered against its (mtime, size): a file that hasn't changed is never read again.'''
+    stat = os.stat(path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    key = str(Path(path).resolve())
+    try:
+        with open(cache_path) as f:
+            hashes = json.load(f)
+    except (OSError, ValueError):
+        hashes = {}
+    if hashes.get(key, [None])[:2] == stamp:
+        return hashes[key][2]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    hashes[key] = stamp + [digest]
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump(hashes, f, indent=0, sort_keys=True)
+    return digest
+
+def build_country_centroids(geojson_path=ADM0_GEOJSON_PATH, cache_path=COUNTRY_CENTROIDS_PATH):
+    '''Compute {shapeName: [lat, lon, shapeGroup]} from the GeoJSON and persist it with the source hash.'''
+    with open(geojson_path) as f:
+        geojson = json.load(f)
+    centroids = {
+        feature["properties"]["shapeName"]: [*feature_centroid(feature["geometry"]), feature["properties"].get("shapeGroup")]
+        for feature in geojson["features"]
+    }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump({"source_hash": file_hash(geojson_path), "centroids": centroids}, f, indent=0, sort_keys=True)
+    print(f"Built {len(centroids)} country centroids into {cache_path}.")
+    return centroids
+
+@lru_cache(maxsize=None)
+def load_country_table(geojson_path=ADM0_GEOJSON_PATH, cache_path=COUNTRY_CENTROIDS_PATH):
+    '''{shapeName: [lat, lon, shapeGroup]} from the persisted file, rebuilding it first if missing or stale.'''
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("source_hash") == file_hash(geojson_path):
+            return cached["centroids"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_country_centroids(geojson_path, cache_path)
+
+@lru_cache(maxsize=None)
+def load_country_centroids(geojson_path=ADM0_GEOJSON_PATH, cache_path=COUNTRY_CENTROIDS_PATH):
+    '''{ISO3: (lat, lon)}; resolve free-text names with country_utils.resolve_iso3.'''
+    return {iso3: (lat, lon) for lat, lon, iso3 in load_country_table(geojson_path, cache_path).values() if iso3}
+
+## Topology cache (for choropleths)
+def grid_ring(xy):
+    '''Integer grid ring as a list of points: consecutive duplicates and the closing point dropped; None if it
+    collapses to fewer than 3 distinct points.'''
+    keep = np.ones(len(xy), dtype=bool)
+    keep[1:] = (xy[1:] != xy[:-1]).any(axis=1)
+    points = [tuple(p) for p in xy[keep].tolist()]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points if len(set(points)) >= 3 else None
+
+def snap_polygons(polygons):
+    '''Repair polygons (rings of integer grid points) that rounding left invalid: self-intersecting rings, or
+    parts of a MultiPolygon now overlapping. make_valid splits them into valid pieces and set_precision snaps
+    any new intersection points back onto the grid (other vertices stay put, so shared borders still match).
+    Exteriors come back clockwise and holes counter-clockwise, like the source.'''
+    import shapely # Only needed to build the topology
+    geometry = shapely.MultiPolygon([(rings[0], rings[1:]) for rings in polygons])
+    snapped = shapely.set_precision(shapely.make_valid(geometry), 1.0)
+    repaired = []
+    for part in shapely.get_parts(shapely.get_parts(snapped)): # Collection -> MultiPolygon -> Polygon
+        if part.geom_type != "Polygon" or part.is_empty: # Collapsed slivers come back as lines or points
+            continue
+        part = shapely.geometry.polygon.orient(part, sign=-1.0)
+        rings = [grid_ring(np.rint(np.asarray(r.coords)).astype(np.int64)) for r in [part.exterior, *part.interiors]]
+        if rings[0]:
+            repaired.append([rings[0]] + [r for r in rings[1:] if r])
+    return repaired
+
+def quantize_rings(geometry, translate, scale):
+    '''Polygons of a Polygon/MultiPolygon as lists of rings of integer grid points (closing point dropped,
+    consecutive duplicates removed); rings that collapse to fewer than 3 points are dropped. If rounding leaves
+    the geometry invalid it is repaired on the grid (snap_polygons).'''
+    import shapely
+    polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+    quantized = []
+    for polygon in polygons:
+        rings = [grid_ring(np.rint((np.asarray(ring, dtype=float)[:, :2] - translate) / scale).astype(np.int64)) for ring in polygon]
+        if rings and rings[0]:
+            quantized.append([rings[0]] + [r for r in rings[1:] if r])
+    if quantized and not shapely.MultiPolygon([(rings[0], rings[1:]) for rings in quantized]).is_valid:
+        quantized = snap_polygons(quantized)
+    return quantized
+
+def find_junctions(all_rings):
+    '''Points where rings meet or part: seen more than once with different neighbours.'''
+    neighbours, junctions = {}, set()
+    for ring in all_rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+def split_ring(ring, junctions):
+    '''Cut a (cyclic) ring into arcs at junction points; each arc keeps both end points.'''
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+    if not cuts:
+        start = ring.index(min(ring)) # Canonical rotation, so a ring shared whole (enclaves) is stored once
+        rotated = ring[start:] + ring[:start]
+        return [rotated + rotated[:1]]
+    rotated = ring[cuts[0]:] + ring[:cuts[0]]
+    cuts = [i - cuts[0] for i in cuts] + [len(ring)]
+    rotated.append(rotated[0])
+    return [rotated[a:b + 1] for a, b in zip(cuts, cuts[1:])]
+
+def build_topology(geojson_path=ADM0_GEOJSON_PATH, remove=COUNTRIES_TO_REMOVE, quantization=GEO_QUANTIZATION):
+    '''TopoJSON-style topology of the GeoJSON without the `remove` countries: coordinates quantised to a
+    quantization x quantization grid, borders shared by neighbours stored once as delta-encoded arcs.'''
+    with open(geojson_path) as f:
+        features = [f for f in json.load(f)["features"] if f["properties"]["shapeName"] not in remove]
+    bounds = np.array([[np.inf, np.inf], [-np.inf, -np.inf]])
+    for feature in features:
+        for polygon in (feature["geometry"]["coordinates"] if feature["geometry"]["type"] == "MultiPolygon" else [feature["geometry"]["coordinates"]]):
+            xy = np.asarray(polygon[0], dtype=float)[:, :2]
+            bounds = np.array([np.minimum(bounds[0], xy.min(axis=0)), np.maximum(bounds[1], xy.max(axis=0))])
+    translate = bounds[0]
+    scale = np.where(bounds[1] > bounds[0], (bounds[1] - bounds[0]) / (quantization - 1), 1)
+    shapes = [quantize_rings(feature["geometry"], translate, scale) for feature in features]
+    junctions = find_junctions(ring for polygons in shapes for polygon in polygons for ring in polygon)
+    arcs, index = [], {}
+    def arc_id(arc):
+        key = tuple(arc)
+        if key in index:
+            return index[key]
+        if key[::-1] in index:
+            return ~index[key[::-1]]
+        if key[0] == key[-1] and len(key) > 2: # Whole closed ring: also try its canonical reversal
+            reverse = split_ring(list(key[:-1][::-1]), ())[0]
+            if tuple(reverse) in index:
+                return ~index[tuple(reverse)]
+        index[key] = len(arcs)
+        arcs.append(key)
+        return index[key]
+    geometries = []
+    for feature, polygons in zip(features, shapes):
+        geometry = {
+            "type": "MultiPolygon",
+            "properties": feature["properties"],
+            "arcs": [[[arc_id(arc) for arc in split_ring(ring, junctions)] for ring in polygon] for polygon in polygons],
+        }
+        if "id" in feature:
+            geometry["id"] = feature["id"]
+        geometries.append(geometry)
+    encoded = []
+    for arc in arcs:
+        xy = np.asarray(arc, dtype=np.int64)
+        encoded.append(np.vstack([xy[:1], np.diff(xy, axis=0)]).tolist())
+    return {
+        "type": "Topology",
+        "transform": {"scale": scale.tolist(), "translate": translate.tolist()},
+        "objects": {"countries": {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": encoded,
+    }
+
+def topology_key(geojson_path, remove, quantization):
+    '''Hash of everything the topology depends on: source file, removal list, grid size and TOPOLOGY_VERSION.'''
+    digest = hashlib.sha256()
+    digest.update(file_hash(geojson_path).encode("utf-8"))
+    digest.update(json.dumps([sorted(remove), quantization, TOPOLOGY_VERSION]).encode("utf-8"))
+    return digest.hexdigest()
+
+def topology_to_geojson(topology, decimals=GEO_DECIMALS):
+    '''Decode a topology into a GeoJSON FeatureCollection (what plotly's choropleth takes).'''
+    scale, translate = np.array(topology["transform"]["scale"]), np.array(topology["transform"]["translate"])
+    # Undo the delta encoding for all arcs in one cumsum, restarting the running sum at each arc's first point
+    lengths = np.array([len(arc) for arc in topology["arcs"]])
+    deltas = np.array([point for arc in topology["arcs"] for point in arc], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    totals = np.cumsum(deltas, axis=0)
+    offsets = np.repeat(totals[starts] - deltas[starts], lengths, axis=0)
+    flat = np.round((totals - offsets) * scale + translate, decimals).tolist()
+    arcs = [flat[a:a + n] for a, n in zip(starts.tolist(), lengths.tolist())]
+    def ring(arc_ids):
+        points = []
+        for i in arc_ids:
+            arc = arcs[i] if i >= 0 else arcs[~i][::-1]
+            points.extend(arc if not points else arc[1:])
+        return points
+    features = []
+    for geometry in topology["objects"]["countries"]["geometries"]:
+        polygons = [[ring(arc_ids) for arc_ids in polygon] for polygon in geometry["arcs"]]
+        if not polygons: # Every part collapsed on the grid
+            continue
+        feature = {
+            "type": "Feature",
+            "properties": geometry["properties"],
+            "geometry": {"type": "MultiPolygon", "coordinates": polygons} if len(polygons) > 1 else {"type": "Polygon", "coordinates": polygons[0]},
+        }
+        if "id" in geometry:
+            feature["id"] = geometry["id"]
+        features.append(feature)
+    return {"type": "FeatureCollection", "features": features}
+
+def load_country_geojson(geojson_path=ADM0_GEOJSON_PATH, cache_path=COUNTRY_TOPOLOGY_PATH, remove=COUNTRIES_TO_REMOVE, quantization=GEO_QUANTIZATION):
+    '''Filtered, quantised country GeoJSON, decoded from the cached topology (built first if missing or stale).
+    A cached load costs ~0.1 s, parsing and decoding the arcs; the source is re-hashed only if it changed.'''
+    key = topology_key(geojson_path, remove, quantization)
+    try:
+        with open(cache_path) as f:
+            topology = json.load(f)
+    except (OSError, ValueError):
+        topology = None
+    if not topology or topology.get("key") != key:
+        topology = build_topology(geojson_path, remove, quantization)
+        topology["key"] = key
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w") as f:
+            json.dump(topology, f, separators=(",", ":"))
+        print(f"Built topology ({len(topology['arcs'])} arcs) into {cache_path}.")
+    return topology_to_geojson(topology)
+
+# Execute
+if __name__ == "__main__":
+    build_country_centroids()
+    load_country_geojson()
@@ -0,0 +1,213 @@
+'''Shared HTTP helpers for outbound calls: pooled keep-alive sessions, a global rate limiter, and a persistent
+response cache (SQLite) that every session can mount.'''
+import hashlib, json, sqlite3, threading, time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from pathlib import Path
+
+CACHEABLE_METHODS = {"GET", "HEAD"}
+CACHEABLE_STATUS = {200, 203, 300, 301, 404, 410} # 404/410 too: negative caching (missing Wikipedia pages etc.)
+VARY_HEADERS = ("Accept", "Authorization") # Part of the cache key (hashed, never stored)
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"} # Body is stored decoded
+
+# Functions
+def get_session(user_agent=None, pool_size=10, cache=None, cache_ttl=0, offline=False, limiter=None):
+    '''requests.Session with a connection pool sized for pool_size concurrent workers.
+    With cache (an HttpCache), GET/HEAD responses are served from it for cache_ttl seconds, then revalidated
+    (ETag/Last-Modified) or refetched; offline=True serves only from the cache.
+    With limiter (a TokenBucket), every request that actually goes to the network takes a token first.'''
+    session = requests.Session()
+    adapter = CachingAdapter(cache, cache_ttl, offline, limiter, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    return session
+
+def cached_session(user_agent=None, pool_size=10, ttl=0, limiter=None):
+    '''get_session on the project's shared response cache (HTTP_CACHE_* in core.constants).
+    ttl=0 still helps: every hit becomes a conditional request, and a 304 reuses the stored body.'''
+    from core.constants import HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB, HTTP_CACHE_OFFLINE
+    cache = open_cache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB * 1024 * 1024)
+    return get_session(user_agent, pool_size, cache, ttl, HTTP_CACHE_OFFLINE, limiter)
+
+class TokenBucket:
+    '''Thread-safe token bucket: `rate` acquisitions per second on average, bursts of up to `capacity`.'''
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''Block until a token is available, then take it.'''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait) # Sleep outside the lock so other workers can refill/check
+
+## Response cache
+_caches = {}
+_caches_lock = threading.Lock()
+
+def open_cache(path, max_bytes):
+    '''One HttpCache per file per process, shared by all sessions and threads.'''
+    with _caches_lock:
+        key = str(path)
+        if key not in _caches:
+            _caches[key] = HttpCache(path, max_bytes)
+        return _caches[key]
+
+class HttpCache:
+    '''SQLite store of HTTP responses keyed by method + URL + VARY_HEADERS, bounded to max_bytes of bodies
+    by evicting the least recently used entries. The body total is kept as a running count (read from the table
+    on open and after each eviction), so a put doesn't sum the whole table.'''
+    def __init__(self, path, max_bytes):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None) # Autocommit
+        self.conn.execute("PRAGMA journal_mode = WAL") # Concurrent jobs can read while one writes
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                method TEXT,
+                url TEXT,
+                status INTEGER,
+                reason TEXT,
+                headers TEXT,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL,
+                expires_at REAL,
+                last_used REAL,
+                size INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+        """)
+        self.total = self.stored_bytes()
+
+    @staticmethod
+    def make_key(request):
+        parts = [request.method, request.url] + [f"{h}:{request.headers.get(h, '')}" for h in VARY_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        '''Entry dict (and mark it used), or None.'''
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT status, reason, headers, body, etag, last_modified, expires_at, url
+                FROM responses WHERE key = ?
+            """, (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return dict(zip(("status", "reason", "headers", "body", "etag", "last_modified", "expires_at", "url"), row))
+
+    def put(self, key, request, response, ttl):
+        body = response.content or b""
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROP_HEADERS}
+        now = time.time()
+        with self.lock:
+            replaced = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("""
+                INSERT OR REPLACE INTO responses
+                    (key, method, url, status, reason, headers, body, etag, last_modified, stored_at, expires_at, last_used, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, request.method, request.url, response.status_code, response.reason, json.dumps(headers), body,
+                  response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now + ttl, now, len(body)))
+            self.total += len(body) - (replaced[0] if replaced else 0)
+            if self.total > self.max_bytes:
+                self.evict()
+
+    def refresh(self, key, ttl):
+        '''Extend an entry after a 304 Not Modified.'''
+        now = time.time()
+        with self.lock:
+            self.conn.execute("UPDATE responses SET expires_at = ?, last_used = ? WHERE key = ?", (now + ttl, now, key))
+
+    def stored_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self):
+        '''Drop least recently used entries beyond max_bytes and recount the total (call with the lock held).
+        The recount also picks up entries other processes wrote to the same file.'''
+        self.conn.execute("""
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS kept
+                    FROM responses
+                ) WHERE kept > ?
+            )
+        """, (self.max_bytes,))
+        self.total = self.stored_bytes()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.total = 0
+
+class CachingAdapter(HTTPAdapter):
+    '''HTTPAdapter that answers GET/HEAD from an HttpCache (if any): fresh entries directly, stale ones by
+    conditional request (If-None-Match / If-Modified-Since). Responses from the cache have `from_cache = True`
+    and cost no rate-limit token.'''
+    def __init__(self, cache=None, ttl=0, offline=False, limiter=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttl = ttl
+        self.offline = offline
+        self.limiter = limiter
+
+    def send_to_network(self, request, **kwargs):
+        if self.limiter:
+            self.limiter.acquire()
+        return super().send(request, **kwargs)
+
+    def send(self, request, **kwargs):
+        if self.cache is None or request.method not in CACHEABLE_METHODS:
+            return self.send_to_network(request, **kwargs)
+        key = self.cache.make_key(request)
+        entry = self.cache.get(key)
+        if entry and (self.offline or entry["expires_at"] > time.time()):
+            return self.build_response_from_cache(request, entry)
+        if self.offline:
+            raise requests.ConnectionError(f"Offline: no cached response for {request.method} {request.url}", request=request)
+        if entry and entry["etag"]:
+            request.headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            request.headers["If-Modified-Since"] = entry["last_modified"]
+        response = self.send_to_network(request, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.refresh(key, self.ttl)
+            return self.build_response_from_cache(request, entry)
+        no_store = "no-store" in response.headers.get("Cache-Control", "")
+        if response.status_code in CACHEABLE_STATUS and not no_store and not kwargs.get("stream"):
+            self.cache.put(key, request, response, self.ttl)
+        response.from_cache = False
+        return response
+
+    def build_response_from_cache(self, request, entry):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(json.loads(entry["headers"]))
+        response._content = entry["body"]
+        response._content_consumed = True # No raw stream behind it
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
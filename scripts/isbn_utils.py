@@ -0,0 +1,26 @@
+'''ISBN normalisation shared by the Open Library importer and the price service: everything is keyed by ISBN-13.'''
+import re
+
+# Functions
+def clean_isbn(raw):
+    '''Digits (and a trailing X) only: "978-0-14-303998-3" -> "9780143039983".'''
+    return re.sub(r"[^0-9X]", "", (raw or "").upper())
+
+def isbn13_check_digit(first12):
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+def isbn10_is_valid(isbn10):
+    if not re.fullmatch(r"\d{9}[\dX]", isbn10):
+        return False
+    total = sum((10 - i) * (10 if c == "X" else int(c)) for i, c in enumerate(isbn10))
+    return total % 11 == 0
+
+def to_isbn13(raw):
+    '''Valid ISBN-13 for an ISBN-10 or ISBN-13 in any formatting, or None.'''
+    isbn = clean_isbn(raw)
+    if len(isbn) == 10 and isbn10_is_valid(isbn):
+        return "978" + isbn[:9] + isbn13_check_digit("978" + isbn[:9])
+    if len(isbn) == 13 and isbn.isdigit() and isbn13_check_digit(isbn[:12]) == isbn[12]:
+        return isbn
+    return None
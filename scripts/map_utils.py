@@ -1,11 +1,119 @@
-'''Utilities for manipulating shapefiles, mapping actions, etc..'''
+'''Utilities for manipulating shapefiles, mapping actions, etc..
+Builds GeoJSON from the geoBoundaries CGAZ shapefiles at each level (ADM0 countries, ADM1 states/provinces)
+and level of detail (simplification tolerance). Simplification runs in chunks across a process pool, and a
+build is skipped when its output was made from the same source files with the same settings.
+Usage:
+    python scripts/map_utils.py --level adm0 adm1 --lod low medium high [--workers N] [--force]'''
+import argparse, hashlib, json, os, sys
+
 import geopandas as gpd
+import shapely
 
-def create_geojson(shapefile_path, output_json_path):
+from concurrent.futures import ProcessPoolExecutor
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg") # Colocated files a shapefile is read from
+BUILD_VERSION = 1 # Bump to invalidate every cached build (e.g. output format change)
+
+# Functions
+## Paths
+def shapefile_for(level):
+    return {"adm0": ADM0_SHAPEFILE_PATH, "adm1": ADM1_SHAPEFILE_PATH}[level]
+
+def geojson_for(level, lod=GEO_DEFAULT_LOD):
+    '''Output path: the default LOD keeps the long-standing ADM*_GEOJSON_PATH names, others get a suffix.'''
+    base = {"adm0": ADM0_GEOJSON_PATH, "adm1": ADM1_GEOJSON_PATH}[level]
+    return base if lod == GEO_DEFAULT_LOD else base.with_name(f"{base.stem}_{lod}{base.suffix}")
+
+def meta_path(output_path):
+    return Path(output_path).with_suffix(".meta.json")
+
+## Cache check
+def build_key(shapefile_path, tolerance):
+    '''Hash of the shapefile (all colocated parts), the tolerance and BUILD_VERSION.'''
+    digest = hashlib.sha256(json.dumps([BUILD_VERSION, tolerance]).encode("utf-8"))
+    for suffix in SHAPEFILE_PARTS:
+        part = Path(shapefile_path).with_suffix(suffix)
+        if part.exists():
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()
+
+def is_current(output_path, key):
+    '''True when output_path exists and its sidecar records the same build key.'''
+    try:
+        with open(meta_path(output_path)) as f:
+            return Path(output_path).exists() and json.load(f).get("key") == key
+    except (OSError, ValueError):
+        return False
+
+## Simplification
+def simplify_chunk(args):
+    '''Worker: simplify a chunk of WKB geometries (WKB pickles compactly and loads fast).'''
+    wkbs, tolerance = args
+    geometries = shapely.simplify(shapely.from_wkb(wkbs), tolerance, preserve_topology=True) # Vectorised over the chunk
+    return list(shapely.to_wkb(geometries))
+
+def simplify_geometries(geometries, tolerance, workers=None, chunk_size=GEO_SIMPLIFY_CHUNK_SIZE):
+    '''Simplified copies of shapely geometries, in order. Chunks are small so large geometries (Russia,
+    Canada) don't leave other workers idle; workers=1 runs inline.'''
+    wkbs = list(shapely.to_wkb(geometries))
+    chunks = [(wkbs[i:i + chunk_size], tolerance) for i in range(0, len(wkbs), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks)) or 1
+    if workers == 1:
+        results = map(simplify_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(simplify_chunk, chunks))
+    return shapely.from_wkb([wkb for chunk in results for wkb in chunk])
+
+## Build
+def build_geojson(shapefile_path, output_json_path, tolerance=GEO_LODS[GEO_DEFAULT_LOD], workers=None, force=False):
+    '''Shapefile -> WGS84 GeoJSON simplified at `tolerance` degrees. Returns False if skipped (up to date).'''
+    key = build_key(shapefile_path, tolerance)
+    if not force and is_current(output_json_path, key):
+        print(f"{output_json_path} is up to date.")
+        return False
     # Load your shapefile
     gdf = gpd.read_file(shapefile_path) # Requires necessary files colocated
     # Confirm in WGS84 (lat/lon)
     gdf = gdf.to_crs(epsg=4326)
-    gdf["geometry"] = gdf["geometry"].simplify(0.05, preserve_topology=True)
+    gdf["geometry"] = gpd.GeoSeries(simplify_geometries(gdf.geometry.values, tolerance, workers), index=gdf.index, crs=gdf.crs)
     # Output to file
     gdf.to_file(output_json_path, driver="GeoJSON")
+    with open(meta_path(output_json_path), "w") as f:
+        json.dump({"key": key, "source": str(shapefile_path), "tolerance": tolerance, "features": len(gdf)}, f, indent=2)
+    print(f"Built {output_json_path} ({len(gdf)} features, tolerance {tolerance}).")
+    return True
+
+def create_geojson(shapefile_path, output_json_path):
+    '''ADM0 default-LOD build (what create_maps.py falls back to when the GeoJSON is missing).'''
+    return build_geojson(shapefile_path, output_json_path)
+
+def build_all(levels=("adm0",), lods=(GEO_DEFAULT_LOD,), workers=None, force=False):
+    '''Build every level x LOD combination; returns {(level, lod): built?}.'''
+    return {
+        (level, lod): build_geojson(shapefile_for(level), geojson_for(level, lod), GEO_LODS[lod], workers, force)
+        for level in levels for lod in lods
+    }
+
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build simplified GeoJSON from the CGAZ shapefiles.")
+    parser.add_argument("--level", nargs="+", choices=["adm0", "adm1"], default=["adm0"])
+    parser.add_argument("--lod", nargs="+", choices=list(GEO_LODS), default=[GEO_DEFAULT_LOD], help="Levels of detail (see GEO_LODS)")
+    parser.add_argument("--workers", type=int, help="Simplification processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    args = parser.parse_args()
+    build_all(args.level, args.lod, args.workers, args.force)
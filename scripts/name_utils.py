@@ -0,0 +1,162 @@
+'''Author name canonicalisation: normalised keys, fuzzy blocking and clustering of name variants
+("Tolstoy, Leo", "Leo Tolstoy", "L. Tolstoy") so authors.py keeps one row per person.'''
+import re, unicodedata
+
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+SURNAME_PARTICLES = {"de", "da", "di", "du", "del", "della", "der", "den", "van", "von", "le", "la", "st", "mac", "al", "el", "ben", "bin"}
+SURNAME_SIMILARITY = 0.85 # Surnames in a block at least this similar (difflib ratio) may be the same person
+
+# Functions
+def split_name(full_name):
+    '''(first_name, last_name) as stored in the authors table: "Last, First" splits on the first comma,
+    otherwise first and last whitespace tokens.'''
+    full_name = full_name.strip() # Designed to be robust to multipart first or last names
+    if "," in full_name:
+        # Split on the first comma; allow optional whitespace immediately after
+        match = re.match(r"^(.*?),\s*(.*)$", full_name)
+        if match:
+            return match.group(2), match.group(1) # Keeps internal spaces like for middle names
+        return None, full_name
+    # Fallback: split on whitespace
+    parts = full_name.split()
+    return parts[0], (parts[-1] if len(parts) > 1 else None)
+
+def fold(text):
+    '''Accent-, case- and punctuation-insensitive form: "Dostoévsky, F.M." -> "dostoevsky, f m".'''
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = re.sub(r"['’]", "", text) # O'Connor -> oconnor
+    text = re.sub(r"[^\w,]+", " ", text) # Dots, hyphens etc. separate tokens
+    return " ".join(text.split())
+
+def name_parts(full_name):
+    '''(given tokens, surname) of the folded name; comma order is inverted and particles stay with the surname.'''
+    folded = fold(full_name)
+    if "," in folded:
+        surname, given = [p.strip() for p in folded.split(",", 1)]
+        return tuple(given.replace(",", " ").split()), surname
+    tokens = folded.split()
+    if not tokens:
+        return (), ""
+    cut = len(tokens) - 1
+    while cut > 1 and tokens[cut - 1] in SURNAME_PARTICLES: # "ursula k le guin" -> surname "le guin"
+        cut -= 1
+    return tuple(tokens[:cut]), " ".join(tokens[cut:])
+
+def canonical_key(full_name):
+    '''Exact-match key: "Tolstoy, Leo" and "Leo Tolstoy" both give "leo tolstoy".'''
+    given, surname = name_parts(full_name)
+    return " ".join(given + (surname,))
+
+def surname_skeleton(surname):
+    '''Consonant skeleton, so spelling variants share a block: "dostoevsky"/"dostoyevsky" -> "dstvsk".'''
+    skeleton = re.sub(r"[aeiouy\s]", "", surname)
+    return re.sub(r"(.)\1+", r"\1", skeleton) or surname
+
+def blocking_key(parts):
+    '''Coarse key for name_parts output; only names sharing it are compared. Surname skeleton + first initial.'''
+    given, surname = parts
+    return surname_skeleton(surname), (given[0][0] if given else "")
+
+def blocking_keys(parts):
+    '''blocking_key, plus the same on the last surname token alone: "Gabriel García Márquez" parses with
+    surname "marquez", "García Márquez, Gabriel" with "garcia marquez", and both need a shared block.'''
+    given, surname = parts
+    keys = {blocking_key(parts)}
+    if " " in surname:
+        keys.add(blocking_key((given, surname.split()[-1])))
+    return keys
+
+def is_initials(given):
+    '''True when every given-name token is a single letter ("L.", "F. M.").'''
+    return all(len(token) == 1 for token in given)
+
+def given_compatible(a, b):
+    '''Given names can belong to one person: first tokens agree (or one is the other's initial), and the
+    shorter list's remaining tokens appear, in order, in the longer one's (middle names may be missing).'''
+    def same(x, y):
+        return x == y or (len(x) == 1 and y.startswith(x)) or (len(y) == 1 and x.startswith(y))
+    if not a or not b:
+        return not a and not b
+    if not same(a[0], b[0]):
+        return False
+    short, long = sorted((a[1:], b[1:]), key=len)
+    rest = iter(long)
+    return all(any(same(token, other) for other in rest) for token in short)
+
+def names_match(a, b):
+    '''Pairwise test applied within a block, on name_parts output.'''
+    (given_a, surname_a), (given_b, surname_b) = a, b
+    if surname_a == surname_b or SequenceMatcher(None, surname_a, surname_b).ratio() >= SURNAME_SIMILARITY:
+        return given_compatible(given_a, given_b)
+    # Multi-part surname split differently ("garcia marquez" vs "marquez" with "garcia" as a given token):
+    # same last surname token, and everything before it compatible
+    tokens_a, tokens_b = given_a + tuple(surname_a.split()), given_b + tuple(surname_b.split())
+    if not tokens_a or not tokens_b or tokens_a[-1] != tokens_b[-1]:
+        return False
+    return given_compatible(tokens_a[:-1], tokens_b[:-1])
+
+def choose_canonical(names, counts=None):
+    '''Most informative variant: longest spelled-out given names, then "Last, First" form, then most used.'''
+    counts = counts or {}
+    def score(name):
+        given, _ = name_parts(name)
+        return (sum(len(t) for t in given if len(t) > 1), "," in name, counts.get(name, 0), name)
+    return max(names, key=score)
+
+def cluster_names(names, counts=None):
+    '''Map every name to its cluster's canonical variant. Names are only compared within a block, so the
+    cost is near-linear in the number of names. An initials-only name ("L. Tolstoy") joins a cluster only
+    when exactly one spelled-out cluster in its block matches it; otherwise it is ambiguous and left alone.'''
+    names = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+    parts = {n: name_parts(n) for n in names}
+    parent = {n: n for n in names}
+
+    def find(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    # Exact keys first, across all names (comma order can put one person's variants in different blocks)
+    by_key = {}
+    for name in names:
+        key = " ".join(parts[name][0] + (parts[name][1],)) # canonical_key
+        if key in by_key:
+            union(name, by_key[key])
+        else:
+            by_key[key] = name
+    # One representative per exact key; a name can sit in more than one block (see blocking_keys)
+    blocks = defaultdict(list)
+    for name in by_key.values():
+        for key in blocking_keys(parts[name]):
+            blocks[key].append(name)
+    for members in blocks.values():
+        spelled = [n for n in members if not is_initials(parts[n][0])]
+        # Spelled-out variants: pairwise within the (small) block
+        for i, a in enumerate(spelled):
+            for b in spelled[i + 1:]:
+                if names_match(parts[a], parts[b]):
+                    union(a, b)
+    # Initials: attach only when exactly one spelled-out cluster across the name's blocks matches
+    for name in by_key.values():
+        if not is_initials(parts[name][0]):
+            continue
+        candidates = {n for key in blocking_keys(parts[name]) for n in blocks[key] if not is_initials(parts[n][0])}
+        targets = {find(s) for s in candidates if names_match(parts[name], parts[s])}
+        if len(targets) == 1:
+            union(name, targets.pop())
+
+    clusters = defaultdict(list)
+    for name in names:
+        clusters[find(name)].append(name)
+    canonical = {}
+    for members in clusters.values():
+        chosen = choose_canonical(members, counts)
+        canonical.update({name: chosen for name in members})
+    return canonical
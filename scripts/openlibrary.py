@@ -0,0 +1,207 @@
+'''Offline book metadata from Open Library dumps (https://openlibrary.org/developers/dumps).
+Streams an editions dump (and optionally a works dump) once into an on-disk SQLite index keyed by ISBN-13
+(B-tree, so each lookup is O(log n)), then fills missing books columns from it in one bulk UPDATE.
+Dumps may be the official gzip TSV (type, key, revision, last_modified, JSON) or JSONL, plain or gzipped.
+Usage:
+    python scripts/openlibrary.py build --editions ol_dump_editions_latest.txt.gz [--works ol_dump_works_latest.txt.gz]
+    python scripts/openlibrary.py fill'''
+import argparse, gzip, json, re, sqlite3, sys
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+from isbn_utils import to_isbn13
+
+YEAR_RE = re.compile(r"\b(1[0-9]{3}|20[0-9]{2})\b")
+DIMENSIONS_RE = re.compile(r"([\d.]+)\s*x\s*([\d.]+)\s*x\s*([\d.]+)\s*(inches|inch|in|centimeters|centimetres|cm)", re.I)
+CM_PER_INCH = 2.54
+
+# Functions
+## Reading dumps
+def iter_records(path):
+    '''Yield JSON records from a TSV or JSONL dump (gzip or plain), skipping lines that fail to parse.'''
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            payload = line if line.startswith("{") else line.rsplit("\t", 1)[-1] # TSV: JSON is the last column
+            try:
+                yield json.loads(payload)
+            except ValueError:
+                continue
+
+def parse_year(value):
+    '''First plausible year in a free-text date ("March 5, 2006" -> "2006"), or None.'''
+    match = YEAR_RE.search(value or "")
+    return match.group(1) if match else None
+
+def parse_dimensions(value):
+    '''(length, width, height) in inches from "20 x 13 x 2 centimeters"-style text; largest side is the length.'''
+    match = DIMENSIONS_RE.search(value or "")
+    if not match:
+        return None, None, None
+    sides = [float(x) for x in match.groups()[:3]]
+    if match.group(4).lower().startswith("c"):
+        sides = [s / CM_PER_INCH for s in sides]
+    length, width, height = sorted(sides, reverse=True)
+    return round(length, 3), round(width, 3), round(height, 3)
+
+def edition_rows(record):
+    '''Index rows (one per distinct ISBN-13) for an edition record.'''
+    isbns = {to_isbn13(i) for i in record.get("isbn_13", []) + record.get("isbn_10", [])} - {None}
+    if not isbns:
+        return []
+    works = record.get("works") or [{}]
+    length, width, height = parse_dimensions(record.get("physical_dimensions"))
+    row = (
+        record.get("key"),
+        works[0].get("key"),
+        record.get("title"),
+        ", ".join(record.get("publishers", [])) or None,
+        parse_year(record.get("publish_date")),
+        record.get("number_of_pages"),
+        record.get("physical_format"),
+        length, width, height,
+    )
+    return [(isbn,) + row for isbn in sorted(isbns)]
+
+## Index
+def connect_index(index_path=OPENLIBRARY_INDEX_PATH):
+    '''Open (creating if needed) the ISBN index database.'''
+    Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS editions (
+            isbn13 TEXT PRIMARY KEY,
+            edition_key TEXT,
+            work_key TEXT,
+            title TEXT,
+            publisher TEXT,
+            year_edition TEXT,
+            total_pages INTEGER,
+            physical_format TEXT,
+            length REAL,
+            width REAL,
+            height REAL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS works (
+            work_key TEXT PRIMARY KEY,
+            year_published TEXT
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+def build_index(editions_path=None, works_path=None, index_path=OPENLIBRARY_INDEX_PATH, batch_size=OPENLIBRARY_BATCH_SIZE):
+    '''Stream the dumps into the index in batches (constant memory). Re-running adds to/overrides the index.'''
+    conn = connect_index(index_path)
+    conn.execute("PRAGMA journal_mode = OFF") # Rebuildable cache; speed over durability
+    conn.execute("PRAGMA synchronous = OFF")
+    counts = {"editions": 0, "works": 0}
+    if editions_path:
+        batch = []
+        for record in iter_records(editions_path):
+            batch.extend(edition_rows(record))
+            if len(batch) >= batch_size:
+                counts["editions"] += flush(conn, "editions", batch)
+        counts["editions"] += flush(conn, "editions", batch)
+    if works_path:
+        batch = []
+        for record in iter_records(works_path):
+            year = parse_year(record.get("first_publish_date"))
+            if year and record.get("key"):
+                batch.append((record["key"], year))
+            if len(batch) >= batch_size:
+                counts["works"] += flush(conn, "works", batch)
+        counts["works"] += flush(conn, "works", batch)
+    conn.close()
+    print(f"Indexed {counts['editions']} ISBNs and {counts['works']} works into {index_path}.")
+    return counts
+
+def flush(conn, table, batch):
+    '''Write and clear a batch of rows; returns how many were written.'''
+    if not batch:
+        return 0
+    placeholders = ", ".join("?" for _ in batch[0])
+    conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", batch)
+    conn.commit()
+    n = len(batch)
+    batch.clear()
+    return n
+
+def lookup(isbn, index_path=OPENLIBRARY_INDEX_PATH):
+    '''Index record (dict) for one ISBN in any format, or None.'''
+    isbn13 = to_isbn13(isbn)
+    if not isbn13:
+        return None
+    conn = connect_index(index_path)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("""
+        SELECT e.*, w.year_published
+        FROM editions AS e
+        LEFT JOIN works AS w ON w.work_key = e.work_key
+        WHERE e.isbn13 = ?
+    """, (isbn13,)).fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+## Filling books
+def fill_books(conn, index_path=OPENLIBRARY_INDEX_PATH):
+    '''Fill NULL books columns from the index for every book with a recognisable ISBN; never overwrites.
+    Returns {column: rows filled}.'''
+    conn.execute("ATTACH DATABASE ? AS ol", (str(index_path),))
+    try:
+        # Normalised ISBNs in a temp table, so the join below is one indexed pass
+        conn.execute("CREATE TEMP TABLE book_isbn13 (issue_id INTEGER PRIMARY KEY, isbn13 TEXT)")
+        conn.executemany("INSERT INTO book_isbn13 VALUES (?, ?)", [
+            (issue_id, to_isbn13(isbn))
+            for issue_id, isbn in conn.execute(f"SELECT issue_id, isbn FROM {BOOKS_TABLE_NAME} WHERE isbn IS NOT NULL")
+            if to_isbn13(isbn)
+        ])
+        filled = {}
+        for column in OPENLIBRARY_FILL_COLUMNS:
+            filled[column] = conn.execute(f"SELECT COUNT(*) FROM {BOOKS_TABLE_NAME} WHERE {column} IS NULL").fetchone()[0]
+        conn.execute(f"""
+            UPDATE {BOOKS_TABLE_NAME} AS b
+            SET {", ".join(f"{c} = COALESCE(b.{c}, src.{c})" for c in OPENLIBRARY_FILL_COLUMNS)},
+                updated_on = DATETIME('now')
+            FROM (
+                SELECT t.issue_id, e.*, w.year_published
+                FROM temp.book_isbn13 AS t
+                JOIN ol.editions AS e ON e.isbn13 = t.isbn13
+                LEFT JOIN ol.works AS w ON w.work_key = e.work_key
+            ) AS src
+            WHERE src.issue_id = b.issue_id
+              AND ({" OR ".join(f"b.{c} IS NULL" for c in OPENLIBRARY_FILL_COLUMNS)})
+        """)
+        for column in OPENLIBRARY_FILL_COLUMNS:
+            filled[column] -= conn.execute(f"SELECT COUNT(*) FROM {BOOKS_TABLE_NAME} WHERE {column} IS NULL").fetchone()[0]
+        conn.commit()
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.book_isbn13")
+        conn.execute("DETACH DATABASE ol")
+    print(f"Filled from Open Library: {filled}")
+    return filled
+
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ISBN metadata from Open Library dumps.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Stream dumps into the ISBN index")
+    build.add_argument("--editions", help="Editions dump (.txt.gz TSV or .jsonl[.gz])")
+    build.add_argument("--works", help="Works dump, for year_published")
+    build.add_argument("--index", default=OPENLIBRARY_INDEX_PATH)
+    fill = sub.add_parser("fill", help="Fill missing books columns from the index")
+    fill.add_argument("--index", default=OPENLIBRARY_INDEX_PATH)
+    args = parser.parse_args()
+    if args.command == "build":
+        build_index(args.editions, args.works, args.index)
+    else:
+        conn = sqlite3.connect(DB_PATH)
+        fill_books(conn, args.index)
+        conn.close()
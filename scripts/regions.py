@@ -0,0 +1,134 @@
+'''Assign authors' birth places to ADM1 regions (states/provinces) for sub-national maps.
+Coordinates come from enrichment (authors.birth_lat/birth_lon) or, failing that, from a local GeoNames-style
+gazetteer looked up by authors.birth_place. All points are matched in one bulk query against an STRtree over
+the ADM1 polygons (log-time per point instead of a scan over every polygon); points just off a simplified
+coastline fall back to the nearest polygon within GEO_NEAREST_MAX_DEG.
+Usage:
+    python scripts/regions.py [--adm1 data/geo/countriesmunis.geojson] [--gazetteer cities15000.txt]'''
+import argparse, csv, json, sqlite3, sys
+
+import numpy as np
+import shapely
+
+from shapely.geometry import shape
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+from sql_utils import *
+from name_utils import fold
+
+# GeoNames dump columns (https://download.geonames.org/export/dump/, e.g. cities15000.txt)
+GN_NAME, GN_ASCIINAME, GN_ALTERNATES, GN_LAT, GN_LON, GN_POPULATION = 1, 2, 3, 4, 5, 14
+
+# Functions
+## Regions
+def load_regions(geojson_path=ADM1_GEOJSON_PATH):
+    '''ADM1 polygons (shapely array) and their (adm0, adm1, adm1_id) attributes, in the same order.'''
+    with open(geojson_path) as f:
+        features = json.load(f)["features"]
+    polygons = np.array([shape(f["geometry"]) for f in features])
+    attributes = [
+        (f["properties"].get("shapeGroup"), f["properties"].get("shapeName"), f["properties"].get("shapeID"))
+        for f in features
+    ]
+    return polygons, attributes
+
+def assign_points(tree, lats, lons, max_distance=GEO_NEAREST_MAX_DEG):
+    '''Index of the containing polygon per point (-1 if none within max_distance degrees).
+    One vectorised STRtree query for all points, then a nearest-polygon query for the leftovers.'''
+    points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+    assigned = np.full(len(points), -1)
+    point_idx, polygon_idx = tree.query(points, predicate="intersects")
+    # A point on a shared border hits two polygons; keep the first
+    first = np.unique(point_idx, return_index=True)[1]
+    assigned[point_idx[first]] = polygon_idx[first]
+    missing = np.flatnonzero(assigned < 0)
+    if len(missing) and max_distance:
+        # Candidates within reach (an index query, unlike query_nearest's exact search), then the closest per point
+        point_idx, polygon_idx = tree.query(points[missing], predicate="dwithin", distance=max_distance)
+        distances = shapely.distance(points[missing][point_idx], tree.geometries[polygon_idx])
+        order = np.lexsort((distances, point_idx))
+        first = order[np.unique(point_idx[order], return_index=True)[1]]
+        assigned[missing[point_idx[first]]] = polygon_idx[first]
+    return assigned
+
+## Gazetteer
+def load_gazetteer(path=GAZETTEER_PATH):
+    '''{folded place name: (lat, lon)} from a GeoNames TSV; a name shared by several places takes the most populous.'''
+    best = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            try:
+                lat, lon, population = float(row[GN_LAT]), float(row[GN_LON]), int(row[GN_POPULATION] or 0)
+            except (IndexError, ValueError):
+                continue
+            names = {row[GN_NAME], row[GN_ASCIINAME]} | set(filter(None, row[GN_ALTERNATES].split(",")))
+            for name in names:
+                key = fold(name)
+                if key and (key not in best or population > best[key][2]):
+                    best[key] = (lat, lon, population)
+    return {key: (lat, lon) for key, (lat, lon, _) in best.items()}
+
+def gazetteer_lookup(gazetteer, birth_place):
+    '''(lat, lon) for a free-text place ("Yasnaya Polyana, Tula Governorate" tries each part in turn), or None.'''
+    for part in (birth_place or "").split(","):
+        coordinates = gazetteer.get(fold(part))
+        if coordinates:
+            return coordinates
+    return None
+
+## Assignment
+def assign_author_regions(conn, adm1_path=ADM1_GEOJSON_PATH, gazetteer_path=GAZETTEER_PATH):
+    '''Recompute author_regions for every author with birth coordinates (or a gazetteer-resolvable birth_place).
+    Returns the number of authors assigned to a region.'''
+    cur = conn.cursor()
+    ensure_columns(cur, AUTHORS_TABLE_NAME, AUTHORS_COLUMNS)
+    cur.execute(sql_create_table_cmd(AUTHOR_REGIONS_TABLE_NAME, AUTHOR_REGIONS_COLUMNS))
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_author_regions_adm1 ON {AUTHOR_REGIONS_TABLE_NAME}(adm0, adm1)")
+    authors = cur.execute(f"""
+        SELECT author_id, birth_lat, birth_lon, birth_place FROM {AUTHORS_TABLE_NAME}
+        WHERE (birth_lat IS NOT NULL AND birth_lon IS NOT NULL) OR birth_place IS NOT NULL
+    """).fetchall()
+    gazetteer = load_gazetteer(gazetteer_path) if Path(gazetteer_path).exists() else {}
+    located = []
+    for author_id, lat, lon, birth_place in authors:
+        if lat is not None and lon is not None:
+            located.append((author_id, lat, lon, "wikidata"))
+        elif gazetteer_lookup(gazetteer, birth_place):
+            located.append((author_id, *gazetteer_lookup(gazetteer, birth_place), "gazetteer"))
+    print(f"Located {len(located)} of {len(authors)} authors with a birth place.")
+    if not located:
+        return 0
+    polygons, attributes = load_regions(adm1_path)
+    tree = shapely.STRtree(polygons)
+    assigned = assign_points(tree, [r[1] for r in located], [r[2] for r in located])
+    rows = [
+        (author_id, lat, lon, source, *attributes[i])
+        for (author_id, lat, lon, source), i in zip(located, assigned.tolist()) if i >= 0
+    ]
+    cur.execute(f"DELETE FROM {AUTHOR_REGIONS_TABLE_NAME}") # Recomputed in full; cheap
+    cur.executemany(f"""
+        INSERT INTO {AUTHOR_REGIONS_TABLE_NAME} (author_id, lat, lon, source, adm0, adm1, adm1_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    print(f"Assigned {len(rows)} authors to ADM1 regions ({len(located) - len(rows)} outside every region).")
+    return len(rows)
+
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assign authors' birth places to ADM1 regions.")
+    parser.add_argument("--adm1", default=ADM1_GEOJSON_PATH, help="ADM1 GeoJSON (see map_utils.py --level adm1)")
+    parser.add_argument("--gazetteer", default=GAZETTEER_PATH, help="GeoNames TSV for birth places without coordinates")
+    args = parser.parse_args()
+    conn = sqlite3.connect(DB_PATH)
+    assign_author_regions(conn, args.adm1, args.gazetteer)
+    conn.close()
@@ -1,56 +1,130 @@
-'''Try to get price by querying external db for ISBN or similar.'''
-import requests
+'''Try to get price by querying external db for ISBN or similar.
+Prices every book with an ISBN in one job: unique ISBNs are looked up concurrently (rate limited, cached in
+price_cache), and anything without a list price gets the format/length heuristic.'''
+import argparse, sqlite3, sys, requests
 
-def fetch_price_from_google(isbn):
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+from sql_utils import *
+from http_utils import cached_session, TokenBucket
+from isbn_utils import to_isbn13
+
+# Functions
+def lookup_google_price(isbn, session=None, limiter=None):
+    """Google Books list price for an ISBN: (price, currency), (None, None) if it has none.
+    Raises requests.RequestException if the lookup itself failed (so it isn't cached as a miss)."""
+    if limiter:
+        limiter.acquire()
+    r = (session or requests).get(GOOGLE_BOOKS_API, params={"q": f"isbn:{isbn}"}, timeout=5)
+    r.raise_for_status()
+    items = r.json().get("items")
+    if not items:
+        return None, None
+    # Get sale info
+    sale_info = items[0].get("saleInfo", {})
+    list_price = sale_info.get("listPrice")
+    # Check for price
+    if list_price:
+        return list_price.get("amount"), list_price.get("currencyCode")
+    return None, None
+
+def fetch_price_from_google(isbn, session=None, limiter=None):
     """Try to fetch book price from Google Books API by ISBN.
     Returns (price, currency) or (None, None)."""
-    # Set url
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
     try:
-        r = requests.get(url, timeout=5)
-        if r.status_code != 200:
-            print(f"Error: Unsuccessful Google Books response for isbn:{isbn}")
-            return None, None
-        data = r.json()
-        items = data.get("items")
-        if not items:
-            return None, None
-        # Get sale info
-        sale_info = items[0].get("saleInfo", {})
-        list_price = sale_info.get("listPrice")
-        # Check for price
-        if list_price:
-            return list_price.get("amount"), list_price.get("currencyCode")
-    except Exception:
-        pass
-    # Return
-    return None, None
+        return lookup_google_price(isbn, session, limiter)
+    except (requests.RequestException, ValueError):
+        print(f"Error: Unsuccessful Google Books response for isbn:{isbn}")
+        return None, None
 
 def estimate_price_by_format(format_type, page_count=None):
     """Rough price heuristic based on format. Returns estimated USD price."""
+    return float(estimate_prices([format_type], [page_count])[0])
+
+def estimate_prices(format_types, page_counts):
+    """estimate_price_by_format over whole columns at once (array in, array out)."""
+    formats = np.char.lower(np.array([f or "" for f in format_types], dtype=str))
+    pages = np.array([p if p is not None else np.nan for p in page_counts], dtype=float)
     # Check format type
-    format_type = (format_type or "").lower()
-    if "hardcover" in format_type:
-        base = 28
-    elif "paperback" in format_type:
-        base = 18
-    elif "massmarket" in format_type:
-        base = 9
-    else:
-        base = 20  # default fallback
+    base = np.select(
+        [np.char.find(formats, "hardcover") >= 0, np.char.find(formats, "paperback") >= 0, np.char.find(formats, "massmarket") >= 0],
+        [28, 18, 9],
+        default=20, # default fallback
+    ).astype(float)
     # Book length adjustment
-    if page_count:
-        if page_count > 600:
-            base += 4
-        elif page_count > 400:
-            base += 2
-    # Return
-    return round(base, 2)
+    base += np.where(pages > 600, 4, np.where(pages > 400, 2, 0))
+    return np.round(base, 2)
+
+## Cache
+def ensure_price_tables(conn):
+    """Price columns on books plus the lookup cache."""
+    cur = conn.cursor()
+    ensure_columns(cur, BOOKS_TABLE_NAME, {c: BOOKS_COLUMNS[c] for c in ("price", "currency", "price_source")})
+    cur.execute(sql_create_table_cmd(PRICE_CACHE_TABLE_NAME, PRICE_CACHE_COLUMNS))
+
+def get_cached_prices(conn, isbns):
+    """{isbn13: (price, currency)} for cache entries younger than the TTL (misses included, as (None, None))."""
+    rows = conn.execute(f"""
+        SELECT isbn13, price, currency FROM {PRICE_CACHE_TABLE_NAME}
+        WHERE fetched_on >= DATETIME('now', ?)
+    """, (f"-{PRICE_CACHE_TTL_DAYS} days",)).fetchall()
+    wanted = set(isbns)
+    return {isbn: (price, currency) for isbn, price, currency in rows if isbn in wanted}
+
+def cache_prices(conn, prices):
+    """Write {isbn13: (price, currency)} lookups to the cache (misses as NULL price), refreshing fetched_on."""
+    conn.executemany(f"""
+        INSERT INTO {PRICE_CACHE_TABLE_NAME} (isbn13, price, currency, source, fetched_on)
+        VALUES (?, ?, ?, 'google_api', DATETIME('now'))
+        ON CONFLICT(isbn13) DO UPDATE SET
+            price = excluded.price, currency = excluded.currency, source = excluded.source, fetched_on = excluded.fetched_on
+    """, [(isbn, price, currency) for isbn, (price, currency) in prices.items()])
+
+def fetch_prices(isbns, max_workers=PRICE_MAX_WORKERS, requests_per_second=PRICE_REQUESTS_PER_SECOND):
+    """Look up many ISBNs concurrently over one session and one rate limit.
+    Returns {isbn13: (price, currency)} for the lookups that completed; failures are left out."""
+    def fetch(isbn):
+        try:
+            return isbn, lookup_google_price(isbn, session)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error: Unsuccessful Google Books response for isbn:{isbn} ({e})")
+            return isbn, None
+    # price_cache owns the TTL, so HTTP responses are always revalidated (ttl=0) and --refresh really refetches;
+    # the limiter only spends tokens on real requests
+    session = cached_session(pool_size=max_workers, ttl=0, limiter=TokenBucket(requests_per_second))
+    with session, ThreadPoolExecutor(max_workers) as pool:
+        return {isbn: found for isbn, found in pool.map(fetch, isbns) if found is not None}
 
 # TODO: Update "format" column for books in 'books' table.
-def get_book_price(isbn, format_type=None, page_count=None):
-    """Attempt API lookup first. If unavailable, use heuristic estimate. """
-    price, currency = fetch_price_from_google(isbn)
+def get_book_price(isbn, format_type=None, page_count=None, conn=None):
+    """Attempt API lookup first (through the price cache when conn is given). If unavailable, use heuristic estimate."""
+    isbn13 = to_isbn13(isbn) or isbn
+    cached = get_cached_prices(conn, [isbn13]).get(isbn13) if conn else None
+    if cached:
+        price, currency = cached
+    else:
+        try:
+            with cached_session(ttl=0) as session: # price_cache owns the TTL (see fetch_prices)
+                price, currency = lookup_google_price(isbn13, session)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error: Unsuccessful Google Books response for isbn:{isbn13} ({e})")
+            price, currency = None, None # Failed lookup: not cached, so it is retried next time
+        else:
+            if conn:
+                cache_prices(conn, {isbn13: (price, currency)})
+                conn.commit()
     if price is not None:
         return {
             "price": price,
@@ -66,11 +140,45 @@ def get_book_price(isbn, format_type=None, page_count=None):
         "source": "heuristic_estimate"
     }
 
+def price_books(conn, refresh=False):
+    """Price every book: cached or fetched list price by ISBN, else the heuristic; one bulk write to books.
+    Returns {source: books priced}."""
+    ensure_price_tables(conn)
+    books = conn.execute(f"SELECT issue_id, isbn, total_pages FROM {BOOKS_TABLE_NAME}").fetchall()
+    isbn_of = {issue_id: to_isbn13(isbn) for issue_id, isbn, _ in books}
+    unique = sorted(set(isbn_of.values()) - {None}) # Several books (rereads, copies) can share an ISBN
+    known = {} if refresh else get_cached_prices(conn, unique)
+    missing = [isbn for isbn in unique if isbn not in known]
+    print(f"Pricing {len(books)} books: {len(unique)} ISBNs, {len(known)} cached, {len(missing)} to fetch...")
+    fetched = fetch_prices(missing)
+    # Misses are cached too; failed lookups aren't, so they are retried next run
+    cache_prices(conn, fetched)
+    known.update(fetched)
+    # Heuristic for every book without a list price, in one vectorised call
+    priced = {issue_id: known.get(isbn, (None, None)) for issue_id, isbn in isbn_of.items()}
+    fallback = [(issue_id, pages) for issue_id, _, pages in books if priced[issue_id][0] is None]
+    estimates = estimate_prices([None] * len(fallback), [pages for _, pages in fallback]) # No format column yet
+    updates = [(price, currency, "google_api", issue_id) for issue_id, (price, currency) in priced.items() if price is not None]
+    updates += [(float(price), "USD", "heuristic_estimate", issue_id) for (issue_id, _), price in zip(fallback, estimates)]
+    # Only rows whose price actually changed are written (and get a new updated_on)
+    changed = conn.total_changes
+    conn.executemany(f"""
+        UPDATE {BOOKS_TABLE_NAME}
+        SET price = ?1, currency = ?2, price_source = ?3, updated_on = DATETIME('now')
+        WHERE issue_id = ?4
+          AND (price IS NOT ?1 OR currency IS NOT ?2 OR price_source IS NOT ?3)
+    """, updates)
+    changed = conn.total_changes - changed
+    conn.commit()
+    summary = {"google_api": len(updates) - len(fallback), "heuristic_estimate": len(fallback)}
+    print(f"Priced books: {summary} ({changed} changed)")
+    return summary
 
-result = get_book_price(
-    isbn="9780143127741",
-    format_type="Paperback",
-    page_count=320
-)
-
-print(result)
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Set books.price from Google Books, or estimate it.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached prices")
+    args = parser.parse_args()
+    conn = sqlite3.connect(DB_PATH)
+    price_books(conn, refresh=args.refresh)
+    conn.close()
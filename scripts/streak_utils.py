@@ -0,0 +1,71 @@
+'''Reading streak analytics shared by the heatmap and anything else that reports streaks.
+A day counts as read when its value is > 0; missing days in a dated series count as not read.
+Everything is a single vectorised pass (run lengths via a running maximum), so cost is linear in days.'''
+import sqlite3, sys
+
+import numpy as np
+import pandas as pd
+
+###################
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from core.constants import *
+####################
+
+# Functions
+def streak_lengths(read):
+    '''Per-day streak length for a sequence of read flags: consecutive read days up to and including each day
+    (0 on days not read). [1, 1, 0, 1] -> [1, 2, 0, 1].'''
+    read = np.asarray(read, dtype=bool)
+    idx = np.arange(len(read))
+    last_miss = np.maximum.accumulate(np.where(read, -1, idx)) # Index of the latest unread day so far
+    return np.where(read, idx - last_miss, 0)
+
+def daily(series, through=None):
+    '''Series indexed by day with gaps filled as 0 (not read), extended with unread days through `through` if
+    that is later than the last day; a non-dated index is taken as already daily.'''
+    if not isinstance(series.index, pd.DatetimeIndex):
+        return series.fillna(0)
+    series = series.groupby(series.index.normalize()).sum()
+    if series.empty: # No days to span (date_range(NaT, NaT) raises)
+        return series
+    end = series.index.max() if through is None else max(series.index.max(), pd.Timestamp(through).normalize())
+    return series.reindex(pd.date_range(series.index.min(), end, freq="D"), fill_value=0)
+
+def streak_stats(series, as_of=None):
+    '''Streak summary for a series of pages (or flags) per day, indexed by date.
+    Returns {"per_day": Series of streak lengths, "current": int, "longest": int, "longest_start",
+    "longest_end": dates (None if never read), "days_read": int}. `current` is the streak as of `as_of`
+    (default: last day), still counting yesterday's streak if as_of itself isn't read yet; days between the
+    last one in the series and `as_of` count as not read, so an old streak isn't reported as current.'''
+    series = daily(series, through=as_of)
+    per_day = pd.Series(streak_lengths(series.to_numpy() > 0), index=series.index, name="streak")
+    upto = per_day if as_of is None else per_day[per_day.index <= pd.Timestamp(as_of)]
+    current = int(upto.iloc[-1]) if len(upto) else 0
+    if not current and len(upto) > 1:
+        current = int(upto.iloc[-2]) # Today not read (yet) doesn't break the streak
+    longest = int(per_day.max()) if len(per_day) else 0
+    end = per_day.idxmax() if longest else None # First day reaching the maximum
+    return {
+        "per_day": per_day,
+        "current": current,
+        "longest": longest,
+        "longest_start": end - pd.Timedelta(days=longest - 1) if longest and isinstance(end, pd.Timestamp) else None,
+        "longest_end": end,
+        "days_read": int((series.to_numpy() > 0).sum()),
+    }
+
+# Execute
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    df = pd.read_sql("SELECT date_est, my_reading FROM ts_reading", conn, parse_dates=["date_est"])
+    conn.close()
+    stats = streak_stats(df.set_index("date_est")["my_reading"], as_of=pd.Timestamp.today().normalize())
+    print(f"Current streak: {stats['current']} days; longest: {stats['longest']} days "
+          f"({stats['longest_start']:%Y-%m-%d} to {stats['longest_end']:%Y-%m-%d}); days read: {stats['days_read']}."
+          if stats["longest"] else "No reading days yet.")
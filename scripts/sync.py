@@ -13,6 +13,7 @@ if str(PROJECT_ROOT) not in sys.path:
 from core.constants import * 
 from sync_utils import * 
 from sql_utils import * 
+from http_utils import cached_session
 
 from dateutil.parser import parse as parse_date
 from dotenv import load_dotenv
@@ -37,10 +38,11 @@ def main():
     issue_url = event["issue"]["url"]
     ## Requests of GitHub (if token is set)
     if os.environ.get("GITHUB_TOKEN"): # GitHub Actions
-        issue_resp = requests.get(issue_url, headers=headers)
+        session = cached_session() # ttl=0: always revalidated; unchanged resources come back 304 (free against the rate limit)
+        issue_resp = session.get(issue_url, headers=headers)
         issue_resp.raise_for_status()
         issue = issue_resp.json() # If not fail state, set issue as json response
-        comments_resp = requests.get(issue["comments_url"], headers=headers)
+        comments_resp = session.get(issue["comments_url"], headers=headers)
         comments_resp.raise_for_status()
         comments = comments_resp.json() # If not fail state, set comments list as json response from comments_url 
     else: # Local testing
@@ -1,15 +1,15 @@
 '''Validate entries in database against issue and event history.
-TODO: Add a dry run mode that doesn't edit the db, just reports changes.
-TODO: Add unit tests (yay!)
+Run with --dry-run to apply every rule to an in-memory copy and report the row-level diff instead.
 '''
 # Imports
 from datetime import date
 from datetime import datetime
 from collections import defaultdict
 from functools import lru_cache
-from dateutil.parser import parse as parse_date
+from concurrent.futures import ThreadPoolExecutor
 
-import os, requests, sqlite3, sys
+import json, os, sqlite3, sys, time
+import xml.etree.ElementTree as ET
 
 # Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
 from pathlib import Path
@@ -19,6 +19,9 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from core.constants import * 
+from sql_utils import sql_create_table_cmd
+from anomaly_utils import load_event_arrays, find_event_anomalies
+from http_utils import cached_session
 
 # Setup
 if not GITHUB_TOKEN:
@@ -29,8 +32,37 @@ if not GITHUB_REPOSITORY:
 
 # Reporting class for logging/stashing updates
 class ValidationReport:
-    def __init__(self):
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
         self.changes = defaultdict(list)
+        self.counts = {} # Rule -> (table, rows affected); filled by the set-based rules
+        self.rules = {} # Rule name -> stats from run_rules (timings, table sizes, rows changed)
+        self.anomalies = defaultdict(list) # Kind -> flagged reading_events rows (reported, not fixed)
+
+    def record_count(self, rule, table, count):
+        self.counts[rule] = (table, count)
+
+    def record_rule(self, name, reads, writes, candidates, table_rows, rows_changed,
+                    detect_seconds, apply_seconds, error=None):
+        self.rules[name] = {
+            "reads": list(reads),
+            "writes": list(writes),
+            "candidates": candidates,
+            "table_rows": table_rows,
+            "rows_changed": rows_changed,
+            "detect_seconds": detect_seconds,
+            "apply_seconds": apply_seconds,
+            "error": error,
+        }
+
+    def record_anomaly(self, kind, issue_id, source_id, date, page, value):
+        self.anomalies[kind].append({
+            "issue_id": issue_id,
+            "source_id": source_id,
+            "date": date,
+            "page": page,
+            "value": value,
+        })
 
     def record(self, rule, table, identifier, column, old, new):
         self.changes[rule].append({
@@ -42,19 +74,59 @@ class ValidationReport:
         })
 
     def is_empty(self):
-        return not any(self.changes.values())
+        return not any(self.changes.values()) and not any(n for _, n in self.counts.values())
 
     def to_markdown(self):
         lines = []
-        lines.append("# Database Validation Report")
+        lines.append("# Database Validation Report" + (" (dry run)" if self.dry_run else ""))
         lines.append("")
         lines.append(f"_Generated: {datetime.now().isoformat()}")
         lines.append("")
+        if self.dry_run:
+            lines.append("Dry run: no changes were written to the database.")
+            lines.append("")
+
+        if self.rules:
+            lines.append("## Rules")
+            lines.append("")
+            lines.append("| Rule | Reads | Writes | Candidates | Table rows | Rows changed | Detect (s) | Apply (s) |")
+            lines.append("| --- | --- | --- | --- | --- | --- | --- | --- |")
+            for name, r in self.rules.items():
+                lines.append(
+                    f"| {name}{' (error)' if r['error'] else ''} | {', '.join(r['reads'])} | {', '.join(r['writes'])} "
+                    f"| {r['candidates']} | {r['table_rows']} | {r['rows_changed']} "
+                    f"| {r['detect_seconds']:.3f} | {r['apply_seconds']:.3f} |"
+                )
+            lines.append("")
+
+        if self.anomalies:
+            lines.append("## Anomalies")
+            lines.append("")
+            for kind, items in self.anomalies.items():
+                lines.append(f"### {kind} ({len(items)})")
+                lines.append("")
+                for item in items[:50]: # Full list is in the JSON report and the anomalies table
+                    lines.append(
+                        f"- `{item['source_id']}` (issue `{item['issue_id']}`, {item['date']}): "
+                        f"page {item['page']}, value {item['value']:.1f}"
+                    )
+                if len(items) > 50:
+                    lines.append(f"- ... {len(items) - 50} more")
+                lines.append("")
 
         if self.is_empty():
             lines.append("No changes were required.")
             return "\n".join(lines)
 
+        if self.counts:
+            lines.append("## Summary")
+            lines.append("")
+            lines.append("| Rule | Table | Rows affected |")
+            lines.append("| --- | --- | --- |")
+            for rule, (table, count) in self.counts.items():
+                lines.append(f"| {rule} | `{table}` | {count} |")
+            lines.append("")
+
         for rule, items in self.changes.items():
             lines.append(f"## {rule}")
             lines.append("")
@@ -68,13 +140,196 @@ class ValidationReport:
 
         return "\n".join(lines)
 
+    def to_json(self):
+        return json.dumps(
+            {
+                "generated": datetime.now().isoformat(),
+                "dry_run": self.dry_run,
+                "counts": {
+                    rule: {"table": table, "rows": count}
+                    for rule, (table, count) in self.counts.items()
+                },
+                "rules": self.rules,
+                "anomalies": self.anomalies,
+                "changes": self.changes,
+            },
+            indent=2,
+            default=str, # Dates and other non-JSON values as text
+        )
+
+    def to_junit(self):
+        '''One <testcase> per rule; a rule that raised is an <error>. Counts ride along as properties.'''
+        suite = ET.Element(
+            "testsuite",
+            name="validate",
+            tests=str(len(self.rules)),
+            errors=str(sum(1 for r in self.rules.values() if r["error"])),
+            failures="0",
+            time=f"{sum(r['detect_seconds'] + r['apply_seconds'] for r in self.rules.values()):.3f}",
+            timestamp=datetime.now().isoformat(timespec="seconds"),
+        )
+        for name, r in self.rules.items():
+            case = ET.SubElement(
+                suite,
+                "testcase",
+                classname="validate",
+                name=name,
+                time=f"{r['detect_seconds'] + r['apply_seconds']:.3f}",
+            )
+            props = ET.SubElement(case, "properties")
+            for key in ("candidates", "table_rows", "rows_changed"):
+                ET.SubElement(props, "property", name=key, value=str(r[key]))
+            for key in ("detect_seconds", "apply_seconds"):
+                ET.SubElement(props, "property", name=key, value=f"{r[key]:.6f}")
+            if r["error"]:
+                ET.SubElement(case, "error", message=r["error"])
+        return ET.tostring(suite, encoding="unicode")
+
 # Functions
-def get_db():
+DRY_RUN_URI = "file:validate_dry_run?mode=memory&cache=shared" # Shared so read connections see the copy
+
+def get_db(dry_run=False):
+    '''Connection to the database; for a dry run, an in-memory copy of it.'''
     conn = sqlite3.connect(DB_PATH)
+    if dry_run:
+        mem = sqlite3.connect(DRY_RUN_URI, uri=True)
+        conn.backup(mem) # Page-level copy; rowids are preserved for diffing
+        conn.close()
+        conn = mem
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def connect_reader(dry_run=False):
+    '''Extra read-only connection for detection phases (the dry-run copy is shared in-memory).'''
+    if dry_run:
+        conn = sqlite3.connect(DRY_RUN_URI, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(f"{Path(DB_PATH).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
-@lru_cache(maxsize=256) # Fetch each issue once per run, ISO dates
+# Rule registry
+class Rule:
+    '''A validation rule: a read-only detect phase (candidate count) and a write phase (rows changed).'''
+    def __init__(self, func, reads, writes, detect=None):
+        self.name = func.__name__
+        self.func = func
+        self.reads = tuple(reads)
+        self.writes = tuple(writes)
+        self.detect = detect # SQL returning one count, or callable(conn) -> count
+
+    def run_detect(self, conn):
+        '''Return (candidates, table_rows); only reads from conn. table_rows is the size of the tables the rule
+        reads (a scale for its cost), not a count of the rows its queries visited.'''
+        table_rows = sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in self.reads)
+        if self.detect is None:
+            return None, table_rows
+        if callable(self.detect):
+            return self.detect(conn), table_rows
+        return conn.execute(self.detect).fetchone()[0], table_rows
+
+RULES = [] # Run in registration (file) order
+
+def register_rule(reads, writes, detect=None):
+    '''Decorator adding a rule function to RULES; the function must return the number of rows it changed.'''
+    def decorator(func):
+        RULES.append(Rule(func, reads, writes, detect))
+        return func
+    return decorator
+
+def run_rules(conn, report, reader=None, rules=None):
+    '''Run every detect phase concurrently (one reader connection each, when reader is given), then the
+    write phases serially on conn. Detection sees the database as of the start of the run; the write
+    phases re-evaluate in SQL, so rules that depend on earlier fixes still see them.'''
+    rules = RULES if rules is None else rules
+
+    def detect(rule):
+        start = time.perf_counter()
+        rconn = reader() if reader else conn
+        try:
+            candidates, table_rows = rule.run_detect(rconn)
+        finally:
+            if reader:
+                rconn.close()
+        return candidates, table_rows, time.perf_counter() - start
+
+    if reader:
+        with ThreadPoolExecutor(max_workers=min(8, len(rules) or 1)) as pool:
+            detected = list(pool.map(detect, rules))
+    else:
+        detected = [detect(rule) for rule in rules]
+
+    for rule, (candidates, table_rows, detect_seconds) in zip(rules, detected):
+        start = time.perf_counter()
+        try:
+            rows_changed = rule.func(conn, report=report)
+        except Exception as e:
+            report.record_rule(rule.name, rule.reads, rule.writes, candidates, table_rows, None,
+                               detect_seconds, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+            raise
+        report.record_rule(rule.name, rule.reads, rule.writes, candidates, table_rows, rows_changed,
+                           detect_seconds, time.perf_counter() - start)
+
+def diff_database(conn, original_path=DB_PATH, report=None):
+    '''Compare every table in conn against the (unchanged) database file, keyed by primary key. A table created
+    during the run (e.g. anomalies on a first run) counts as wholly added.
+    Returns {table: {"added": n, "removed": n, "changed": n}}.'''
+    conn.execute("ATTACH DATABASE ? AS orig", (Path(original_path).resolve().as_uri() + "?mode=ro",))
+    summary = {}
+    try:
+        tables_sql = "SELECT name FROM {}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        original = {row[0] for row in conn.execute(tables_sql.format("orig"))}
+        tables = [row[0] for row in conn.execute(tables_sql.format("main"))]
+        for table in tables:
+            existed = table in original
+            pk_cols = [
+                row[1] for row in conn.execute(f"PRAGMA main.table_info({table})") if row[5]
+            ]
+            # Rows present on one side only (new or changed, removed or changed); rowid is the join key
+            cur = conn.execute(
+                f"SELECT rowid AS _rowid, * FROM main.{table}"
+                + (f" EXCEPT SELECT rowid, * FROM orig.{table}" if existed else "")
+            )
+            columns = [d[0] for d in cur.description][1:]
+            new_rows = {row[0]: dict(zip(columns, row[1:])) for row in cur.fetchall()}
+            old_rows = {
+                row[0]: dict(zip(columns, row[1:]))
+                for row in conn.execute(
+                    f"SELECT rowid AS _rowid, * FROM orig.{table} EXCEPT SELECT rowid, * FROM main.{table}"
+                )
+            } if existed else {}
+            added = new_rows.keys() - old_rows.keys()
+            removed = old_rows.keys() - new_rows.keys()
+            changed = new_rows.keys() & old_rows.keys()
+            summary[table] = {"added": len(added), "removed": len(removed), "changed": len(changed)}
+            if not report:
+                continue
+
+            def key(row, rowid):
+                if pk_cols and all(row[c] is not None for c in pk_cols):
+                    return ", ".join(f"{c}={row[c]}" for c in pk_cols)
+                return f"rowid={rowid}" # No (or NULL) primary key
+
+            for rowid in sorted(added):
+                report.record(f"Diff: {table} (added)", table, key(new_rows[rowid], rowid), "*", None, new_rows[rowid])
+            for rowid in sorted(removed):
+                report.record(f"Diff: {table} (removed)", table, key(old_rows[rowid], rowid), "*", old_rows[rowid], None)
+            for rowid in sorted(changed):
+                old, new = old_rows[rowid], new_rows[rowid]
+                for column in columns:
+                    if old[column] != new[column]:
+                        report.record(f"Diff: {table} (changed)", table, key(old, rowid), column, old[column], new[column])
+    finally:
+        conn.execute("DETACH DATABASE orig")
+    return summary
+
+@lru_cache(maxsize=None) # One keep-alive session per run, on the shared HTTP cache
+def github_session():
+    '''Issues are revalidated on every run (ttl=0); unchanged ones come back 304 and reuse the stored body.'''
+    return cached_session(pool_size=8) # fix_books_dates fetches on up to 8 threads
+
+@lru_cache(maxsize=None) # Fetch each issue once per run, ISO dates
 def get_issue_metadata(issue_number):
     '''Return a dict of issue history.'''
     url = f"{GITHUB_API}/repos/{OWNER}/{REPO}/issues/{issue_number}"
@@ -83,7 +338,7 @@ def get_issue_metadata(issue_number):
         "Accept": "application/vnd.github+json",
     }
 
-    resp = requests.get(url, headers=headers)
+    resp = github_session().get(url, headers=headers)
     resp.raise_for_status()
 
     issue = resp.json()
@@ -96,104 +351,193 @@ def get_issue_metadata(issue_number):
         "closed_at": closed_at,
     }
 
+def ensure_indexes(conn):
+    '''Indexes backing the set-based rules below; joins on (issue_id, page) stay logarithmic as the log grows.'''
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reading_events_issue_page ON reading_events (issue_id, page)"
+    )
+
 ## Fix table 'books'
+def detect_books_dates(conn):
+    '''Count books needing a date backfill (database only; the GitHub history is fetched by the fix).'''
+    return conn.execute(
+        """
+        SELECT COUNT(*) FROM books
+        WHERE date_began IS NULL
+           OR (date_ended IS NULL AND status = 'completed')
+           OR created_on IS NULL
+           OR updated_on IS NULL
+        """
+    ).fetchone()[0]
+
+@register_rule(reads=("books", "reading_events"), writes=("books",), detect=detect_books_dates)
 def fix_books_dates(conn, report=None):
     cur = conn.cursor()
-    books = cur.execute("SELECT * FROM books").fetchall()
-
-    for book in books:
-        updates = {}
-        issue_meta = get_issue_metadata(book["issue_number"])
-
-        # date_began
-        if book["date_began"] is None:
-            updates["date_began"] = issue_meta["created_at"]
-            if report:
-                report.record(
-                    rule="Books: date_began backfill",
-                    table="books",
-                    identifier=f"issue_number={book['issue_number']}",
-                    column="date_began",
-                    old=None,
-                    new=issue_meta["created_at"],
-                )
+    # Only books missing a date need GitHub; stage their issue history in a temp table
+    needs_meta = cur.execute(
+        """
+        SELECT issue_number FROM books
+        WHERE date_began IS NULL
+           OR (date_ended IS NULL AND status = 'completed')
+        """
+    ).fetchall()
+    cur.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS issue_meta (
+            issue_number INTEGER PRIMARY KEY,
+            created_at TEXT,
+            closed_at TEXT
+        )
+        """
+    )
+    cur.execute("DELETE FROM issue_meta")
+    numbers = [row["issue_number"] for row in needs_meta]
+    with ThreadPoolExecutor(max_workers=8) as pool: # Matches github_session's pool
+        metas = list(pool.map(get_issue_metadata, numbers))
+    cur.executemany(
+        "INSERT OR REPLACE INTO issue_meta (issue_number, created_at, closed_at) VALUES (?, ?, ?)",
+        [(number, meta["created_at"], meta["closed_at"]) for number, meta in zip(numbers, metas)],
+    )
 
-        # date_ended
-        if book["date_ended"] is None and book["status"] == "completed":
-            updates["date_ended"] = issue_meta["closed_at"]
-            if report:
-                report.record(
-                    rule="Books: date_ended backfill",
-                    table="books",
-                    identifier=f"issue_number={book['issue_number']}",
-                    column="date_began",
-                    old=None,
-                    new=issue_meta["closed_at"],
-                )
+    # date_began
+    rows = cur.execute(
+        """
+        UPDATE books
+        SET date_began = m.created_at
+        FROM issue_meta AS m
+        WHERE books.issue_number = m.issue_number
+          AND books.date_began IS NULL
+          AND m.created_at IS NOT NULL
+        RETURNING books.issue_number, books.date_began
+        """
+    ).fetchall()
+    for issue_number, new in rows:
+        if report:
+            report.record(
+                rule="Books: date_began backfill",
+                table="books",
+                identifier=f"issue_number={issue_number}",
+                column="date_began",
+                old=None,
+                new=new,
+            )
+    if report:
+        report.record_count("Books: date_began backfill", "books", len(rows))
+    changed = len(rows)
 
-        # created_on
-        if book["created_on"] is None and (book["date_began"] or updates.get("date_began")):
-            updates["created_on"] = updates.get("date_began", book["date_began"])
-            # TODO: Add report
-
-        # updated_on
-        if book["updated_on"] is None:
-            if book["status"] == "completed":
-                updates["updated_on"] = updates.get("date_ended", book["date_ended"])
-                # TODO: Add report
-            else:
-                event = cur.execute(
-                    """
-                    SELECT date
-                    FROM reading_events
-                    WHERE issue_id = ?
-                    ORDER BY date DESC
-                    LIMIT 1
-                    """,
-                    (book["issue_id"],),
-                ).fetchone()
-                if event:
-                    updates["updated_on"] = event["date"]
-                    # TODO: Add report
-        
-        if updates:
-            set_clause = ", ".join(f"{k} = ?" for k in updates)
-            cur.execute(
-                f"UPDATE books SET {set_clause} WHERE issue_id = ?",
-                (*updates.values(), book["issue_id"]),
+    # date_ended
+    rows = cur.execute(
+        """
+        UPDATE books
+        SET date_ended = m.closed_at
+        FROM issue_meta AS m
+        WHERE books.issue_number = m.issue_number
+          AND books.date_ended IS NULL
+          AND books.status = 'completed'
+          AND m.closed_at IS NOT NULL
+        RETURNING books.issue_number, books.date_ended
+        """
+    ).fetchall()
+    for issue_number, new in rows:
+        if report:
+            report.record(
+                rule="Books: date_ended backfill",
+                table="books",
+                identifier=f"issue_number={issue_number}",
+                column="date_ended",
+                old=None,
+                new=new,
             )
-    print("Validated books table")
+    if report:
+        report.record_count("Books: date_ended backfill", "books", len(rows))
+    changed += len(rows)
+
+    # created_on (date_began has been backfilled above)
+    cur.execute(
+        """
+        UPDATE books
+        SET created_on = date_began
+        WHERE created_on IS NULL
+          AND date_began IS NOT NULL
+        """
+    )
+    if report:
+        report.record_count("Books: created_on backfill", "books", cur.rowcount)
+    changed += cur.rowcount
 
+    # updated_on: date_ended when completed, else the latest reading event
+    cur.execute(
+        """
+        UPDATE books
+        SET updated_on = CASE WHEN books.status = 'completed' THEN books.date_ended ELSE ev.last_date END
+        FROM (
+            SELECT b.issue_id, MAX(e.date) AS last_date
+            FROM books AS b
+            LEFT JOIN reading_events AS e ON e.issue_id = b.issue_id
+            WHERE b.updated_on IS NULL
+            GROUP BY b.issue_id
+        ) AS ev
+        WHERE books.issue_id = ev.issue_id
+          AND books.updated_on IS NULL
+          AND (CASE WHEN books.status = 'completed' THEN books.date_ended ELSE ev.last_date END) IS NOT NULL
+        """
+    )
+    if report:
+        report.record_count("Books: updated_on backfill", "books", cur.rowcount)
+    changed += cur.rowcount
+    print("Validated books table")
+    return changed
+
+@register_rule(
+    reads=("books",),
+    writes=("books",),
+    detect="""
+        SELECT COUNT(*) FROM books
+        WHERE word_count IS NULL
+          AND width IS NOT NULL
+          AND length IS NOT NULL
+          AND total_pages IS NOT NULL
+    """,
+)
 def calculate_word_count(conn, report=None):
-    # Fetch all books without a word_count yet
+    # Estimate for all books without a word_count yet, in one pass
     cur = conn.cursor()
-    cur.execute("SELECT issue_id, width, length, total_pages FROM books WHERE word_count IS NULL")
-    rows = cur.fetchall()
-    # Calculate and apply
-    for issue_id, width, length, total_pages in rows:
-        words_est = ((width * 0.8) / (0.153 * 0.5 * 5.5)) * ((length * 0.75) / (0.153 * 1.3)) * total_pages
-        cur.execute(
-            "UPDATE books SET word_count = ? WHERE issue_id = ?",
-            (round(words_est,0), issue_id)
-        ) # TODO: Add report
+    cur.execute(
+        """
+        UPDATE books
+        SET word_count = ROUND(
+            ((width * 0.8) / (0.153 * 0.5 * 5.5)) * ((length * 0.75) / (0.153 * 1.3)) * total_pages,
+            0
+        )
+        WHERE word_count IS NULL
+          AND width IS NOT NULL
+          AND length IS NOT NULL
+          AND total_pages IS NOT NULL
+        """
+    )
+    if report:
+        report.record_count("Books: word_count estimate", "books", cur.rowcount)
     print("Word count estimates calculated and applied.")
+    return cur.rowcount
 
 ## Fix table 'reading_events'
+@register_rule(
+    reads=("reading_events",),
+    writes=("reading_events",),
+    detect="SELECT COUNT(*) FROM reading_events WHERE created_on IS NULL OR updated_on IS NULL",
+)
 def fix_reading_events_dates(conn, report=None):
     cur = conn.cursor()
     today = date.today().isoformat()
-    valid_tables = {
-        row[0]
-        for row in conn.execute(
-            "SELECT name FROM sqlite_master WHERE type='table'"
-        )
-    }
     # TODO: Try to enforce reacing_events datetime typing here
     cur.execute("""
         UPDATE reading_events
         SET created_on = date
         WHERE created_on IS NULL
         """)
+    if report:
+        report.record_count("Events: created_on backfill", "reading_events", cur.rowcount)
+    changed = cur.rowcount
     cur.execute(
         """
         UPDATE reading_events
@@ -202,181 +546,224 @@ def fix_reading_events_dates(conn, report=None):
         """,
         (today,),
     )
+    if report:
+        report.record_count("Events: updated_on backfill", "reading_events", cur.rowcount)
+    changed += cur.rowcount
     print("Fill NULL updated_ and created_on entries with date where missing.")
+    return changed
 
+@register_rule(
+    reads=("reading_events",),
+    writes=("reading_events",),
+    detect="SELECT COUNT(*) FROM reading_events WHERE source_id IS NULL",
+)
+def ensure_source_id_reading_events(conn, report=None): # NOTE: This may not be needed; edge case arose 
+    cur = conn.cursor()
+    cur.execute(
+        """
+        UPDATE reading_events
+        SET source_id = source || ':' || issue_id || ':' || date(date) || ':' || page -- source_id convention
+        WHERE source_id IS NULL
+        """
+    )
+    if report:
+        report.record_count("Events: source_id backfill", "reading_events", cur.rowcount)
+    print("Ensured all reading_events have proper source_id.")
+    return cur.rowcount
+
+@register_rule(
+    reads=("reading_events",),
+    writes=("reading_events",),
+    detect="""
+        SELECT COUNT(*) FROM (
+            SELECT issue_id FROM reading_events
+            GROUP BY issue_id
+            HAVING MAX(page = 1) = 0
+        )
+    """,
+)
 def ensure_page_one_events(conn, report=None):
     cur = conn.cursor()
-    issues = cur.execute(
-        "SELECT DISTINCT issue_id FROM reading_events"
-    ).fetchall()
-
-    for row in issues:
-        issue_id = row["issue_id"]
-        has_page_one = cur.execute(
-            """
-            SELECT 1 FROM reading_events
-            WHERE issue_id = ? AND page = 1
-            LIMIT 1
-            """,
-            (issue_id,),
-        ).fetchone()
-
-        if has_page_one:
-            continue
-        # If there is no "page 1" entry, create one on the first day of reading
-        earliest = cur.execute(
-            """
-            SELECT * FROM reading_events
-            WHERE issue_id = ?
-            ORDER BY date ASC
-            LIMIT 1
-            """,
-            (issue_id,),
-        ).fetchone()
-
-        if earliest: # Create earliest entry, set page = 1
-            cur.execute(
-                """
-                INSERT INTO reading_events (source_id, issue_id, date, page, source, created_on, updated_on)
-                VALUES (?, ?, ?, 1, ?, ?, ?)
-                """,
-                (
-                    ":".join(earliest["source"],str(issue_id),parse_date(earliest['date']).strftime("%Y-%m-%d") ,str(1)), # source_id convention
-                    issue_id,
-                    earliest["date"],
-                    earliest["source"],
-                    earliest["created_on"],
-                    earliest["updated_on"],
-                ),
-            )
+    # For every issue without a "page 1" entry, copy its earliest event(s) as page = 1
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO reading_events (source_id, issue_id, date, page, source, created_on, updated_on)
+        SELECT
+            source || ':' || issue_id || ':' || date(date) || ':1', -- source_id convention
+            issue_id,
+            date,
+            1,
+            source,
+            created_on,
+            updated_on
+        FROM reading_events
+        WHERE (issue_id, date) IN (
+            SELECT issue_id, MIN(date)
+            FROM reading_events
+            GROUP BY issue_id
+            HAVING MAX(page = 1) = 0
+        )
+        """
+    )
+    if report:
+        report.record_count("Events: page 1 added", "reading_events", cur.rowcount)
     print("Ensured all issues have page = 1 reading_events entry")
-
+    return cur.rowcount
+
+@register_rule(
+    reads=("books", "reading_events"),
+    writes=("reading_events",),
+    detect="""
+        SELECT COUNT(*) FROM books AS b
+        WHERE b.date_ended IS NOT NULL
+          AND b.total_pages IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM reading_events AS e
+              WHERE e.issue_id = b.issue_id
+                AND e.page = b.total_pages
+                AND e.date IS b.date_ended
+          )
+    """,
+)
 def ensure_page_final_events(conn, report=None):
     cur = conn.cursor()
-
-    issues = cur.execute(
-        """SELECT issue_id, total_pages, date_ended
-           FROM books"""
-    ).fetchall()
-
-    for row in issues:
-        issue_id = row["issue_id"]
-        total_pages = row["total_pages"]
-        date_ended = row["date_ended"]
-
-        # Skip unfinished books
-        if date_ended is None:
-            continue
-
-        # Check if final-page event already exists
-        existing = cur.execute(
-            """
-            SELECT source_id FROM reading_events
-            WHERE issue_id = ?
-              AND page = ?
-            LIMIT 1
-            """,
-            (issue_id, total_pages),
-        ).fetchone()
-
-        # Deterministic source_id (adjust convention as you like)
-        source_id = f"final:{issue_id}:{total_pages}"
-
-        if existing:
-            # Ensure date matches books.date_ended
-            cur.execute(
-                """
-                UPDATE reading_events
-                SET date = ?, updated_on = DATETIME('now')
-                WHERE source_id = ?
-                """,
-                (date_ended, existing["source_id"]),
-            )
-        else:
-            # Insert final-page event
-            cur.execute(
-                """
-                INSERT INTO reading_events
-                (source_id, issue_id, date, page, source)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    source_id,
-                    issue_id,
-                    date_ended,
-                    total_pages,
-                    "auto-finalize",
-                ),
-            )
-    # Commit
-    conn.commit()
+    # Existing final-page events: ensure date matches books.date_ended
+    cur.execute(
+        """
+        UPDATE reading_events
+        SET date = b.date_ended, updated_on = DATETIME('now')
+        FROM books AS b
+        WHERE reading_events.issue_id = b.issue_id
+          AND reading_events.page = b.total_pages
+          AND b.date_ended IS NOT NULL
+          AND reading_events.date IS NOT b.date_ended
+        """
+    )
+    if report:
+        report.record_count("Events: final page re-dated", "reading_events", cur.rowcount)
+    changed = cur.rowcount
+    # Finished books without a final-page event: insert one (deterministic source_id)
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO reading_events (source_id, issue_id, date, page, source)
+        SELECT
+            'final:' || b.issue_id || ':' || b.total_pages,
+            b.issue_id,
+            b.date_ended,
+            b.total_pages,
+            'auto-finalize'
+        FROM books AS b
+        WHERE b.date_ended IS NOT NULL
+          AND b.total_pages IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM reading_events AS e
+              WHERE e.issue_id = b.issue_id
+                AND e.page = b.total_pages
+          )
+        """
+    )
+    if report:
+        report.record_count("Events: final page added", "reading_events", cur.rowcount)
+    changed += cur.rowcount
     print("Ensured all finished books have final-page reading_events entry")
+    return changed
 
 
-def ensure_source_id_reading_events(conn, report=None): # NOTE: This may not be needed; edge case arose 
-    cur = conn.cursor()
-    rows = cur.execute(
-        "SELECT * FROM reading_events WHERE source_id = NULL"
-    ).fetchall()
-
-    for row in rows:
-        cur.execute(
-            """
-            INSERT INTO reading_events (source_id, issue_id, date, page, source, created_on, updated_on)
-            VALUES (?, ?, ?, 1, ?, ?, ?)
-            """,
-            (
-                ":".join(row['source'],row['issue_id'],parse_date(row['date']).strftime("%Y-%m-%d"),str(row['page'])), # source_id convention
-                row['issue_id'],
-                row['date'],
-                row['source'],
-                row['created_on'],
-                row['updated_on'],
-            ),
+@register_rule(
+    reads=("reading_events",),
+    writes=("reading_events",),
+    detect="""
+        SELECT COALESCE(SUM(n - 1), 0) FROM (
+            SELECT COUNT(*) AS n FROM reading_events
+            GROUP BY issue_id, date, page, source
+            HAVING n > 1
         )
-    print("Ensured all reading_events have proper source_id.")
-
+    """,
+)
 def dedupe_reading_events(conn, report=None):
     cur = conn.cursor()
-    duplicates = cur.execute(
+    # Keep the first-created copy of each (issue_id, date, page, source) event
+    cur.execute(
         """
-        SELECT issue_id, date, page, source, MAX(page) as max_page
-        FROM reading_events
-        GROUP BY issue_id, date, page, source
-        HAVING COUNT(*) > 1
+        DELETE FROM reading_events
+        WHERE rowid IN (
+            SELECT rowid FROM (
+                SELECT
+                    rowid,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY issue_id, date, page, source
+                        ORDER BY created_on, source_id
+                    ) AS rn
+                FROM reading_events
+                WHERE (issue_id, page) IN ( -- Only candidate groups; served by the (issue_id, page) index
+                    SELECT issue_id, page
+                    FROM reading_events
+                    GROUP BY issue_id, page
+                    HAVING COUNT(*) > 1
+                )
+            )
+            WHERE rn > 1
+        )
         """
-    ).fetchall()
-
-    for d in duplicates:
-        cur.execute(
-            """
-            DELETE FROM reading_events
-            WHERE issue_id = ?
-              AND date = ?
-              AND source = ?
-              AND page < ?
-            """,
-            (d["issue_id"], d["date"], d["source"], d["max_page"]),
-        ) # TODO: How to enter this in the report?
+    )
+    if report:
+        report.record_count("Events: duplicates removed", "reading_events", cur.rowcount)
     print("Duplicate reading_events removed")
+    return cur.rowcount
+
+
+## Flag (not fix) suspicious reading_events
+@register_rule(reads=("books", "reading_events"), writes=(ANOMALIES_TABLE_NAME,))
+def flag_reading_event_anomalies(conn, report=None):
+    '''Rebuild the anomalies table from one vectorised pass over all events.'''
+    cur = conn.cursor()
+    cur.execute(sql_create_table_cmd(ANOMALIES_TABLE_NAME, ANOMALIES_COLUMNS))
+    events, books = load_event_arrays(conn)
+    rowids, kind_idx, values = find_event_anomalies(events, books)
+    kinds = sorted(ANOMALY_KINDS)
+    # Stage hits, then resolve event details with a single join
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS anomaly_hits (event_rowid INTEGER, kind TEXT, value REAL)")
+    cur.execute("DELETE FROM anomaly_hits")
+    cur.executemany(
+        "INSERT INTO anomaly_hits VALUES (?, ?, ?)",
+        zip(rowids.tolist(), (kinds[k] for k in kind_idx.tolist()), values.tolist()),
+    )
+    cur.execute(f"DELETE FROM {ANOMALIES_TABLE_NAME}")
+    cur.execute(
+        f"""
+        INSERT INTO {ANOMALIES_TABLE_NAME} (issue_id, source_id, date, page, kind, value)
+        SELECT e.issue_id, e.source_id, e.date, e.page, h.kind, h.value
+        FROM anomaly_hits AS h
+        JOIN reading_events AS e ON e.rowid = h.event_rowid
+        ORDER BY e.issue_id, e.date
+        """
+    )
+    if report:
+        for row in cur.execute(
+            f"SELECT kind, issue_id, source_id, date, page, value FROM {ANOMALIES_TABLE_NAME} ORDER BY anomaly_id"
+        ):
+            report.record_anomaly(*row)
+    print(f"Flagged {len(rowids)} reading_events anomalies")
+    return len(rowids)
 
 
-def main():
-    conn = get_db()
-    val_report = ValidationReport()  # Create report
-    report_path = os.path.join("data", "validation_report.md")
+def main(dry_run=False):
+    conn = get_db(dry_run=dry_run)
+    val_report = ValidationReport(dry_run=dry_run)  # Create report
+    # A dry run reports beside, never over, the real run's report (which CI uploads)
+    report_path = os.path.join("data", "validation_report_dry_run.md" if dry_run else "validation_report.md")
 
     try:
-        fix_books_dates(conn, report=val_report)
-        calculate_word_count(conn)
-        fix_reading_events_dates(conn)
-        ensure_source_id_reading_events(conn)
-        ensure_page_one_events(conn)
-        ensure_page_final_events(conn) # New
-        dedupe_reading_events(conn)
+        ensure_indexes(conn)
+        conn.commit() # Readers below open their own connections
+        run_rules(conn, val_report, reader=lambda: connect_reader(dry_run))
 
         conn.commit() # Commit; report has been written if this is all successful
-        print("Database validation complete")
+        if dry_run: # In-memory copy only; report what would have changed
+            summary = diff_database(conn, DB_PATH, report=val_report)
+            for table, counts in summary.items():
+                print(f"{table}: {counts['added']} added, {counts['removed']} removed, {counts['changed']} changed")
+        print("Database validation complete" + (" (dry run)" if dry_run else ""))
 
     except Exception as e:
         # Log a failure into the report
@@ -395,9 +782,13 @@ def main():
         os.makedirs(os.path.dirname(report_path), exist_ok=True)
         with open(report_path, "w", encoding="utf-8") as f:
             f.write(val_report.to_markdown())
+        with open(Path(report_path).with_suffix(".json"), "w", encoding="utf-8") as f:
+            f.write(val_report.to_json())
+        with open(Path(report_path).with_suffix(".xml"), "w", encoding="utf-8") as f:
+            f.write(val_report.to_junit())
         # Close and show success
         conn.close()
         print(f"Validation report written to {report_path}")
 
 if __name__ == "__main__":
-    main()
+    main(dry_run="--dry-run" in sys.argv[1:])
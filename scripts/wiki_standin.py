@@ -0,0 +1,224 @@
+'''Local stand-in for Wikipedia article pages, for offline runs and throughput benchmarks of authors.py.
+Serves /wiki/<Title> from a directory of recorded pages (<Title>.html) or synthetic author pages. Also serves /w/api.php (action=query and wbgetentities, JSON)
+for the 'api' backend, from a JSON fixture ({"redirects": {from: to}, "pages": {title: qid},
+"entities": {qid: entity}}) and/or synthetic entities.
+Usage:
+    python scripts/wiki_standin.py --pages recorded_pages/ --port 8765
+    WIKI_BASE=http://127.0.0.1:8765/wiki/ python scripts/authors.py
+    WIKI_API_URL=http://127.0.0.1:8765/w/api.php WIKIDATA_API_URL=http://127.0.0.1:8765/w/api.php \
+        python scripts/authors.py --backend api
+    python scripts/wiki_standin.py --synthetic --latency 0.2 --bench 1000 [--backend api]
+    python scripts/wiki_standin.py --make-dump /tmp/dump.json.bz2 --dump-authors 1000  # For authors.py --dump'''
+# Imports
+import argparse, bz2, gzip, json, os, sys, threading, time, zlib
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Ensure project root is on sys.path (solve proj layout constraint; robust for local + CI + REPL)
+from pathlib import Path
+# In lieu of packaging and running with python -m  
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# Functions
+def synthetic_page(title):
+    '''Author article with an infobox and some <ref> tags; deterministic per title.
+    About one in five titles is a miss (None), so lookups exercise the fallback candidate URLs.'''
+    h = zlib.crc32(title.encode("utf-8"))
+    if h % 5 == 0 or "," in title:
+        return None
+    birth_year = 1750 + h % 250
+    name = title.replace("_", " ")
+    refs = "".join(f"<ref>Source {i}</ref>" for i in range(h % 40))
+    return f"""<html><head><title>{name} - Wikipedia</title></head><body>
+<h1>{name}</h1>
+<table class="infobox vcard">
+<tr><th>Born</th><td>{name}<br>1 January {birth_year}<br>Springfield, Testland</td></tr>
+<tr><th>Died</th><td>1 January {birth_year + 70} (aged 70)<br>Shelbyville, Testland</td></tr>
+<tr><th>Occupation</th><td>Novelist</td></tr>
+</table>
+<p>{name} was a writer.{refs}</p>
+</body></html>"""
+
+## API stand-in
+def claim(value):
+    '''Minimal Wikidata statement.'''
+    return {"mainsnak": {"snaktype": "value", "datavalue": {"value": value}}, "rank": "normal"}
+
+def synthetic_entity(qid):
+    '''Deterministic entity: Q1-Q7 are birth places (Q7 has no country), Q11-Q13 countries, larger ids authors.'''
+    n = int(qid[1:])
+    if n <= 10:
+        claims = {} if n == 7 else {"P17": [claim({"id": f"Q{11 + n % 3}"})]}
+        return {"id": qid, "labels": {"en": {"value": f"Springfield {n}"}}, "claims": claims}
+    if n <= 20:
+        return {"id": qid, "labels": {"en": {"value": f"Testland {n}"}}, "claims": {}}
+    birth_year = 1750 + n % 250
+    claims = {
+        "P569": [claim({"time": f"+{birth_year}-01-01T00:00:00Z", "precision": 11})],
+        "P19": [claim({"id": f"Q{1 + n % 7}"})],
+        "P27": [claim({"id": f"Q{11 + n % 3}"})],
+    }
+    if n % 3: # Some are living
+        claims["P570"] = [claim({"time": f"+{birth_year + 70}-01-01T00:00:00Z", "precision": 11})]
+    return {"id": qid, "claims": claims, "sitelinks": {f"{chr(97 + i % 26)}{chr(97 + i // 26)}wiki": {} for i in range(n % 40)}}
+
+def api_response(params, fixture=None, synthetic=False):
+    '''JSON body for an api.php request (formatversion=2 shapes), or None for unsupported actions.'''
+    fixture = fixture or {}
+    action = params.get("action")
+    if action == "query":
+        normalized, redirects, pages = [], [], []
+        for title in params.get("titles", "").split("|"):
+            final = title.replace("_", " ")
+            if final != title:
+                normalized.append({"from": title, "to": final})
+            target = fixture.get("redirects", {}).get(final)
+            if target is None and synthetic and "," in final: # "Last, First" redirects to "First Last"
+                last, first = [p.strip() for p in final.split(",", 1)]
+                target = f"{first} {last}"
+            if target:
+                redirects.append({"from": final, "to": target})
+                final = target
+            qid = fixture.get("pages", {}).get(final)
+            if qid is None and synthetic and synthetic_page(final.replace(" ", "_")):
+                qid = f"Q{100 + zlib.crc32(final.encode('utf-8'))}"
+            if qid:
+                pages.append({"title": final, "pageprops": {"wikibase_item": qid}})
+            else:
+                pages.append({"title": final, "missing": True})
+        return {"batchcomplete": True, "query": {"normalized": normalized, "redirects": redirects, "pages": pages}}
+    if action == "wbgetentities":
+        entities = {}
+        for qid in params.get("ids", "").split("|"):
+            entity = fixture.get("entities", {}).get(qid)
+            if entity is None and synthetic:
+                entity = synthetic_entity(qid)
+            entities[qid] = entity or {"id": qid, "missing": ""}
+        return {"entities": entities, "success": 1}
+    return None
+
+def write_synthetic_dump(path, n_authors, filler_per_author=20):
+    '''Wikidata-style dump (JSON array, one entity per line; .gz/.bz2 by suffix) of the synthetic places,
+    countries and authors "Author<i> Surname<i>", padded with non-human filler entities.'''
+    opener = {".gz": gzip.open, ".bz2": bz2.open}.get(Path(path).suffix, open)
+    country = {"P31": [claim({"id": "Q6256"})]}
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write("[\n")
+        for n in list(range(1, 8)) + [11, 12, 13]:
+            entity = synthetic_entity(f"Q{n}")
+            if n > 10:
+                entity["claims"] = country
+            f.write(json.dumps({"type": "item", **entity}, separators=(",", ":")) + ",\n")
+        for i in range(n_authors):
+            name = f"Author{i} Surname{i}"
+            entity = synthetic_entity(f"Q{100 + zlib.crc32(name.encode('utf-8'))}")
+            entity["claims"]["P31"] = [claim({"id": "Q5"})]
+            entity = {"id": entity.pop("id"), "labels": {"en": {"language": "en", "value": name}}, **entity} # Dump key order
+            f.write(json.dumps({"type": "item", **entity}, separators=(",", ":")) + ",\n")
+            for j in range(filler_per_author):
+                filler = {"type": "item", "id": f"Q{10**10 + i * filler_per_author + j}",
+                          "labels": {"en": {"language": "en", "value": f"Thing {i}-{j}"}},
+                          "claims": {"P31": [claim({"id": "Q35120"})]}, "sitelinks": {}}
+                f.write(json.dumps(filler, separators=(",", ":")) + ",\n")
+        f.write(json.dumps({"type": "item", "id": "Q20", "labels": {}, "claims": {}}) + "\n]\n")
+
+def make_handler(pages_dir=None, synthetic=False, latency=0.0, api_fixture=None):
+    '''Request handler class bound to a page source.'''
+    fixture = None
+    if api_fixture:
+        with open(api_fixture, encoding="utf-8") as f:
+            fixture = json.load(f)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, like the real site
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency) # Emulate network round trip
+            html = None
+            if self.path.startswith("/w/api.php"):
+                params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+                data = api_response(params, fixture, synthetic)
+                body = json.dumps(data if data is not None else {"error": {"info": "Unsupported action"}}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if self.path.startswith("/wiki/"):
+                title = unquote(self.path[len("/wiki/"):].split("?", 1)[0])
+                if pages_dir:
+                    path = Path(pages_dir) / f"{title}.html"
+                    if path.is_file():
+                        html = path.read_text(encoding="utf-8")
+                if html is None and synthetic:
+                    html = synthetic_page(title)
+            body = (html or "Not found").encode("utf-8")
+            self.send_response(200 if html else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Quiet; benchmarks make thousands of requests
+
+    return Handler
+
+def start_server(port=0, pages_dir=None, synthetic=False, latency=0.0, api_fixture=None):
+    '''Start serving in a daemon thread; returns (server, base_url). Port 0 picks a free port.
+    The API is at base_url's /w/api.php.'''
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(pages_dir, synthetic, latency, api_fixture))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/wiki/"
+
+def bench(n_authors, backend="html", **server_kwargs):
+    '''Enrich n synthetic authors against the stand-in and report throughput (no DB writes).'''
+    os.environ.setdefault("GITHUB_REPOSITORY", "benchmark/benchmark") # core.constants requires it
+    import authors, tempfile
+    import core.constants
+    server, base_url = start_server(**server_kwargs)
+    authors.WIKI_BASE = base_url
+    authors.WIKI_API_URL = authors.WIKIDATA_API_URL = base_url.replace("/wiki/", "/w/api.php")
+    core.constants.HTTP_CACHE_PATH = Path(tempfile.mkdtemp()) / "http_cache.sqlite" # Cold cache; keep the real one untouched
+    names = [f"Author{i} Surname{i}" for i in range(n_authors)]
+    start = time.perf_counter()
+    if backend == "api":
+        results = authors.enrich_authors_api(names)
+    else:
+        results = authors.enrich_authors(names)
+    seconds = time.perf_counter() - start
+    server.shutdown()
+    found = sum(1 for r in results if r["outcome"] == "found")
+    print(f"\nEnriched {found} of {n_authors} authors in {seconds:.1f} s ({n_authors / seconds:.1f} authors/s, {backend} backend)")
+
+# Execute
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", help="Directory of recorded <Title>.html pages")
+    parser.add_argument("--synthetic", action="store_true", help="Generate author pages for any title")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    parser.add_argument("--api-fixture", help="JSON file of API pages/redirects/entities")
+    parser.add_argument("--bench", type=int, metavar="N", help="Enrich N synthetic authors against a private server and exit")
+    parser.add_argument("--backend", choices=["html", "api"], default="html", help="Backend to benchmark")
+    parser.add_argument("--make-dump", metavar="PATH", help="Write a synthetic Wikidata dump and exit")
+    parser.add_argument("--dump-authors", type=int, default=1000, help="Authors in --make-dump")
+    args = parser.parse_args()
+    if args.make_dump:
+        write_synthetic_dump(args.make_dump, args.dump_authors)
+    elif args.bench:
+        bench(args.bench, args.backend, pages_dir=args.pages, synthetic=True, latency=args.latency,
+              api_fixture=args.api_fixture)
+    else:
+        server, base_url = start_server(args.port, args.pages, args.synthetic, args.latency, args.api_fixture)
+        print(f"Serving {base_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
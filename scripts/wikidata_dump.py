@@ -0,0 +1,170 @@
+'''Offline author facts from a Wikidata JSON dump (latest-all.json[.gz|.bz2]: a JSON array, one entity per line).
+Streams the file in fixed-size chunks of lines (constant memory) and fans the chunks out to worker processes.
+Only lines whose English label/alias hits the author name index (or, in the second pass, whose id is wanted)
+are JSON-decoded, so the cost is dominated by decompression.'''
+import bz2, gzip, json, os, re
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from wikidata_utils import (
+    P_BIRTH_DATE, P_DEATH_DATE, P_BIRTH_PLACE, P_CITIZENSHIP, P_COUNTRY,
+    author_fields, claim_coordinates, claim_item, claim_values, claim_year, label, wikipedia_sitelink_count,
+)
+
+# Cheap prefilters applied to the raw line
+ID_RE = re.compile(r'"id":"(Q\d+)"') # First match is the entity's own id ("type" then "id" lead every line)
+EN_VALUE_RE = re.compile(r'"language":"en","value":"((?:[^"\\]|\\.)*)"') # Labels, descriptions and aliases
+HUMAN = "Q5"
+COUNTRY_CLASSES = ("Q6256", "Q3624078", "Q3024240", "Q7275") # Country, sovereign/historical country, state
+COUNTRY_MARKERS = tuple(f'"id":"{q}"' for q in COUNTRY_CLASSES) # Anywhere in the line; P31 is checked after decoding
+
+# Functions
+def normalize_name(name):
+    '''Index key for a name: case- and whitespace-insensitive.'''
+    return " ".join(name.casefold().split())
+
+def open_dump(path):
+    '''Text stream over a plain, gzip or bz2 dump.'''
+    path = str(path)
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+def read_chunks(path, chunk_lines):
+    '''Lists of at most chunk_lines entity lines; the array brackets are dropped.'''
+    chunk = []
+    with open_dump(path) as f:
+        for line in f:
+            if line.startswith("{"):
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+def parse_entity(line):
+    '''Decode one dump line (trailing comma and newline allowed).'''
+    return json.loads(line.rstrip().rstrip(","))
+
+def en_values(line):
+    '''English label/description/alias strings in a raw line (before the claims, which can be huge).'''
+    end = line.find('"claims"')
+    head = line if end < 0 else line[:end]
+    return [json.loads(f'"{v}"') if "\\" in v else v for v in EN_VALUE_RE.findall(head)]
+
+## Worker side (state set once per process by the initializer)
+_state = {}
+
+def _init_worker(state):
+    _state.clear()
+    _state.update(state)
+
+def scan_humans(lines):
+    '''Humans whose English label or alias is in the name index: [(key, qid, facts)].'''
+    names, found = _state["names"], []
+    for line in lines:
+        keys = {normalize_name(v) for v in en_values(line)} & names
+        if not keys:
+            continue
+        entity = parse_entity(line)
+        if HUMAN not in {v.get("id") for v in claim_values(entity, "P31")}:
+            continue
+        facts = {
+            "birth_year": claim_year(entity, P_BIRTH_DATE),
+            "death_year": claim_year(entity, P_DEATH_DATE),
+            "birth_place": claim_item(entity, P_BIRTH_PLACE),
+            "citizenship": claim_item(entity, P_CITIZENSHIP),
+            "sitelink_count": wikipedia_sitelink_count(entity),
+        }
+        found.extend((key, entity["id"], facts) for key in keys)
+    return found
+
+def scan_related(lines):
+    '''Wanted places/countries plus anything that is a country: [(qid, en label, country qid, (lat, lon))].'''
+    ids, found = _state["ids"], []
+    for line in lines:
+        match = ID_RE.search(line, 0, 200)
+        wanted = match is not None and match.group(1) in ids
+        if not match or (not wanted and not any(m in line for m in COUNTRY_MARKERS)):
+            continue
+        entity = parse_entity(line)
+        if not wanted and not set(COUNTRY_CLASSES) & {v.get("id") for v in claim_values(entity, "P31")}:
+            continue # A country class mentioned elsewhere (e.g. a statement about a country)
+        found.append((entity["id"], label(entity), claim_item(entity, P_COUNTRY), claim_coordinates(entity)))
+    return found
+
+def scan_first_pass(lines):
+    '''Humans in the name index (scan_humans) and every country (scan_related), from one read of the lines.'''
+    return scan_humans(lines), scan_related(lines)
+
+## Driver
+def map_chunks(path, fn, state, workers=None, chunk_lines=2000):
+    '''Yield fn(chunk) results for every chunk of the dump, at most 2 chunks per worker in flight.
+    workers=1 runs inline (no process pool).'''
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(state)
+        for chunk in read_chunks(path, chunk_lines):
+            yield fn(chunk)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(state,)) as pool:
+        pending = set()
+        for chunk in read_chunks(path, chunk_lines):
+            pending.add(pool.submit(fn, chunk))
+            if len(pending) >= 2 * workers: # Bounded: the reader never runs far ahead of the workers
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+def find_authors(path, candidates, workers=None, chunk_lines=2000):
+    '''Author facts from a dump. candidates: {full_name: [title, ...]} (as authors.build_candidate_titles).
+    Returns {full_name: (qid, authors-table fields)}; a name matching several humans takes the one with the
+    most sitelinks.
+    The first pass finds the humans and every country (so citizenships and place countries need nothing more).
+    Birth places (towns, cities) are only known once their humans are found, and may come anywhere in the dump,
+    before or after them, so a second read looks for those ids alone: it is skipped when there are none left
+    and stops as soon as the last one is found.'''
+    index = {}
+    for full_name, titles in candidates.items():
+        for title in titles:
+            index.setdefault(normalize_name(title), set()).add(full_name)
+    best, related = {}, {}
+    for humans, countries in map_chunks(path, scan_first_pass, {"names": set(index), "ids": set()}, workers, chunk_lines):
+        for key, qid, facts in humans:
+            for full_name in index[key]:
+                if full_name not in best or facts["sitelink_count"] > best[full_name][1]["sitelink_count"]:
+                    best[full_name] = (qid, facts)
+        for qid, name, country, coordinates in countries:
+            related[qid] = (name, country, coordinates)
+    print(f"Dump pass 1: matched {len(best)} of {len(candidates)} authors; {len(related)} countries.")
+    ids = {f[p] for _, f in best.values() for p in ("birth_place", "citizenship")} - {None}
+    missing = ids - related.keys()
+    if missing:
+        for results in map_chunks(path, scan_related, {"ids": missing}, workers, chunk_lines):
+            for qid, name, country, coordinates in results:
+                related[qid] = (name, country, coordinates)
+            if missing <= related.keys():
+                break # Every wanted place found; the rest of the dump is skipped
+        print(f"Dump pass 2: resolved {len(missing & related.keys())} of {len(missing)} places.")
+
+    def name_of(qid):
+        return related.get(qid, (None,))[0]
+
+    authors = {}
+    for full_name, (qid, facts) in best.items():
+        place_name, place_country, coordinates = related.get(facts["birth_place"], (None, None, (None, None)))
+        authors[full_name] = (qid, author_fields(
+            facts["birth_year"],
+            facts["death_year"],
+            name_of(place_country) or place_name, # A birth place with no country is taken as the country itself
+            name_of(facts["citizenship"]),
+            facts["sitelink_count"],
+            place_name if name_of(place_country) else None,
+            coordinates,
+        ))
+    return authors
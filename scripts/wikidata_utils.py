@@ -0,0 +1,161 @@
+'''Batched MediaWiki/Wikidata API lookups for author metadata (authors.py's 'api' backend).
+Every call takes up to WIKI_API_BATCH_SIZE titles or ids, so 50 authors cost a handful of requests
+instead of one page download per candidate URL.'''
+import re
+
+from datetime import datetime
+
+# Claims used (Wikidata property ids)
+P_BIRTH_DATE, P_DEATH_DATE, P_BIRTH_PLACE, P_CITIZENSHIP, P_COUNTRY = "P569", "P570", "P19", "P27", "P17"
+P_COORDINATES = "P625"
+# Sitelink keys of Wikipedia language editions ("enwiki", "be_x_oldwiki"), minus the non-Wikipedia projects
+# that share the suffix; other sister projects (enwikiquote, frwikisource) don't match at all
+WIKIPEDIA_SITELINK = re.compile(r"^[a-z_]+wiki$")
+NON_WIKIPEDIA_SITELINKS = {"commonswiki", "specieswiki", "metawiki", "wikidatawiki"}
+
+# Functions
+def wikipedia_sitelink_count(entity):
+    '''Number of Wikipedia language editions with an article on the entity (a notability proxy).'''
+    return sum(
+        1 for site in entity.get("sitelinks", {})
+        if WIKIPEDIA_SITELINK.match(site) and site not in NON_WIKIPEDIA_SITELINKS
+    )
+
+def chunked(items, size):
+    '''Consecutive slices of at most size items.'''
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def api_get(api_url, params, session, limiter=None, timeout=10):
+    '''One GET against a MediaWiki api.php; returns the decoded JSON. Raises on HTTP errors.'''
+    if limiter:
+        limiter.acquire()
+    response = session.get(api_url, params={**params, "format": "json", "formatversion": 2}, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if "error" in data:
+        raise ValueError(f"{api_url}: {data['error'].get('info', data['error'])}")
+    return data
+
+def resolve_titles(titles, api_url, session, limiter=None, batch_size=50):
+    '''Map each title to (canonical page title, Wikidata item id), following normalisation and redirects.
+    Missing and disambiguation pages map to None.'''
+    resolved = {}
+    for batch in chunked(dict.fromkeys(titles), batch_size):
+        query = api_get(api_url, {
+            "action": "query",
+            "titles": "|".join(batch),
+            "redirects": 1,
+            "prop": "pageprops",
+            "ppprop": "wikibase_item|disambiguation",
+        }, session, limiter).get("query", {})
+        renames = {r["from"]: r["to"] for r in query.get("normalized", []) + query.get("redirects", [])}
+        pages = {
+            p["title"]: p.get("pageprops", {}).get("wikibase_item")
+            for p in query.get("pages", [])
+            if not p.get("missing") and not p.get("invalid") and "disambiguation" not in p.get("pageprops", {})
+        }
+        for title in batch:
+            final, seen = title, set()
+            while final in renames and final not in seen: # Normalised, then redirected (possibly twice)
+                seen.add(final)
+                final = renames[final]
+            qid = pages.get(final)
+            resolved[title] = (final, qid) if qid else None
+    return resolved
+
+def get_entities(ids, api_url, session, limiter=None, props="claims|sitelinks", batch_size=50):
+    '''Wikidata entities by id, batched; missing ids are left out.'''
+    entities = {}
+    for batch in chunked(dict.fromkeys(ids), batch_size):
+        data = api_get(api_url, {
+            "action": "wbgetentities",
+            "ids": "|".join(batch),
+            "props": props,
+            "languages": "en",
+        }, session, limiter)
+        entities.update({
+            qid: entity for qid, entity in data.get("entities", {}).items()
+            if "missing" not in entity
+        })
+    return entities
+
+def claim_values(entity, prop):
+    '''Values of a property, best rank first (preferred, then normal; deprecated dropped).'''
+    claims = [c for c in entity.get("claims", {}).get(prop, []) if c.get("rank") != "deprecated"]
+    claims.sort(key=lambda c: c.get("rank") != "preferred")
+    return [
+        c["mainsnak"]["datavalue"]["value"] for c in claims
+        if c.get("mainsnak", {}).get("snaktype") == "value"
+    ]
+
+def claim_item(entity, prop):
+    '''First (best-ranked) item id of a property, or None.'''
+    values = claim_values(entity, prop)
+    return values[0].get("id") if values else None
+
+def claim_year(entity, prop):
+    '''Year of the first (best-ranked) time value of a property, or None. Handles BCE ("-0100-...").'''
+    values = claim_values(entity, prop)
+    match = re.match(r"^([+-]?\d+)-", values[0].get("time", "")) if values else None
+    return int(match.group(1)) if match else None
+
+def claim_coordinates(entity):
+    '''(lat, lon) of the first (best-ranked) coordinate location, or (None, None).'''
+    values = claim_values(entity or {}, P_COORDINATES)
+    if not values or values[0].get("globe", "http://www.wikidata.org/entity/Q2").rsplit("/", 1)[-1] != "Q2": # Earth only
+        return None, None
+    return values[0].get("latitude"), values[0].get("longitude")
+
+def label(entity):
+    '''English label, or None.'''
+    return (entity or {}).get("labels", {}).get("en", {}).get("value")
+
+def author_fields(birth_year, death_year, birth_country, nationality, sitelink_count,
+                  birth_place=None, birth_coordinates=(None, None)):
+    '''authors-table metadata from structured facts; age is at death, or today for the living.'''
+    age = None
+    if birth_year:
+        age = (death_year or datetime.now().year) - birth_year
+    return {
+        "birth_year": birth_year,
+        "death_year": death_year,
+        "age": age,
+        "birth_country": birth_country,
+        "birth_place": birth_place,
+        "birth_lat": birth_coordinates[0],
+        "birth_lon": birth_coordinates[1],
+        "nationality": nationality or birth_country,
+        "home_country": None,  # future logic
+        "sitelink_count": sitelink_count,
+    }
+
+def get_author_facts(qids, api_url, session, limiter=None, batch_size=50):
+    '''Structured author facts per item id: birth/death year, age, birth place (name, coordinates) and country,
+    nationality, sitelink count.
+    Three rounds of batched calls: authors, then their birth places and citizenships, then the places' countries.'''
+    authors = get_entities(qids, api_url, session, limiter, "claims|sitelinks", batch_size)
+    related_ids = {
+        claim_item(e, p) for e in authors.values() for p in (P_BIRTH_PLACE, P_CITIZENSHIP)
+    } - {None}
+    related = get_entities(related_ids, api_url, session, limiter, "labels|claims", batch_size)
+    country_ids = {claim_item(e, P_COUNTRY) for e in related.values()} - {None} - related.keys()
+    related.update(get_entities(country_ids, api_url, session, limiter, "labels", batch_size))
+
+    facts = {}
+    for qid, entity in authors.items():
+        # Birth country: country of the birth place; a birth place with no country is taken as the country itself
+        place = related.get(claim_item(entity, P_BIRTH_PLACE))
+        birth_country = None
+        if place:
+            birth_country = label(related.get(claim_item(place, P_COUNTRY))) or label(place)
+        facts[qid] = author_fields(
+            claim_year(entity, P_BIRTH_DATE),
+            claim_year(entity, P_DEATH_DATE),
+            birth_country,
+            label(related.get(claim_item(entity, P_CITIZENSHIP))),
+            wikipedia_sitelink_count(entity),
+            label(place) if place and birth_country != label(place) else None,
+            claim_coordinates(place),
+        )
+    return facts
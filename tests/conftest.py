@@ -0,0 +1,12 @@
+import os, sys
+
+from pathlib import Path
+
+# core.constants splits GITHUB_REPOSITORY and validate.py requires a token at import; tests never call GitHub
+os.environ.setdefault("GITHUB_TOKEN", "test")
+os.environ.setdefault("GITHUB_REPOSITORY", "test/test")
+
+# Scripts import each other as top-level modules (e.g. `from name_utils import fold`)
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
@@ -0,0 +1,45 @@
+import numpy as np
+
+from anomaly_utils import find_event_anomalies
+from core.constants import ANOMALY_KINDS
+
+KINDS = sorted(ANOMALY_KINDS)
+NO_BOOKS = {"issue_id": np.array([], dtype=np.int64), "total_pages": np.array([]), "began_day": np.array([])}
+
+
+def events(rowids, issues, days, pages):
+    return {
+        "rowid": np.array(rowids, dtype=np.int64),
+        "issue_id": np.array(issues, dtype=np.int64),
+        "day": np.array(days, dtype=float),
+        "page": np.array(pages, dtype=float),
+    }
+
+
+def flagged(result, kind):
+    rowids, kinds, _ = result
+    return sorted(rowids[kinds == KINDS.index(kind)].tolist())
+
+
+def test_page_regression_within_a_day():
+    # Same day: logged page 120, then (later rowid) page 80
+    result = find_event_anomalies(events([1, 2], [7, 7], [100, 100], [120, 80]), NO_BOOKS)
+    assert flagged(result, "page_regression") == [2]
+
+
+def test_same_day_progress_is_not_a_regression():
+    result = find_event_anomalies(events([1, 2, 3], [7, 7, 7], [100, 100, 101], [10, 30, 50]), NO_BOOKS)
+    assert flagged(result, "page_regression") == []
+
+
+def test_over_total_pages_and_before_date_began():
+    books = {"issue_id": np.array([7]), "total_pages": np.array([100.0]), "began_day": np.array([50.0])}
+    result = find_event_anomalies(events([1, 2], [7, 7], [40, 60], [10, 150]), books)
+    assert flagged(result, "over_total_pages") == [2]
+    assert flagged(result, "before_date_began") == [1]
+
+
+def test_page_one_leads_its_day():
+    # Page 1 added (later rowid) on the day of the first logged page
+    result = find_event_anomalies(events([1, 2, 3], [7, 7, 7], [100, 101, 100], [40, 80, 1]), NO_BOOKS)
+    assert flagged(result, "page_regression") == []
@@ -0,0 +1,44 @@
+import sqlite3
+
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import authors
+from core.constants import *
+from sql_utils import sql_create_table_cmd
+
+
+class StubSession:
+    '''Answers every GET with the same status (and a page body on 200).'''
+    def __init__(self, status):
+        self.status = status
+
+    def get(self, url, timeout=None):
+        response = requests.Response()
+        response.status_code, response.url, response.reason = self.status, url, "stub"
+        response._content = b"<html></html>"
+        return response
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_rate_limit_and_server_errors_are_errors_not_misses(status):
+    with pytest.raises(requests.HTTPError):
+        authors.fetch_page("https://en.wikipedia.org/wiki/X", StubSession(status))
+    result = authors.enrich_author("Leo Tolstoy", StubSession(status))
+    assert result["outcome"] == "error"
+
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(sql_create_table_cmd(AUTHOR_ENRICHMENT_TABLE_NAME, AUTHOR_ENRICHMENT_COLUMNS))
+    authors.record_enrichment_state(conn, [{"author_id": 1, "misses": 0}], [result])
+    state = conn.execute(f"SELECT outcome, last_attempt, next_attempt FROM {AUTHOR_ENRICHMENT_TABLE_NAME}").fetchone()
+    assert state["outcome"] == "error"
+    retry = datetime.fromisoformat(state["next_attempt"]) - datetime.fromisoformat(state["last_attempt"])
+    assert retry == timedelta(hours=ENRICH_ERROR_RETRY_HOURS)
+
+
+def test_missing_page_is_a_miss():
+    assert authors.fetch_page("https://en.wikipedia.org/wiki/X", StubSession(404)) is None
+    assert authors.enrich_author("Leo Tolstoy", StubSession(404))["outcome"] == "not_found"
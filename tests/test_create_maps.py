@@ -0,0 +1,41 @@
+import sqlite3
+
+from create_maps import MAP_QUERIES, load_counts
+from core.constants import *
+from sql_utils import sql_create_table_cmd
+
+
+def test_books_by_author_country_matches_untrimmed_authors():
+    conn = sqlite3.connect(":memory:")
+    for table, columns in ((BOOKS_TABLE_NAME, BOOKS_COLUMNS), (AUTHORS_TABLE_NAME, AUTHORS_COLUMNS),
+                           (AUTHOR_ALIASES_TABLE_NAME, AUTHOR_ALIASES_COLUMNS)):
+        conn.execute(sql_create_table_cmd(table, columns))
+    conn.execute(f"INSERT INTO {AUTHORS_TABLE_NAME} (author_id, full_name, birth_iso3) VALUES (1, 'Leo Tolstoy', 'RUS')")
+    conn.execute(f"INSERT INTO {AUTHOR_ALIASES_TABLE_NAME} (alias, author_id) VALUES ('Leo Tolstoy', 1)") # Stored trimmed
+    conn.executemany(f"INSERT INTO {BOOKS_TABLE_NAME} (issue_id, author) VALUES (?, ?)", [(1, "Leo Tolstoy"), (2, " Leo Tolstoy ")])
+    df = load_counts(conn, MAP_QUERIES["world_map_books_by_author_country"])
+    assert df.values.tolist() == [["RUS", 2]]
+
+
+def test_unchanged_maps_skip_loading_the_geometry(tmp_path, monkeypatch):
+    import create_maps
+    db_path = tmp_path / "reading.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute(sql_create_table_cmd(AUTHORS_TABLE_NAME, AUTHORS_COLUMNS))
+    conn.execute(f"INSERT INTO {AUTHORS_TABLE_NAME} (author_id, full_name, birth_iso3) VALUES (1, 'Leo Tolstoy', 'RUS')")
+    conn.commit()
+    conn.close()
+    class Figure:
+        def write_html(self, path, include_plotlyjs=None):
+            path.write_text("<html></html>")
+    loads = []
+    def load_geometry():
+        loads.append(1)
+        return {}, "geometry"
+    monkeypatch.setattr(create_maps, "geometry_key", lambda geojson_path=None: "geometry")
+    monkeypatch.setattr(create_maps, "load_geometry", load_geometry)
+    monkeypatch.setattr(create_maps, "build_choropleth", lambda geojson, df_counts: Figure())
+    names = ["world_map_author_counts"]
+    assert create_maps.render_maps(names, db_path=db_path, output_dir=tmp_path) == {names[0]: "rendered"}
+    assert create_maps.render_maps(names, db_path=db_path, output_dir=tmp_path) == {names[0]: "unchanged"}
+    assert loads == [1]
@@ -0,0 +1,28 @@
+import os
+
+from geo_utils import file_hash, topology_to_geojson
+
+
+def test_file_hash_rehashes_only_when_mtime_or_size_change(tmp_path):
+    source, cache = tmp_path / "countries.geojson", tmp_path / "file_hashes.json"
+    source.write_text("abc")
+    first = file_hash(source, cache)
+    cache.write_text(cache.read_text().replace(first, "remembered"))
+    assert file_hash(source, cache) == "remembered" # Same (mtime, size): the file isn't read
+    source.write_text("xyz")
+    os.utime(source, ns=(1, 1))
+    assert file_hash(source, cache) not in {first, "remembered"}
+
+
+def test_collapsed_features_are_skipped():
+    topology = {
+        "transform": {"scale": [1.0, 1.0], "translate": [0.0, 0.0]},
+        "arcs": [[[0, 0], [1, 0], [0, 1], [-1, -1]]],
+        "objects": {"countries": {"geometries": [
+            {"properties": {"shapeGroup": "AAA"}, "arcs": [[[0]]]},
+            {"properties": {"shapeGroup": "BBB"}, "arcs": []}, # Every part collapsed on the grid
+        ]}},
+    }
+    features = topology_to_geojson(topology)["features"]
+    assert [f["properties"]["shapeGroup"] for f in features] == ["AAA"]
+    assert features[0]["geometry"]["coordinates"] == [[[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]]]
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from http_utils import HttpCache
+
+
+def put(cache, key, size):
+    request = SimpleNamespace(method="GET", url=f"https://example.org/{key}")
+    response = SimpleNamespace(content=b"x" * size, headers={}, status_code=200, reason="OK")
+    cache.put(key, request, response, ttl=60)
+
+
+def test_running_total_tracks_replacements_and_evicts_lru(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite", max_bytes=100)
+    put(cache, "a", 40)
+    put(cache, "b", 40)
+    put(cache, "a", 10) # Replaces a: total 50, not 90
+    assert cache.total == cache.stored_bytes() == 50
+    cache.get("b") # b is now the most recently used
+    put(cache, "c", 60) # 110 > 100: evicts a
+    assert cache.get("a") is None and cache.get("b") and cache.get("c")
+    assert cache.total == cache.stored_bytes() == 100
+
+
+def test_total_survives_reopening(tmp_path):
+    put(HttpCache(tmp_path / "cache.sqlite", max_bytes=100), "a", 30)
+    assert HttpCache(tmp_path / "cache.sqlite", max_bytes=100).total == 30
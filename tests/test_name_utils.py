@@ -0,0 +1,48 @@
+from name_utils import canonical_key, cluster_names, name_parts
+
+
+def test_canonical_key_inverts_comma_order():
+    assert canonical_key("Tolstoy, Leo") == canonical_key("Leo Tolstoy") == "leo tolstoy"
+    assert canonical_key("García Márquez, Gabriel") == canonical_key("Gabriel García Márquez")
+
+
+def test_particles_stay_with_surname():
+    assert name_parts("Ursula K. Le Guin") == (("ursula", "k"), "le guin")
+
+
+def test_comma_inverted_multipart_surname_merges():
+    canonical = cluster_names(["García Márquez, Gabriel", "Gabriel García Márquez"])
+    assert canonical["García Márquez, Gabriel"] == canonical["Gabriel García Márquez"]
+
+
+def test_multipart_surname_with_middle_name_merges():
+    canonical = cluster_names(["García Márquez, Gabriel", "Gabriel José García Márquez"])
+    assert len(set(canonical.values())) == 1
+
+
+def test_spelling_variants_merge():
+    canonical = cluster_names(["Fyodor Dostoevsky", "Dostoyevsky, Fyodor", "Fyodor Dostoyevsky"])
+    assert len(set(canonical.values())) == 1
+
+
+def test_different_people_stay_apart():
+    canonical = cluster_names(["Charlotte Brontë", "Emily Brontë", "Anne Brontë"])
+    assert len(set(canonical.values())) == 3
+
+
+def test_initials_join_only_when_unambiguous():
+    canonical = cluster_names(["Leo Tolstoy", "L. Tolstoy"])
+    assert canonical["L. Tolstoy"] == "Leo Tolstoy"
+    canonical = cluster_names(["Charlotte Brontë", "Carl Brontë", "C. Brontë"])
+    assert canonical["C. Brontë"] == "C. Brontë"
+
+
+def test_comma_form_outranks_usage_counts():
+    canonical = cluster_names(["Leo Tolstoy", "Tolstoy, Leo"], counts={"Leo Tolstoy": 5})
+    assert canonical["Leo Tolstoy"] == "Tolstoy, Leo"
+
+
+def test_counts_break_ties_between_variants_of_the_same_form():
+    names = ["Fyodor Dostoevsky", "Fyodor Dostoyevsky"]
+    assert set(cluster_names(names, counts={"Fyodor Dostoyevsky": 3}).values()) == {"Fyodor Dostoyevsky"}
+    assert set(cluster_names(names, counts={"Fyodor Dostoevsky": 3}).values()) == {"Fyodor Dostoevsky"}
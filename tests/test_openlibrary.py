@@ -0,0 +1,57 @@
+import gzip, json, sqlite3
+
+import openlibrary
+from core.constants import *
+from sql_utils import sql_create_table_cmd
+
+EDITION = {
+    "key": "/books/OL1M", "works": [{"key": "/works/OL1W"}], "title": "Example",
+    "isbn_10": ["0306406152"], "isbn_13": ["9780306406157"], "publishers": ["Plenum", "Kluwer"],
+    "publish_date": "March 5, 2006", "number_of_pages": 320, "physical_format": "Paperback",
+    "physical_dimensions": "20 x 13 x 2 centimeters",
+}
+
+
+def test_parse_year_and_dimensions():
+    assert openlibrary.parse_year("March 5, 2006") == "2006"
+    assert openlibrary.parse_year("n.d.") is None
+    assert openlibrary.parse_dimensions("5 x 8 x 1 inches") == (8.0, 5.0, 1.0)
+    assert openlibrary.parse_dimensions("20 x 13 x 2 centimeters") == (7.874, 5.118, 0.787)
+    assert openlibrary.parse_dimensions("large") == (None, None, None)
+
+
+def test_edition_rows_one_per_distinct_isbn13():
+    rows = openlibrary.edition_rows(EDITION)
+    assert [row[0] for row in rows] == ["9780306406157"] # The ISBN-10 is the same book
+    assert rows[0][1:7] == ("/books/OL1M", "/works/OL1W", "Example", "Plenum, Kluwer", "2006", 320)
+    assert openlibrary.edition_rows({"key": "/books/OL2M"}) == []
+
+
+def test_build_index_from_tsv_and_jsonl(tmp_path):
+    editions = tmp_path / "editions.txt.gz"
+    with gzip.open(editions, "wt", encoding="utf-8") as f:
+        f.write(f"/type/edition\t/books/OL1M\t3\t2020-01-01\t{json.dumps(EDITION)}\n")
+        f.write("not a record\n")
+    works = tmp_path / "works.jsonl"
+    works.write_text(json.dumps({"key": "/works/OL1W", "first_publish_date": "1999"}) + "\n")
+    index = tmp_path / "index.sqlite"
+    assert openlibrary.build_index(editions, works, index) == {"editions": 1, "works": 1}
+    record = openlibrary.lookup("0-306-40615-2", index)
+    assert (record["title"], record["year_published"], record["total_pages"]) == ("Example", "1999", 320)
+    assert openlibrary.lookup("9781861972712", index) is None
+
+
+def test_fill_books_never_overwrites(tmp_path):
+    editions = tmp_path / "editions.jsonl"
+    editions.write_text(json.dumps(EDITION) + "\n")
+    index = tmp_path / "index.sqlite"
+    openlibrary.build_index(editions, None, index)
+    conn = sqlite3.connect(":memory:")
+    conn.execute(sql_create_table_cmd(BOOKS_TABLE_NAME, BOOKS_COLUMNS))
+    conn.execute("INSERT INTO books (issue_id, isbn, total_pages) VALUES (1, '0306406152', 999)")
+    conn.execute("INSERT INTO books (issue_id, isbn) VALUES (2, 'not an isbn')")
+    filled = openlibrary.fill_books(conn, index)
+    assert filled["publisher"] == 1 and filled["total_pages"] == 0
+    row = conn.execute("SELECT publisher, year_edition, total_pages, length FROM books WHERE issue_id = 1").fetchone()
+    assert row == ("Plenum, Kluwer", "2006", 999, 7.874)
+    assert conn.execute("SELECT publisher FROM books WHERE issue_id = 2").fetchone()[0] is None
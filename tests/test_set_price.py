@@ -0,0 +1,72 @@
+import sqlite3
+
+import requests
+
+import set_price
+from core.constants import *
+from sql_utils import sql_create_table_cmd
+
+
+def make_db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(sql_create_table_cmd(BOOKS_TABLE_NAME, BOOKS_COLUMNS))
+    conn.executemany("INSERT INTO books (issue_id, isbn, total_pages) VALUES (?, ?, ?)", [
+        (1, "0-306-40615-2", 300), # ISBN-10 of 9780306406157
+        (2, "9780306406157", 300), # Same book, reread
+        (3, "9781861972712", 700),
+        (4, None, 450),
+    ])
+    return conn
+
+
+def test_estimate_prices_by_format_and_length():
+    assert set_price.estimate_prices(["Hardcover", "paperback", None], [700, 450, None]).tolist() == [32.0, 20.0, 20.0]
+    assert set_price.estimate_price_by_format("massmarket", 100) == 9.0
+
+
+def test_price_books_fetches_each_isbn_once_and_caches(monkeypatch):
+    calls = []
+    def fetch_prices(isbns):
+        calls.append(list(isbns))
+        return {"9780306406157": (12.5, "USD"), "9781861972712": (None, None)}
+    monkeypatch.setattr(set_price, "fetch_prices", fetch_prices)
+    conn = make_db()
+    summary = set_price.price_books(conn)
+    assert calls == [["9780306406157", "9781861972712"]]
+    assert summary == {"google_api": 2, "heuristic_estimate": 2}
+    rows = {r[0]: r[1:] for r in conn.execute("SELECT issue_id, price, currency, price_source FROM books")}
+    assert rows[1] == rows[2] == (12.5, "USD", "google_api")
+    assert rows[3] == (24.0, "USD", "heuristic_estimate") # No list price: default 20 + 4 for length
+    assert rows[4] == (22.0, "USD", "heuristic_estimate")
+    # Second run: both ISBNs (the miss included) come from price_cache
+    set_price.price_books(conn)
+    assert calls[-1] == []
+
+
+def test_price_books_only_rewrites_changed_rows(monkeypatch):
+    monkeypatch.setattr(set_price, "fetch_prices", lambda isbns: {isbn: (10.0, "USD") for isbn in isbns})
+    conn = make_db()
+    set_price.price_books(conn)
+    conn.execute("UPDATE books SET updated_on = 'before'")
+    set_price.price_books(conn, refresh=True)
+    assert {r[0] for r in conn.execute("SELECT updated_on FROM books")} == {"before"}
+
+
+def test_failed_lookups_are_not_cached(monkeypatch):
+    monkeypatch.setattr(set_price, "fetch_prices", lambda isbns: {}) # Every request failed
+    conn = make_db()
+    set_price.price_books(conn)
+    assert conn.execute(f"SELECT COUNT(*) FROM {PRICE_CACHE_TABLE_NAME}").fetchone()[0] == 0
+
+
+def test_lookups_never_reuse_http_responses_unrevalidated(monkeypatch):
+    # price_cache enforces the TTL; a second, HTTP-level TTL would make --refresh a no-op
+    ttls = []
+    def cached_session(**kwargs):
+        ttls.append(kwargs["ttl"])
+        return requests.Session()
+    monkeypatch.setattr(set_price, "cached_session", cached_session)
+    monkeypatch.setattr(set_price, "lookup_google_price", lambda isbn, session=None, limiter=None: (None, None))
+    set_price.fetch_prices(["9780306406157"])
+    set_price.get_book_price("9780306406157")
+    assert ttls == [0, 0]
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from streak_utils import streak_lengths, streak_stats
+
+
+def pages(days, values):
+    return pd.Series(values, index=pd.to_datetime(days), dtype=float)
+
+
+def test_streak_lengths():
+    assert streak_lengths([1, 1, 0, 1]).tolist() == [1, 2, 0, 1]
+    assert streak_lengths([0, 0]).tolist() == [0, 0]
+    assert streak_lengths([]).tolist() == []
+
+
+def test_missing_days_break_the_streak():
+    stats = streak_stats(pages(["2026-01-01", "2026-01-02", "2026-01-04"], [10, 5, 8]))
+    assert stats["per_day"].tolist() == [1, 2, 0, 1]
+    assert (stats["longest"], stats["current"], stats["days_read"]) == (2, 1, 3)
+    assert (stats["longest_start"], stats["longest_end"]) == (pd.Timestamp("2026-01-01"), pd.Timestamp("2026-01-02"))
+
+
+def test_empty_series():
+    stats = streak_stats(pages([], []), as_of="2026-01-01")
+    assert stats["per_day"].empty
+    assert (stats["current"], stats["longest"], stats["days_read"]) == (0, 0, 0)
+    assert stats["longest_start"] is None and stats["longest_end"] is None
+
+
+def test_as_of_unread_day_keeps_previous_streak():
+    series = pages(["2026-01-01", "2026-01-02", "2026-01-03", "2026-01-04"], [3, 4, 5, 0])
+    assert streak_stats(series, as_of="2026-01-04")["current"] == 3 # Today not read yet
+    assert streak_stats(series, as_of="2026-01-02")["current"] == 2
+    assert streak_stats(series, as_of="2025-12-31")["current"] == 0 # Before the data
+
+
+def test_as_of_after_the_data_ends_the_streak():
+    series = pages(["2026-01-01", "2026-01-02", "2026-01-03"], [3, 4, 5])
+    stats = streak_stats(series, as_of="2026-03-01")
+    assert (stats["current"], stats["longest"], stats["days_read"]) == (0, 3, 3)
+    assert stats["per_day"].index[-1] == pd.Timestamp("2026-03-01")
+    assert streak_stats(series, as_of="2026-01-04")["current"] == 3 # Today not read yet
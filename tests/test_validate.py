@@ -0,0 +1,192 @@
+import sqlite3
+
+import pytest
+
+import validate
+from core.constants import *
+from sql_utils import sql_create_table_cmd
+
+
+def make_db(path=":memory:"):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute(sql_create_table_cmd(BOOKS_TABLE_NAME, BOOKS_COLUMNS))
+    conn.execute(sql_create_table_cmd(EVENTS_TABLE_NAME, READING_EVENTS_COLUMNS))
+    return conn
+
+
+def add_book(conn, issue_id, total_pages=300, date_began="2026-01-01", date_ended=None, status="reading", **columns):
+    columns = {"issue_id": issue_id, "issue_number": issue_id, "title": f"Book {issue_id}", "status": status,
+               "total_pages": total_pages, "date_began": date_began, "date_ended": date_ended, **columns}
+    conn.execute(f"INSERT INTO books ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                 list(columns.values()))
+
+
+def add_event(conn, issue_id, date, page, source="comment", source_id=None):
+    conn.execute("INSERT INTO reading_events (source_id, issue_id, date, page, source) VALUES (?, ?, ?, ?, ?)",
+                 (source_id or f"{source}:{issue_id}:{date}:{page}", issue_id, date, page, source))
+
+
+def pages(conn, issue_id):
+    return [r[0] for r in conn.execute("SELECT page FROM reading_events WHERE issue_id = ? ORDER BY date, page", (issue_id,))]
+
+
+def test_word_count_only_where_dimensions_are_known():
+    conn = make_db()
+    add_book(conn, 1, width=5.0, length=8.0)
+    add_book(conn, 2, width=None, length=8.0)
+    add_book(conn, 3, width=5.0, length=8.0, word_count=123)
+    assert validate.calculate_word_count(conn) == 1
+    counts = dict(conn.execute("SELECT issue_id, word_count FROM books").fetchall())
+    assert counts[1] > 0 and counts[2] is None and counts[3] == 123
+
+
+def test_page_one_copies_the_earliest_event():
+    conn = make_db()
+    add_event(conn, 1, "2026-01-02", 40)
+    add_event(conn, 1, "2026-01-03", 80)
+    add_event(conn, 2, "2026-01-05", 1)
+    assert validate.ensure_page_one_events(conn) == 1
+    assert pages(conn, 1) == [1, 40, 80]
+    assert conn.execute("SELECT date FROM reading_events WHERE issue_id = 1 AND page = 1").fetchone()[0] == "2026-01-02"
+    assert validate.ensure_page_one_events(conn) == 0 # Idempotent
+
+
+def test_final_page_added_or_redated():
+    conn = make_db()
+    add_book(conn, 1, total_pages=200, date_ended="2026-02-01", status="completed")
+    add_book(conn, 2, total_pages=100, date_ended="2026-02-10", status="completed")
+    add_event(conn, 1, "2026-01-10", 50)
+    add_event(conn, 2, "2026-02-09", 100)
+    assert validate.ensure_page_final_events(conn) == 2 # One inserted, one re-dated
+    assert conn.execute("SELECT date FROM reading_events WHERE issue_id = 1 AND page = 200").fetchone()[0] == "2026-02-01"
+    assert conn.execute("SELECT date FROM reading_events WHERE issue_id = 2 AND page = 100").fetchone()[0] == "2026-02-10"
+
+
+def test_dedupe_keeps_one_copy_per_event():
+    conn = make_db()
+    add_event(conn, 1, "2026-01-02", 40, source_id="a")
+    add_event(conn, 1, "2026-01-02", 40, source_id="b")
+    add_event(conn, 1, "2026-01-02", 40, source="issue-body", source_id="c") # Different source: kept
+    assert validate.dedupe_reading_events(conn) == 1
+    assert [r[0] for r in conn.execute("SELECT source_id FROM reading_events ORDER BY source_id")] == ["a", "c"]
+
+
+def test_source_id_backfill_follows_the_convention():
+    conn = make_db()
+    conn.execute("INSERT INTO reading_events (issue_id, date, page, source) VALUES (1, '2026-01-02 08:00:00', 40, 'comment')")
+    assert validate.ensure_source_id_reading_events(conn) == 1
+    assert conn.execute("SELECT source_id FROM reading_events").fetchone()[0] == "comment:1:2026-01-02:40"
+
+
+def test_books_dates_backfilled_from_issue_history(monkeypatch):
+    history = {1: {"created_at": "2026-01-01", "closed_at": "2026-01-20"}}
+    monkeypatch.setattr(validate, "get_issue_metadata", history.__getitem__)
+    conn = make_db()
+    add_book(conn, 1, date_began=None, status="completed")
+    report = validate.ValidationReport()
+    validate.fix_books_dates(conn, report=report)
+    assert tuple(conn.execute("SELECT date_began, date_ended FROM books").fetchone()) == ("2026-01-01", "2026-01-20")
+    assert report.counts["Books: date_began backfill"] == ("books", 1)
+
+
+def test_run_rules_records_detect_and_apply():
+    conn = make_db()
+    add_event(conn, 1, "2026-01-02", 40)
+    add_event(conn, 1, "2026-01-02", 40, source_id="dup")
+    rules = [r for r in validate.RULES if r.name in {"ensure_page_one_events", "dedupe_reading_events"}]
+    report = validate.ValidationReport()
+    validate.run_rules(conn, report, rules=rules)
+    # Detection sees the table as of the start: 1 issue without page 1, 1 duplicate
+    assert report.rules["ensure_page_one_events"]["candidates"] == 1
+    assert report.rules["dedupe_reading_events"]["candidates"] == 1
+    # Both copies get a page-1 row with the same source_id, so only one is inserted
+    assert report.rules["ensure_page_one_events"]["rows_changed"] == 1
+    assert pages(conn, 1) == [1, 40]
+
+
+def test_run_rules_records_and_reraises_errors():
+    def broken(conn, report=None):
+        raise RuntimeError("boom")
+    report = validate.ValidationReport()
+    with pytest.raises(RuntimeError):
+        validate.run_rules(make_db(), report, rules=[validate.Rule(broken, ("books",), ("books",))])
+    assert report.rules["broken"]["error"] == "RuntimeError: boom"
+
+
+def test_diff_database_reports_row_changes(tmp_path):
+    path = tmp_path / "reading.sqlite"
+    conn = make_db(path)
+    add_book(conn, 1, width=5.0, length=8.0)
+    add_event(conn, 1, "2026-01-03", 50, source_id="drop") # Not the last rowid, so the insert below doesn't reuse it
+    add_event(conn, 1, "2026-01-02", 40, source_id="keep")
+    conn.commit()
+    copy = sqlite3.connect(":memory:")
+    conn.backup(copy)
+    conn.close()
+    copy.execute("UPDATE books SET word_count = 1000")
+    copy.execute("DELETE FROM reading_events WHERE source_id = 'drop'")
+    copy.execute("INSERT INTO reading_events (source_id, issue_id, date, page) VALUES ('new', 1, '2026-01-04', 60)")
+    copy.commit() # As main() does before diffing
+    report = validate.ValidationReport(dry_run=True)
+    summary = validate.diff_database(copy, path, report=report)
+    assert summary["books"] == {"added": 0, "removed": 0, "changed": 1}
+    assert summary["reading_events"] == {"added": 1, "removed": 1, "changed": 0}
+    change = report.changes["Diff: books (changed)"][0]
+    assert (change["id"], change["column"], change["old"], change["new"]) == ("issue_id=1", "word_count", None, 1000)
+
+
+def test_diff_database_counts_new_tables_as_added(tmp_path):
+    path = tmp_path / "reading.sqlite"
+    conn = make_db(path)
+    conn.commit()
+    copy = sqlite3.connect(":memory:")
+    conn.backup(copy)
+    conn.close()
+    copy.execute(sql_create_table_cmd(ANOMALIES_TABLE_NAME, ANOMALIES_COLUMNS))
+    copy.execute(f"INSERT INTO {ANOMALIES_TABLE_NAME} (issue_id, kind) VALUES (1, 'page_regression')")
+    copy.commit()
+    report = validate.ValidationReport(dry_run=True)
+    summary = validate.diff_database(copy, path, report=report)
+    assert summary[ANOMALIES_TABLE_NAME] == {"added": 1, "removed": 0, "changed": 0}
+    assert report.changes[f"Diff: {ANOMALIES_TABLE_NAME} (added)"][0]["id"] == "anomaly_id=1"
+
+
+def test_dry_run_leaves_database_and_real_report_alone(tmp_path, monkeypatch):
+    path = tmp_path / "reading.sqlite"
+    conn = make_db(path)
+    add_book(conn, 1, width=5.0, length=8.0, created_on="2026-01-01", updated_on="2026-01-01")
+    add_event(conn, 1, "2026-01-02", 40)
+    conn.commit()
+    conn.close()
+    before = path.read_bytes()
+    monkeypatch.setattr(validate, "DB_PATH", str(path))
+    monkeypatch.chdir(tmp_path)
+    validate.main(dry_run=True)
+    assert path.read_bytes() == before
+    assert sorted(p.name for p in (tmp_path / "data").iterdir()) == [
+        "validation_report_dry_run.json", "validation_report_dry_run.md", "validation_report_dry_run.xml",
+    ]
+    assert "Diff: reading_events (added)" in (tmp_path / "data" / "validation_report_dry_run.json").read_text() # Page 1
+
+
+def test_books_dates_detect_is_read_only(monkeypatch):
+    def no_network(issue_number):
+        raise AssertionError("detect must not call GitHub")
+    monkeypatch.setattr(validate, "get_issue_metadata", no_network)
+    conn = make_db()
+    add_book(conn, 1, date_began=None)
+    report = validate.ValidationReport()
+    rule = next(r for r in validate.RULES if r.name == "fix_books_dates")
+    assert rule.run_detect(conn) == (1, 1) # 1 candidate; books + reading_events hold 1 row
+    report.record_rule(rule.name, rule.reads, rule.writes, 1, 1, 0, 0.0, 0.0)
+    assert "| Table rows |" in report.to_markdown()
+
+
+def test_added_page_one_is_not_a_regression():
+    conn = make_db()
+    add_event(conn, 1, "2026-01-02", 40)
+    add_event(conn, 1, "2026-01-03", 80)
+    validate.ensure_page_one_events(conn) # Dated 2026-01-02, inserted last
+    assert validate.flag_reading_event_anomalies(conn) == 0
+    assert conn.execute(f"SELECT COUNT(*) FROM {ANOMALIES_TABLE_NAME}").fetchone()[0] == 0
@@ -0,0 +1,54 @@
+import json
+
+import wikidata_dump
+
+from wikidata_dump import _init_worker, find_authors, scan_related
+
+
+def item(qid):
+    return [{"mainsnak": {"snaktype": "value", "datavalue": {"value": {"id": qid}}}}]
+
+
+def line(qid, p31, **claims):
+    claims = {"P31": item(p31), **claims}
+    entity = {"type": "item", "id": qid, "labels": {"en": {"language": "en", "value": qid}}, "claims": claims}
+    return json.dumps(entity, separators=(",", ":")) + ",\n" # Compact, like the dump
+
+
+def test_countries_found_by_instance_of():
+    _init_worker({"ids": set()})
+    found = scan_related([line("Q142", "Q6256"), line("Q90", "Q515")])
+    assert [qid for qid, *_ in found] == ["Q142"]
+
+
+def test_country_class_outside_p31_is_ignored():
+    # A book whose main subject (P921) is "country" mentions Q6256, but isn't one
+    subject = item("Q6256")
+    _init_worker({"ids": set()})
+    assert scan_related([line("Q1000", "Q7725634", P921=subject)]) == []
+
+
+def test_wanted_ids_kept_whatever_their_class():
+    _init_worker({"ids": {"Q90"}})
+    assert [qid for qid, *_ in scan_related([line("Q90", "Q515")])] == ["Q90"]
+
+
+def test_find_authors_resolves_places_and_countries(tmp_path, monkeypatch):
+    dump = tmp_path / "latest-all.json"
+    dump.write_text("[\n" + "".join([
+        line("Q90", "Q515", P17=item("Q142")), # Birth place, before its human
+        line("Q7243", "Q5", P19=item("Q90"), P27=item("Q34266")), # "Q7243" is labelled "Q7243"
+        line("Q142", "Q6256"),
+        line("Q34266", "Q3024240"), # Historical country
+        line("Q1000", "Q515", P17=item("Q142")), # Unwanted place
+    ]) + "]\n")
+    scans = []
+    def counting_scan(lines):
+        scans.append(len(lines))
+        return scan_related(lines)
+    monkeypatch.setattr(wikidata_dump, "scan_related", counting_scan)
+    found = find_authors(dump, {"Someone": ["Q7243"]}, workers=1, chunk_lines=2)
+    qid, fields = found["Someone"]
+    assert qid == "Q7243"
+    assert (fields["birth_place"], fields["birth_country"], fields["nationality"]) == ("Q90", "Q142", "Q34266")
+    assert scans == [2, 2, 1, 2] # Pass 1 reads 3 chunks; pass 2 stops after the chunk holding Q90
@@ -0,0 +1,14 @@
+from wikidata_utils import wikipedia_sitelink_count
+
+
+def test_counts_only_wikipedia_editions():
+    entity = {"sitelinks": {
+        "enwiki": {}, "frwiki": {}, "be_x_oldwiki": {}, # Wikipedias
+        "commonswiki": {}, "specieswiki": {}, "metawiki": {}, "wikidatawiki": {}, # Other projects, same suffix
+        "enwikiquote": {}, "frwikisource": {}, "dewikibooks": {}, # Sister projects
+    }}
+    assert wikipedia_sitelink_count(entity) == 3
+
+
+def test_no_sitelinks():
+    assert wikipedia_sitelink_count({}) == 0